@@ -1,21 +1,56 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+import multiprocessing
 import os
-from datetime import datetime
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from gemini_service import GeminiService
+from gemini_service import GeminiService, build_summary_prompt
 # Note: attention_service removed - attention tracking now handled by frontend AttentionTracker component
 from content_extractor import content_extractor
+from document_extractor import (ContentIndexBuilder, iter_file_segments, iter_stripped_text, format_pdf_stats,
+                                read_pdf_outline, iter_pdf_page_ranges)
+from content_cache import content_cache
+from section_index import index_matches
+from toc_index import toc_matches
+from minhash_index import LSHIndex, minhash_signature, signature_from_bytes, signature_to_bytes
+from upload_spool import spool_upload
 import json
-import PyPDF2
-import docx
-from pptx import Presentation
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///learning_system.db'
-app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///learning_system.db')
+app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
+app.config['PDF_EXTRACT_WORKERS'] = int(os.getenv('PDF_EXTRACT_WORKERS', os.cpu_count() or 1))
+app.config['PDF_BACKEND'] = os.getenv('PDF_BACKEND', 'auto')  # auto, pypdfium2, pdfminer or pypdf2
+app.config['UPLOAD_JOB_WORKERS'] = int(os.getenv('UPLOAD_JOB_WORKERS', 2))
+app.config['UPLOAD_SPOOL_MAX_BYTES'] = int(os.getenv('UPLOAD_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+app.config['BATCH_UPLOAD_WORKERS'] = int(os.getenv('BATCH_UPLOAD_WORKERS', 4))
+app.config['BATCH_UPLOAD_MAX_FILES'] = int(os.getenv('BATCH_UPLOAD_MAX_FILES', 50))
+app.config['BATCH_UPLOAD_MAX_BYTES'] = int(os.getenv('BATCH_UPLOAD_MAX_BYTES', 256 * 1024 * 1024))
+app.config['EXTRACT_TOPICS_MAX'] = int(os.getenv('EXTRACT_TOPICS_MAX', 30))
+# Seconds /api/study-pack waits for its concurrent generations (parts not done by then are left out)
+app.config['STUDY_PACK_DEADLINE'] = float(os.getenv('STUDY_PACK_DEADLINE', 90))
+# Near-duplicate materials (other editions, scans, filenames): MinHash similarity needed to
+# count as one, and whether their generated chunks are reused instead of calling Gemini
+app.config['NEAR_DUPLICATE_THRESHOLD'] = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.5))
+app.config['NEAR_DUPLICATE_REUSE'] = os.getenv('NEAR_DUPLICATE_REUSE', 'true').lower() == 'true'
+app.config['NEAR_DUPLICATE_MIN_CHARS'] = int(os.getenv('NEAR_DUPLICATE_MIN_CHARS', 2000))
+app.config['MINHASH_LSH_BANDS'] = int(os.getenv('MINHASH_LSH_BANDS', 32))
+# Outline-guided PDF uploads: extract the topic's pages first, the rest in the background
+app.config['PDF_PARTIAL_EXTRACTION'] = os.getenv('PDF_PARTIAL_EXTRACTION', 'true').lower() == 'true'
+app.config['PDF_PARTIAL_MIN_PAGES'] = int(os.getenv('PDF_PARTIAL_MIN_PAGES', 60))
+app.config['PDF_PARTIAL_MAX_FRACTION'] = float(os.getenv('PDF_PARTIAL_MAX_FRACTION', 0.5))
+# Re-queue upload jobs interrupted by a restart or abandoned by a crashed worker. A worker
+# claims a job atomically before running it and renews a lease on it while it runs, so
+# processes sharing one database only take over jobs whose lease has expired.
+app.config['RESUME_UPLOAD_JOBS'] = os.getenv('RESUME_UPLOAD_JOBS', 'true').lower() == 'true'
+app.config['UPLOAD_JOB_LEASE_SECONDS'] = float(os.getenv('UPLOAD_JOB_LEASE_SECONDS', 120))
 CORS(app)
 
 db = SQLAlchemy(app)
@@ -56,6 +91,10 @@ class LearningMaterial(db.Model):
     topic = db.Column(db.String(200), nullable=True)  # FIXED: Made nullable
     filename = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text)  # Full content stored
+    content_digest = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded file bytes
+    content_index = db.Column(db.Text)  # JSON page/slide/heading offsets into content
+    toc_index = db.Column(db.Text)  # JSON table of contents: chapter/unit/section spans in content
+    minhash = db.Column(db.LargeBinary)  # MinHash signature of content, for near-duplicate detection
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_accessed = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -69,48 +108,781 @@ class LearningSession(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class UploadJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.String(128), nullable=False)
+    topic = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(200))
+    filename = db.Column(db.String(200), nullable=False)
+    filepath = db.Column(db.String(400), nullable=True)  # Spooled upload on disk (None if it fit in memory)
+    content_digest = db.Column(db.String(64))
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    stage = db.Column(db.String(20), default='queued')  # See UPLOAD_JOB_STAGES
+    progress = db.Column(db.Integer, default=0)  # Percentage completed
+    material_id = db.Column(db.Integer, db.ForeignKey('learning_material.id'), nullable=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('learning_session.id'), nullable=True)
+    result = db.Column(db.Text)  # JSON response payload once completed
+    error = db.Column(db.Text)
+    owner = db.Column(db.String(64))  # Worker process (host:pid) that claimed the job
+    heartbeat_at = db.Column(db.DateTime)  # Lease renewed by the owner while the job runs
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Upload pipeline stages and the progress reported when each one starts
+UPLOAD_JOB_STAGES = {
+    'queued': 0,
+    'extracting': 10,
+    'saving': 40,
+    'selecting': 50,
+    'generating': 60,
+    'completed': 100,
+}
+
+# Background workers that run upload jobs off the request thread
+upload_executor = ThreadPoolExecutor(max_workers=app.config['UPLOAD_JOB_WORKERS'],
+                                     thread_name_prefix='upload-job')
+
+# Shared, bounded pool that extracts the files of batch uploads concurrently
+batch_executor = ThreadPoolExecutor(max_workers=app.config['BATCH_UPLOAD_WORKERS'],
+                                    thread_name_prefix='batch-extract')
+# Every PDF shares the one PDF process pool; a batch's concurrent files split it between
+# them instead of each queueing PDF_EXTRACT_WORKERS page ranges on it
+BATCH_PDF_WORKERS = max(1, app.config['PDF_EXTRACT_WORKERS'] // app.config['BATCH_UPLOAD_WORKERS'])
+
+# LSH index of material MinHash signatures, loaded from the database on first use and
+# topped up with materials other worker processes saved since
+material_lsh = LSHIndex(bands=app.config['MINHASH_LSH_BANDS'])
+material_lsh_max_id = 0  # Highest material id loaded from the database
+material_lsh_lock = threading.Lock()
+
 # Helper function to extract content from files
 def extract_file_content(filepath, filename):
     """Extract text content from uploaded files"""
-    content = ""
-    file_ext = filename.lower().split('.')[-1]
-    
     try:
-        if file_ext == 'pdf':
-            with open(filepath, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    content += page.extract_text() + "\n"
-        
-        elif file_ext in ['doc', 'docx']:
-            doc = docx.Document(filepath)
-            for paragraph in doc.paragraphs:
-                content += paragraph.text + "\n"
-        
-        elif file_ext in ['ppt', 'pptx']:
-            prs = Presentation(filepath)
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        content += shape.text + "\n"
-        
-        elif file_ext == 'txt':
-            with open(filepath, 'r', encoding='utf-8') as file:
-                content = file.read()
-    
+        return "".join(iter_stripped_text(iter_file_segments(
+            filepath, filename, pdf_workers=app.config['PDF_EXTRACT_WORKERS'],
+            pdf_backend=app.config['PDF_BACKEND'])))
     except Exception as e:
         print(f"Error extracting content from {filename}: {e}")
-        content = ""
+        return ""
+
+def extract_file_to_cache(source, filename, content_digest, pdf_workers=None):
+    """
+    Stream a file's text straight into the content cache, segment by segment,
+    so the full text is never built in memory. Returns characters written.
+    pdf_workers defaults to PDF_EXTRACT_WORKERS.
+    """
+    stats = {}
+    counts = {}
+    index = ContentIndexBuilder()
+    try:
+        segments = iter_file_segments(source, filename, stats=stats, index=index,
+                                      pdf_workers=pdf_workers or app.config['PDF_EXTRACT_WORKERS'],
+                                      pdf_backend=app.config['PDF_BACKEND'])
+        chars = content_cache.put_stream(content_digest, iter_stripped_text(segments, counts=counts))
+    except Exception as e:
+        print(f"Error extracting content from {filename}: {e}")
+        return 0
+    
+    # Page/slide/heading offsets, so later requests can slice without rescanning
+    content_index = index.build(counts['leading'], counts['length'])
+    if content_index:
+        content_cache.put_meta(content_digest, 'index', content_index)
+    
+    if stats.get('page_times'):
+        print(f"⏱️  PDF extraction: {format_pdf_stats(stats)}")
+    return chars
+
+def _extract_upload_content(source, filename, topic, content_digest, pdf_workers=None):
+    """
+    Stage 1: extract the upload's text into the content cache (skipped on a cache hit).
+    Extraction streams, but the returned text is loaded whole: it is stored on the
+    material and indexed, so memory use here grows with the length of the text.
+    pdf_workers defaults to PDF_EXTRACT_WORKERS.
+    """
+    if content_cache.has(content_digest):
+        print(f"♻️  Cache hit for {filename} ({content_digest[:12]}), skipping extraction")
+    elif source is None:
+        raise RuntimeError("Uploaded file is no longer available. Please upload it again.")
+    else:
+        # Extract FULL content from file
+        print(f"📄 Extracting content from {filename}...")
+        chars = extract_file_to_cache(source, filename, content_digest, pdf_workers)
+        print(f"📝 Extracted {chars} characters")
+        
+        if chars < 50:
+            content_cache.delete(content_digest)
+    
+    full_content = content_cache.get(content_digest)
+    
+    if not full_content or len(full_content.strip()) < 50:
+        print(f"⚠️  Content too short or empty, using fallback")
+        full_content = f"Learning material about {topic}. This file contains important information about {topic} that we'll explore together."
+    else:
+        print(f"✅ Content extracted successfully")
+    
+    return full_content
+
+def load_section_index(full_content, content_digest):
+    """
+    Return the BM25 section index for cached text, building and storing it
+    next to the text on first use. None if the text isn't in the content cache.
+    Parsed indexes are kept in memory, so only the first request per process
+    reads the stored postings.
+    """
+    if not content_digest or not content_cache.has(content_digest):
+        return None
+    
+    section_index = content_extractor.index_cache.get(content_digest)
+    if index_matches(section_index, full_content, content_digest):
+        return section_index
+    
+    section_index = content_cache.get_meta(content_digest, 'sections')
+    if not index_matches(section_index, full_content, content_digest):
+        started = time.perf_counter()
+        section_index = content_extractor.build_section_index(full_content, content_digest)
+        content_cache.put_meta(content_digest, 'sections', section_index)
+        print(f"🗂️  Indexed {len(section_index['spans'])} sections, {len(section_index['postings'])} terms "
+              f"in {time.perf_counter() - started:.2f}s")
+    content_extractor.index_cache.put(content_digest, section_index)
+    return section_index
+
+def load_toc_index(full_content, content_digest=None):
+    """
+    Return the table of contents of a text, reusing the copy stored next to
+    cached text and storing a freshly built one there.
+    """
+    cached = bool(content_digest) and content_cache.has(content_digest)
+    toc_index = content_cache.get_meta(content_digest, 'toc') if cached else None
+    if not toc_matches(toc_index, full_content):
+        toc_index = content_extractor.build_toc_index(full_content)
+        if cached:
+            content_cache.put_meta(content_digest, 'toc', toc_index)
+        print(f"📖 Found {len(toc_index['entries'])} table of contents entries")
+    return toc_index
+
+def _material_signature(full_content):
+    """MinHash signature bytes of a material's text, or None if it's too short to compare"""
+    if not full_content or len(full_content) < app.config['NEAR_DUPLICATE_MIN_CHARS']:
+        return None
+    return signature_to_bytes(minhash_signature(full_content))
+
+def get_material_lsh():
+    """
+    The LSH index of all materials' signatures. The index is per process, so each
+    call compares it with the number of stored signatures (one COUNT query) and,
+    when it is behind, loads the materials saved since by other workers. A full
+    reload covers anything else (e.g. signatures backfilled into older rows).
+    Signatures another worker replaced in place are refreshed when this process
+    next saves that material.
+    """
+    global material_lsh_max_id
+    with material_lsh_lock:
+        signed = db.session.query(LearningMaterial.id, LearningMaterial.minhash).filter(
+            LearningMaterial.minhash.isnot(None))
+        stored = signed.with_entities(db.func.count(LearningMaterial.id)).scalar()
+        if stored == len(material_lsh):
+            return material_lsh
+        
+        rows = signed.filter(LearningMaterial.id > material_lsh_max_id).all()
+        rows = [(material_id, minhash) for material_id, minhash in rows if material_id not in material_lsh]
+        if len(material_lsh) + len(rows) != stored:
+            material_lsh.clear()
+            rows = signed.all()
+        for material_id, minhash in rows:
+            material_lsh.add(material_id, signature_from_bytes(minhash))
+            material_lsh_max_id = max(material_lsh_max_id, material_id)
+        print(f"🧬 Loaded {len(rows)} material signatures into the LSH index")
+    return material_lsh
+
+def index_material(material):
+    """Add a committed material's signature to the LSH index (or drop a stale one)"""
+    if material.minhash:
+        get_material_lsh().add(material.id, signature_from_bytes(material.minhash))
+    else:
+        get_material_lsh().remove(material.id)
+
+def near_duplicate_threshold(threshold=None):
+    """
+    The similarity threshold near-duplicate lookups use: NEAR_DUPLICATE_THRESHOLD by
+    default, and never below the LSH index's candidate threshold (less similar
+    materials are rarely LSH candidates, so a lower threshold wouldn't find them)
+    """
+    threshold = app.config['NEAR_DUPLICATE_THRESHOLD'] if threshold is None else threshold
+    return max(threshold, material_lsh.candidate_threshold)
+
+def find_near_duplicates(material_id, minhash, threshold=None):
+    """(material_id, similarity) of other materials whose text is a near-duplicate, most similar first"""
+    if not minhash:
+        return []
+    return get_material_lsh().query(signature_from_bytes(minhash), near_duplicate_threshold(threshold),
+                                    exclude=material_id)
+
+def _topic_key(topic):
+    """Topics compare case- and whitespace-insensitively ("Chapter 5" == "chapter  5")"""
+    return ' '.join((topic or '').lower().split())
+
+def _reusable_chunks(material, topic):
+    """
+    Chunks already generated for this topic from a near-duplicate material.
+    Returns (chunks, source_material_id, similarity), or None.
+    """
+    topic_key = _topic_key(topic)
+    for other_id, similarity in find_near_duplicates(material.id, material.minhash):
+        # Normalise the stored topics the same way (SQL can't collapse whitespace);
+        # a material has a handful of sessions, so compare them here
+        sessions = (db.session.query(LearningSession.id, LearningSession.topic)
+                    .filter(LearningSession.material_id == other_id, LearningSession.chunks.isnot(None))
+                    .order_by(LearningSession.created_at.desc())
+                    .all())
+        session_id = next((session_id for session_id, session_topic in sessions
+                           if _topic_key(session_topic) == topic_key), None)
+        chunks = json.loads(db.session.get(LearningSession, session_id).chunks) if session_id else None
+        if chunks:
+            return chunks, other_id, similarity
+    return None
+
+def _serialize_toc(toc_index):
+    """Chapter list for the topic picker (headings and sizes, no content)"""
+    return [{
+        "id": entry_id,
+        "title": entry['title'],
+        "kind": entry['kind'],
+        "number": entry['number'],
+        "level": entry['level'],
+        "parent": entry['parent'],
+        "length": entry['end'] - entry['start']
+    } for entry_id, entry in enumerate(toc_index['entries'])] if toc_index else []
+
+def _extract_topic_pages(source, filename, topic):
+    """
+    Stage 1 (outline mode): read the PDF's bookmarks and page labels, and extract
+    only the pages the topic points at. Returns their text, or None when the
+    whole file should be extracted instead (no match, small PDF, not a PDF).
+    """
+    if not app.config['PDF_PARTIAL_EXTRACTION'] or not filename.lower().endswith('.pdf'):
+        return None
+    
+    try:
+        started = time.perf_counter()
+        sections, page_labels, page_count = read_pdf_outline(source)
+        if page_count < app.config['PDF_PARTIAL_MIN_PAGES']:
+            return None
+        
+        ranges = [(max(start, 0), min(end, page_count - 1))
+                  for start, end in content_extractor.find_topic_pages(topic, sections, page_labels)
+                  if start < page_count and end >= 0]
+        selected_pages = sum(end - start + 1 for start, end in ranges)
+        if not ranges or selected_pages > page_count * app.config['PDF_PARTIAL_MAX_FRACTION']:
+            return None
+        
+        if not isinstance(source, str):
+            source.seek(0)
+        page_texts = [text for _, text in iter_pdf_page_ranges(source, ranges, app.config['PDF_BACKEND'])]
+        content = "\n".join(page_texts).strip()
+    except Exception as e:
+        print(f"⚠️  Outline-guided extraction failed for {filename}, extracting everything: {e}")
+        return None
+    finally:
+        if not isinstance(source, str):
+            source.seek(0)
+    
+    if len(content) < 50:
+        return None
+    
+    page_list = ", ".join(f"{start + 1}-{end + 1}" for start, end in ranges)
+    print(f"📑 Outline match for '{topic}': pages {page_list} ({selected_pages}/{page_count}) "
+          f"extracted in {time.perf_counter() - started:.2f}s, rest deferred")
+    return content
+
+def complete_partial_extraction(material_id, filename, content_digest, spool=None, filepath=None):
+    """
+    Background follow-up to an outline-guided upload: extract the whole PDF into
+    the content cache and swap the full text (and page index) into the material.
+    Owns the spool / spooled file and cleans it up.
+    """
+    with app.app_context():
+        try:
+            source = spool.source() if spool is not None else filepath
+            chars = extract_file_to_cache(source, filename, content_digest)
+            if chars < 50:
+                content_cache.delete(content_digest)
+                return
+            
+            material = db.session.get(LearningMaterial, material_id)
+            if material:
+                content_index = content_cache.get_meta(content_digest, 'index')
+                material.content = content_cache.get(content_digest)
+                material.content_index = json.dumps(content_index) if content_index else None
+                material.toc_index = json.dumps(load_toc_index(material.content, content_digest))
+                material.minhash = _material_signature(material.content)
+                db.session.commit()
+                index_material(material)
+                load_section_index(material.content, content_digest)
+            print(f"📚 Full text of {filename} extracted in the background ({chars} characters)")
+        except Exception as e:
+            print(f"❌ Background extraction of {filename} failed: {e}")
+            db.session.rollback()
+        finally:
+            if spool is not None:
+                spool.close()
+            elif filepath and os.path.exists(filepath):
+                os.remove(filepath)
+            db.session.remove()
+
+def _stage_material(user_id, title, topic, filename, full_content, content_digest, content_index=None):
+    """Create or update a LearningMaterial row in the session without committing. Returns (material, is_new)."""
+    toc_index = json.dumps(load_toc_index(full_content, content_digest))
+    minhash = _material_signature(full_content)
+    
+    # Check if this material already exists (same name or same bytes)
+    existing_material = LearningMaterial.query.filter(
+        LearningMaterial.user_id == user_id,
+        db.or_(LearningMaterial.filename == filename,
+               LearningMaterial.content_digest == content_digest)
+    ).first()
+    
+    if existing_material:
+        # Update existing material
+        print(f"📚 Material already exists, updating...")
+        existing_material.content = full_content
+        existing_material.content_digest = content_digest
+        existing_material.content_index = json.dumps(content_index) if content_index else None
+        existing_material.toc_index = toc_index
+        existing_material.minhash = minhash
+        existing_material.topic = topic  # Update topic as well
+        existing_material.last_accessed = datetime.utcnow()
+        material = existing_material
+    else:
+        # Save NEW material to database with FULL content
+        material = LearningMaterial(
+            user_id=user_id,
+            title=title,
+            topic=topic,  # FIXED: Add topic field
+            filename=filename,
+            content=full_content,  # Store full content
+            content_digest=content_digest,
+            content_index=json.dumps(content_index) if content_index else None,
+            toc_index=toc_index,
+            minhash=minhash
+        )
+        db.session.add(material)
+    
+    return material, existing_material is None
+
+def _save_material(user_id, title, topic, filename, full_content, content_digest, content_index=None):
+    """Stage 2: create or update the LearningMaterial row. Returns (material, is_new)."""
+    material, is_new = _stage_material(user_id, title, topic, filename, full_content,
+                                       content_digest, content_index)
+    db.session.commit()
+    index_material(material)
+    print(f"💾 Material saved with ID: {material.id}")
+    return material, is_new
+
+def _select_topic_content(full_content, topic, content_index=None, section_index=None, content_digest=None):
+    """Stage 3: SMART EXTRACTION - keep only topic-relevant content"""
+    print(f"🔍 Extracting topic-relevant content for: {topic}")
+    relevant_content = content_extractor.extract_topic_content(full_content, topic, content_index=content_index,
+                                                               section_index=section_index,
+                                                               content_digest=content_digest)
+    print(f"✂️  Extracted {len(relevant_content)} characters (from {len(full_content)})")
+    print(f"📊 Reduction: {100 - int(len(relevant_content)/len(full_content)*100)}%")
+    return relevant_content
+
+def _generate_upload_chunks(relevant_content, topic):
+    """Stage 4: generate learning chunks using ONLY relevant content"""
+    chunks = []
+    if gemini_service:
+        try:
+            print(f"🤖 Generating chunks with Gemini for topic: {topic}")
+            chunks = gemini_service.generate_learning_chunks(relevant_content, topic)
+            print(f"✅ Generated {len(chunks)} chunks for topic: {topic}")
+            if chunks:
+                print(f"📌 First chunk title: {chunks[0].get('title', 'N/A')}")
+        except Exception as e:
+            print(f"❌ Error generating chunks: {e}")
+            import traceback
+            traceback.print_exc()
+            chunks = []
+    else:
+        print(f"⚠️  Gemini service not available")
+    
+    # Fallback chunks if Gemini fails or no chunks generated
+    if not chunks or len(chunks) == 0:
+        print(f"⚠️  Using fallback chunks (Gemini returned {len(chunks) if chunks else 0} chunks)")
+        chunks = generate_upload_fallback_chunks(topic, relevant_content)
+    
+    return chunks
+
+def generate_upload_fallback_chunks(topic, content):
+    """Generate the full fallback course outline for a fresh upload"""
+    # Extract more content for fallback
+    content_preview = content[:1000] if content else f"Learning material about {topic}"
+    
+    # Try to create more meaningful fallback based on actual content
+    return [
+        {
+            "id": 1,
+            "title": f"🎯 Introduction to {topic}",
+            "content": f"""
+            <h3>🎯 Understanding {topic}</h3>
+            <p>Welcome to your comprehensive guide on <strong>{topic}</strong>.</p>
+            <p><em>This material covers essential concepts and practical applications.</em></p>
+            <h3>📚 Content Overview</h3>
+            <p>{content_preview[:400] if len(content_preview) > 400 else content_preview}</p>
+            <h3>🔑 What You'll Master</h3>
+            <ul>
+            <li>Fundamental concepts and definitions</li>
+            <li>Core principles and methodologies</li>
+            <li>Practical examples and use cases</li>
+            <li>Advanced techniques and best practices</li>
+            </ul>
+            """,
+            "estimated_time": "8 min",
+            "objectives": ["Understand core concepts", "Learn fundamental principles", "Grasp key terminology"]
+        },
+        {
+            "id": 2,
+            "title": f"📖 Deep Dive into {topic}",
+            "content": f"""
+            <h3>📖 Core Concepts and Details</h3>
+            <p>Let's explore the <strong>detailed aspects</strong> of {topic}.</p>
+            <p>{content_preview[400:800] if len(content_preview) > 800 else content_preview[400:] if len(content_preview) > 400 else "This section covers the main concepts in detail."}</p>
+            <h3>💡 Key Principles</h3>
+            <ul>
+            <li><strong>Foundation:</strong> Building blocks and basic structure</li>
+            <li><strong>Methodology:</strong> How to approach and apply concepts</li>
+            <li><strong>Techniques:</strong> Specific methods and approaches</li>
+            <li><strong>Standards:</strong> Best practices and conventions</li>
+            </ul>
+            <p><em>Understanding these principles is crucial for mastery.</em></p>
+            """,
+            "estimated_time": "12 min",
+            "objectives": ["Master detailed concepts", "Understand methodologies", "Learn techniques"]
+        },
+        {
+            "id": 3,
+            "title": f"⚡ Advanced Topics in {topic}",
+            "content": f"""
+            <h3>⚡ Advanced Concepts</h3>
+            <p>Now we'll cover <strong>advanced aspects</strong> and deeper understanding of {topic}.</p>
+            <p>{content_preview[800:1200] if len(content_preview) > 1200 else content_preview[800:] if len(content_preview) > 800 else "Advanced topics build on the fundamentals."}</p>
+            <h3>🚀 Advanced Techniques</h3>
+            <ul>
+            <li>Complex scenarios and solutions</li>
+            <li>Optimization and efficiency</li>
+            <li>Edge cases and special considerations</li>
+            <li>Integration with other concepts</li>
+            </ul>
+            """,
+            "estimated_time": "10 min",
+            "objectives": ["Master advanced concepts", "Handle complex scenarios", "Optimize solutions"]
+        },
+        {
+            "id": 4,
+            "title": f"💼 Practical Applications",
+            "content": f"""
+            <h3>💼 Real-World Applications</h3>
+            <p>Let's see how <strong>{topic}</strong> is applied in real-world scenarios.</p>
+            <h3>✨ Use Cases</h3>
+            <ul>
+            <li><strong>Industry Applications:</strong> How professionals use this daily</li>
+            <li><strong>Common Patterns:</strong> Frequently used approaches</li>
+            <li><strong>Problem Solving:</strong> Applying concepts to solve real problems</li>
+            <li><strong>Case Studies:</strong> Examples from actual projects</li>
+            </ul>
+            <p><em>These practical examples help solidify your understanding.</em></p>
+            <h3>🎯 Implementation Tips</h3>
+            <ul>
+            <li>Start with simple examples</li>
+            <li>Build complexity gradually</li>
+            <li>Test your understanding with practice</li>
+            <li>Apply to your own projects</li>
+            </ul>
+            """,
+            "estimated_time": "10 min",
+            "objectives": ["Apply knowledge practically", "Understand real use cases", "Solve real problems"]
+        },
+        {
+            "id": 5,
+            "title": f"🎓 Mastery and Next Steps",
+            "content": f"""
+            <h3>🎓 Achieving Mastery</h3>
+            <p>You've covered the essentials of <strong>{topic}</strong>. Now let's consolidate your knowledge.</p>
+            <h3>📝 Key Takeaways</h3>
+            <ul>
+            <li>Core concepts and their relationships</li>
+            <li>Practical applications and use cases</li>
+            <li>Best practices and common patterns</li>
+            <li>Advanced techniques for complex scenarios</li>
+            </ul>
+            <h3>🚀 Continue Your Learning</h3>
+            <p><em>To truly master {topic}, consider:</em></p>
+            <ul>
+            <li><strong>Practice:</strong> Apply concepts to real projects</li>
+            <li><strong>Explore:</strong> Dive deeper into advanced topics</li>
+            <li><strong>Build:</strong> Create your own examples and solutions</li>
+            <li><strong>Share:</strong> Teach others to reinforce your knowledge</li>
+            </ul>
+            <p>Remember: Mastery comes from consistent practice and application!</p>
+            """,
+            "estimated_time": "8 min",
+            "objectives": ["Consolidate knowledge", "Plan next steps", "Build confidence"]
+        }
+    ]
+
+def _set_job_stage(job, stage, **fields):
+    """Move a job to a pipeline stage and persist it immediately so pollers see it"""
+    job.stage = stage
+    job.progress = UPLOAD_JOB_STAGES[stage]
+    job.heartbeat_at = datetime.utcnow()
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.session.commit()
+
+def upload_worker_id():
+    """Owner name of the jobs this process claims (host and pid, so forked workers differ)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _lease_cutoff():
+    """Leases renewed before this time have expired"""
+    return datetime.utcnow() - timedelta(seconds=app.config['UPLOAD_JOB_LEASE_SECONDS'])
+
+def claim_upload_job(job_id):
+    """
+    Atomically take ownership of a queued job, or of a running one whose owner
+    stopped renewing its lease. Returns False if the job is finished or another
+    worker holds it.
+    """
+    claimable = db.or_(
+        UploadJob.status == 'queued',
+        db.and_(UploadJob.status == 'running',
+                db.or_(UploadJob.heartbeat_at.is_(None), UploadJob.heartbeat_at < _lease_cutoff()))
+    )
+    claimed = UploadJob.query.filter(UploadJob.id == job_id, claimable).update(
+        {'status': 'running', 'owner': upload_worker_id(), 'heartbeat_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+def run_upload_job(job_id, spool=None):
+    """
+    Run an upload job through every pipeline stage (executes on the worker pool).
+    spool is the in-process upload buffer; resumed jobs fall back to job.filepath.
+    """
+    with app.app_context():
+        resuming_upload_jobs.discard(job_id)
+        job = db.session.get(UploadJob, job_id)
+        if not job:
+            print(f"⚠️  Upload job {job_id} not found")
+            return
+        
+        if not claim_upload_job(job_id):
+            print(f"⏭️  Upload job {job_id} is already taken, skipping")
+            if spool is not None:
+                # The worker that has the job reads the spooled file - leave it on disk
+                spool.close(delete=False)
+            return
+        
+        source_handed_off = False
+        try:
+            if spool is not None:
+                source = spool.source()
+            elif job.filepath and os.path.exists(job.filepath):
+                source = job.filepath
+            else:
+                source = None
+            content_digest = job.content_digest
+            if source is None and not content_cache.has(content_digest):
+                raise FileNotFoundError('Uploaded file was lost during a server restart. Please upload it again.')
+            
+            _set_job_stage(job, 'extracting')
+            
+            # Big PDFs with a matching outline: only the topic's pages now, the rest later
+            partial_content = None
+            if source is not None and not content_cache.has(content_digest):
+                partial_content = _extract_topic_pages(source, job.filename, job.topic)
+            
+            if partial_content:
+                full_content, content_index, section_index = partial_content, None, None
+            else:
+                full_content = _extract_upload_content(source, job.filename, job.topic, content_digest)
+                content_index = content_cache.get_meta(content_digest, 'index')
+                section_index = load_section_index(full_content, content_digest)
+            
+            _set_job_stage(job, 'saving')
+            material, is_new_upload = _save_material(job.user_id, job.title, job.topic, job.filename,
+                                                     full_content, content_digest, content_index)
+            
+            _set_job_stage(job, 'selecting', material_id=material.id)
+            # The file digest identifies the text only when it came from the content cache
+            relevant_content = _select_topic_content(full_content, job.topic, content_index, section_index,
+                                                     content_digest if section_index else None)
+            # Only the bounded topic excerpt is needed from here on
+            del full_content, section_index
+            
+            _set_job_stage(job, 'generating')
+            reused = _reusable_chunks(material, job.topic) if app.config['NEAR_DUPLICATE_REUSE'] else None
+            if reused:
+                chunks, source_material_id, similarity = reused
+                print(f"♻️  Reusing {len(chunks)} chunks from near-duplicate material {source_material_id} "
+                      f"(similarity {similarity:.2f})")
+            else:
+                chunks = _generate_upload_chunks(relevant_content, job.topic)
+            
+            # Save learning session together with the job result
+            session = LearningSession(
+                material_id=material.id,
+                user_id=job.user_id,
+                topic=job.topic,
+                chunks=json.dumps(chunks),  # Store chunks as JSON
+                progress=0
+            )
+            db.session.add(session)
+            db.session.flush()
+            
+            result = {
+                "message": "File uploaded successfully",
+                "material_id": material.id,
+                "session_id": session.id,
+                "topic": job.topic,
+                "title": job.title,
+                "filename": job.filename,
+                "content_preview": relevant_content[:200] if relevant_content else "",
+                "chunks": chunks,
+                "content_digest": content_digest,
+                "extraction": "partial" if partial_content else "full",
+                "reused_from": {"material_id": reused[1], "similarity": round(reused[2], 3)} if reused else None,
+                "is_new_upload": is_new_upload
+            }
+            job.status = 'completed'
+            _set_job_stage(job, 'completed', session_id=session.id, result=json.dumps(result))
+            
+            print(f"📤 Upload job {job_id} completed with {len(chunks)} chunks")
+            print(f"📋 Session ID: {session.id}, Material ID: {material.id}")
+            
+            if partial_content:
+                # Hand the upload bytes over to the background extraction
+                upload_executor.submit(complete_partial_extraction, material.id, job.filename,
+                                       content_digest, spool, None if spool is not None else job.filepath)
+                spool = None
+                source_handed_off = True
+        
+        except Exception as e:
+            print(f"❌ Upload job {job_id} failed: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            job = db.session.get(UploadJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            db.session.commit()
+        
+        finally:
+            if spool is not None:
+                spool.close()
+            elif (not source_handed_off and job.status in ('completed', 'failed')
+                  and job.filepath and os.path.exists(job.filepath)):
+                # The extracted text lives in the content cache now
+                os.remove(job.filepath)
+            db.session.remove()
+
+# Abandoned jobs submitted by resume_upload_jobs that haven't started yet
+resuming_upload_jobs = set()
+
+def resume_upload_jobs():
+    """
+    Queue the jobs nobody is working on: queued for longer than a lease (their
+    process stopped before starting them) or running with an expired lease.
+    run_upload_job claims each one atomically, so every worker can scan at once.
+    """
+    cutoff = _lease_cutoff()
+    abandoned = UploadJob.query.with_entities(UploadJob.id).filter(db.or_(
+        db.and_(UploadJob.status == 'queued', UploadJob.updated_at < cutoff),
+        db.and_(UploadJob.status == 'running',
+                db.or_(UploadJob.heartbeat_at.is_(None), UploadJob.heartbeat_at < cutoff))
+    )).all()
+    job_ids = [job_id for job_id, in abandoned if job_id not in resuming_upload_jobs]
+    for job_id in job_ids:
+        resuming_upload_jobs.add(job_id)
+        upload_executor.submit(run_upload_job, job_id)
+    
+    if job_ids:
+        print(f"🔁 Resumed {len(job_ids)} pending upload job(s)")
+    return job_ids
+
+def monitor_upload_jobs():
+    """Background loop: renew the leases of this process's running jobs and pick up abandoned ones"""
+    while True:
+        time.sleep(app.config['UPLOAD_JOB_LEASE_SECONDS'] / 3)
+        with app.app_context():
+            try:
+                UploadJob.query.filter_by(status='running', owner=upload_worker_id()).update(
+                    {'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                db.session.commit()
+                if app.config['RESUME_UPLOAD_JOBS']:
+                    resume_upload_jobs()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️  Upload job monitor: {e}")
+
+upload_job_recovery_pid = None
+upload_job_recovery_lock = threading.Lock()
+
+def start_upload_job_recovery():
+    """
+    Once per process: resume pending jobs and start the lease monitor (by pid, so
+    workers forked from a parent that already ran this start their own).
+    """
+    global upload_job_recovery_pid
+    with upload_job_recovery_lock:
+        if upload_job_recovery_pid == os.getpid():
+            return
+        upload_job_recovery_pid = os.getpid()
     
-    return content.strip()
+    threading.Thread(target=monitor_upload_jobs, name='upload-job-monitor', daemon=True).start()
+    if not app.config['RESUME_UPLOAD_JOBS']:
+        return
+    with app.app_context():
+        try:
+            from sqlalchemy import inspect
+            if not inspect(db.engine).has_table('upload_job'):
+                return  # New database; the tables are created later
+            resume_upload_jobs()
+        except Exception as e:
+            print(f"⚠️  Could not resume upload jobs: {e}")
+
+@app.before_request
+def ensure_upload_job_recovery():
+    # Pre-forking servers may import the app before forking, and threads don't survive a fork
+    start_upload_job_recovery()
 
 # Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy", "message": "Backend is running!"})
 
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and memory use of the caches, for monitoring"""
+    stats = {"content_extractor": content_extractor.cache_stats()}
+    if gemini_service and gemini_service.response_cache:
+        stats["gemini_responses"] = gemini_service.response_cache.stats()
+    if gemini_service:
+        stats["gemini_coalescing"] = gemini_service.single_flight.stats()
+    return jsonify(stats)
+
+@app.route('/api/rate-limit', methods=['GET'])
+def rate_limit_status():
+    """Gemini rate limiter state: available requests/tokens, queue length and next free slot"""
+    if not gemini_service:
+        return jsonify({"error": "Gemini service not available"}), 503
+    return jsonify(gemini_service.rate_limiter.status())
+
 @app.route('/api/upload-material', methods=['POST'])
 def upload_material():
+    """Accept an upload and queue it for processing. Poll /api/jobs/<job_id> for the result."""
     try:
         if 'file' not in request.files:
             return jsonify({"error": "No file provided"}), 400
@@ -124,224 +896,215 @@ def upload_material():
             return jsonify({"error": "No file selected"}), 400
         
         if file and topic:
+            job_id = uuid.uuid4().hex
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
             
-            # Extract FULL content from file
-            print(f"📄 Extracting content from {filename}...")
-            full_content = extract_file_content(filepath, filename)
-            print(f"📝 Extracted {len(full_content)} characters")
-            
-            if not full_content or len(full_content.strip()) < 50:
-                print(f"⚠️  Content too short or empty, using fallback")
-                full_content = f"Learning material about {topic}. This file contains important information about {topic} that we'll explore together."
-            else:
-                print(f"✅ Content extracted successfully")
-            
-            # Check if this material already exists
-            existing_material = LearningMaterial.query.filter_by(
-                user_id=user_id,
-                filename=filename
-            ).first()
+            # Stream the upload into a bounded spool while hashing it - large files
+            # roll over to disk, and the parsers read straight from the spool
+            spool, content_digest = spool_upload(
+                file.stream,
+                max_size=app.config['UPLOAD_SPOOL_MAX_BYTES'],
+                dir=app.config['UPLOAD_FOLDER'],
+                suffix=f"_{filename}"
+            )
             
-            if existing_material:
-                # Update existing material
-                print(f"📚 Material already exists, updating...")
-                existing_material.content = full_content
-                existing_material.topic = topic  # Update topic as well
-                existing_material.last_accessed = datetime.utcnow()
-                material = existing_material
+            if content_cache.has(content_digest):
+                # Already extracted once - the bytes aren't needed
+                spool.close()
+                spool = None
             else:
-                # Save NEW material to database with FULL content
-                material = LearningMaterial(
-                    user_id=user_id,
-                    title=title,
-                    topic=topic,  # FIXED: Add topic field
-                    filename=filename,
-                    content=full_content  # Store full content
-                )
-                db.session.add(material)
+                # Persist small uploads too before accepting the job, so a restart can resume it
+                spool.rollover()
             
+            job = UploadJob(
+                id=job_id,
+                user_id=str(user_id),
+                topic=topic,
+                title=title,
+                filename=filename,
+                filepath=spool.path if spool else None,
+                content_digest=content_digest
+            )
+            db.session.add(job)
             db.session.commit()
-            print(f"💾 Material saved with ID: {material.id}")
             
-            # SMART EXTRACTION: Extract only topic-relevant content
-            print(f"🔍 Extracting topic-relevant content for: {topic}")
-            relevant_content = content_extractor.extract_topic_content(full_content, topic)
-            print(f"✂️  Extracted {len(relevant_content)} characters (from {len(full_content)})")
-            print(f"📊 Reduction: {100 - int(len(relevant_content)/len(full_content)*100)}%")
+            upload_executor.submit(run_upload_job, job_id, spool)
+            print(f"📥 Queued upload job {job_id} for {filename}")
             
-            # Generate learning chunks using ONLY relevant content
-            chunks = []
-            if gemini_service:
-                try:
-                    print(f"🤖 Generating chunks with Gemini for topic: {topic}")
-                    chunks = gemini_service.generate_learning_chunks(relevant_content, topic)
-                    print(f"✅ Generated {len(chunks)} chunks for topic: {topic}")
-                    if chunks:
-                        print(f"📌 First chunk title: {chunks[0].get('title', 'N/A')}")
-                except Exception as e:
-                    print(f"❌ Error generating chunks: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    chunks = []
-            else:
-                print(f"⚠️  Gemini service not available")
-            
-            # Fallback chunks if Gemini fails or no chunks generated
-            if not chunks or len(chunks) == 0:
-                print(f"⚠️  Using fallback chunks (Gemini returned {len(chunks) if chunks else 0} chunks)")
-                
-                # Extract more content for fallback
-                content_parts = content.split('\n\n') if content else []
-                content_preview = content[:1000] if content else f"Learning material about {topic}"
-                
-                # Try to create more meaningful fallback based on actual content
-                chunks = [
-                    {
-                        "id": 1,
-                        "title": f"🎯 Introduction to {topic}",
-                        "content": f"""
-                        <h3>🎯 Understanding {topic}</h3>
-                        <p>Welcome to your comprehensive guide on <strong>{topic}</strong>.</p>
-                        <p><em>This material covers essential concepts and practical applications.</em></p>
-                        <h3>📚 Content Overview</h3>
-                        <p>{content_preview[:400] if len(content_preview) > 400 else content_preview}</p>
-                        <h3>🔑 What You'll Master</h3>
-                        <ul>
-                        <li>Fundamental concepts and definitions</li>
-                        <li>Core principles and methodologies</li>
-                        <li>Practical examples and use cases</li>
-                        <li>Advanced techniques and best practices</li>
-                        </ul>
-                        """,
-                        "estimated_time": "8 min",
-                        "objectives": ["Understand core concepts", "Learn fundamental principles", "Grasp key terminology"]
-                    },
-                    {
-                        "id": 2,
-                        "title": f"📖 Deep Dive into {topic}",
-                        "content": f"""
-                        <h3>📖 Core Concepts and Details</h3>
-                        <p>Let's explore the <strong>detailed aspects</strong> of {topic}.</p>
-                        <p>{content_preview[400:800] if len(content_preview) > 800 else content_preview[400:] if len(content_preview) > 400 else "This section covers the main concepts in detail."}</p>
-                        <h3>💡 Key Principles</h3>
-                        <ul>
-                        <li><strong>Foundation:</strong> Building blocks and basic structure</li>
-                        <li><strong>Methodology:</strong> How to approach and apply concepts</li>
-                        <li><strong>Techniques:</strong> Specific methods and approaches</li>
-                        <li><strong>Standards:</strong> Best practices and conventions</li>
-                        </ul>
-                        <p><em>Understanding these principles is crucial for mastery.</em></p>
-                        """,
-                        "estimated_time": "12 min",
-                        "objectives": ["Master detailed concepts", "Understand methodologies", "Learn techniques"]
-                    },
-                    {
-                        "id": 3,
-                        "title": f"⚡ Advanced Topics in {topic}",
-                        "content": f"""
-                        <h3>⚡ Advanced Concepts</h3>
-                        <p>Now we'll cover <strong>advanced aspects</strong> and deeper understanding of {topic}.</p>
-                        <p>{content_preview[800:1200] if len(content_preview) > 1200 else content_preview[800:] if len(content_preview) > 800 else "Advanced topics build on the fundamentals."}</p>
-                        <h3>🚀 Advanced Techniques</h3>
-                        <ul>
-                        <li>Complex scenarios and solutions</li>
-                        <li>Optimization and efficiency</li>
-                        <li>Edge cases and special considerations</li>
-                        <li>Integration with other concepts</li>
-                        </ul>
-                        """,
-                        "estimated_time": "10 min",
-                        "objectives": ["Master advanced concepts", "Handle complex scenarios", "Optimize solutions"]
-                    },
-                    {
-                        "id": 4,
-                        "title": f"💼 Practical Applications",
-                        "content": f"""
-                        <h3>💼 Real-World Applications</h3>
-                        <p>Let's see how <strong>{topic}</strong> is applied in real-world scenarios.</p>
-                        <h3>✨ Use Cases</h3>
-                        <ul>
-                        <li><strong>Industry Applications:</strong> How professionals use this daily</li>
-                        <li><strong>Common Patterns:</strong> Frequently used approaches</li>
-                        <li><strong>Problem Solving:</strong> Applying concepts to solve real problems</li>
-                        <li><strong>Case Studies:</strong> Examples from actual projects</li>
-                        </ul>
-                        <p><em>These practical examples help solidify your understanding.</em></p>
-                        <h3>🎯 Implementation Tips</h3>
-                        <ul>
-                        <li>Start with simple examples</li>
-                        <li>Build complexity gradually</li>
-                        <li>Test your understanding with practice</li>
-                        <li>Apply to your own projects</li>
-                        </ul>
-                        """,
-                        "estimated_time": "10 min",
-                        "objectives": ["Apply knowledge practically", "Understand real use cases", "Solve real problems"]
-                    },
-                    {
-                        "id": 5,
-                        "title": f"🎓 Mastery and Next Steps",
-                        "content": f"""
-                        <h3>🎓 Achieving Mastery</h3>
-                        <p>You've covered the essentials of <strong>{topic}</strong>. Now let's consolidate your knowledge.</p>
-                        <h3>📝 Key Takeaways</h3>
-                        <ul>
-                        <li>Core concepts and their relationships</li>
-                        <li>Practical applications and use cases</li>
-                        <li>Best practices and common patterns</li>
-                        <li>Advanced techniques for complex scenarios</li>
-                        </ul>
-                        <h3>🚀 Continue Your Learning</h3>
-                        <p><em>To truly master {topic}, consider:</em></p>
-                        <ul>
-                        <li><strong>Practice:</strong> Apply concepts to real projects</li>
-                        <li><strong>Explore:</strong> Dive deeper into advanced topics</li>
-                        <li><strong>Build:</strong> Create your own examples and solutions</li>
-                        <li><strong>Share:</strong> Teach others to reinforce your knowledge</li>
-                        </ul>
-                        <p>Remember: Mastery comes from consistent practice and application!</p>
-                        """,
-                        "estimated_time": "8 min",
-                        "objectives": ["Consolidate knowledge", "Plan next steps", "Build confidence"]
-                    }
-                ]
-            
-            # Save learning session
-            session = LearningSession(
-                material_id=material.id,
-                user_id=user_id,
-                topic=topic,
-                chunks=json.dumps(chunks),  # Store chunks as JSON
-                progress=0
+            return jsonify(_serialize_job(job)), 202
+        
+        return jsonify({"error": "Missing file or topic"}), 400
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _extract_batch_file(spool, filename, topic, content_digest, submitted_at):
+    """Batch worker: extract one spooled file into the content cache (no database access)"""
+    started = time.perf_counter()
+    try:
+        source = spool.source() if spool is not None else None
+        full_content = _extract_upload_content(source, filename, topic, content_digest, BATCH_PDF_WORKERS)
+        content_index = content_cache.get_meta(content_digest, 'index')
+        # Index now so the first topic request on this material doesn't pay for it
+        load_section_index(full_content, content_digest)
+        return {
+            'full_content': full_content,
+            'content_index': content_index,
+            'queue_ms': round((started - submitted_at) * 1000, 1),
+            'extract_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+    finally:
+        if spool is not None:
+            spool.close()
+
+@app.route('/api/upload-materials', methods=['POST'])
+def upload_materials_batch():
+    """
+    Upload several files at once (e.g. a whole course folder).
+    Form fields: files (repeated), topics (repeated, one per file) or a single
+    topic for all, optional titles (repeated) and user_id.
+    Files are extracted concurrently on the shared batch pool and every
+    LearningMaterial row is committed in a single transaction.
+    """
+    batch_started = time.perf_counter()
+    if request.content_length and request.content_length > app.config['BATCH_UPLOAD_MAX_BYTES']:
+        return jsonify({"error": f"Batch uploads are limited to {app.config['BATCH_UPLOAD_MAX_BYTES']} bytes"}), 413
+    try:
+        files = [f for f in request.files.getlist('files') if f and f.filename]
+        if not files:
+            return jsonify({"error": "No files provided"}), 400
+        if len(files) > app.config['BATCH_UPLOAD_MAX_FILES']:
+            return jsonify({"error": f"At most {app.config['BATCH_UPLOAD_MAX_FILES']} files per batch"}), 400
+        
+        topics = request.form.getlist('topics')
+        default_topic = request.form.get('topic')
+        if not default_topic and len(topics) != len(files):
+            return jsonify({"error": "Provide one topic per file (topics) or a single topic"}), 400
+        titles = request.form.getlist('titles')
+        user_id = request.form.get('user_id', 1)
+        
+        # Spool and hash every upload on the request thread, then fan extraction out
+        entries = []
+        for position, file in enumerate(files):
+            spool_started = time.perf_counter()
+            filename = secure_filename(file.filename)
+            spool, content_digest = spool_upload(
+                file.stream,
+                max_size=app.config['UPLOAD_SPOOL_MAX_BYTES'],
+                dir=app.config['UPLOAD_FOLDER'],
+                suffix=f"_{filename}"
             )
-            db.session.add(session)
-            db.session.commit()
+            cached = content_cache.has(content_digest)
+            if cached:
+                spool.close()
+                spool = None
             
-            response_data = {
-                "message": "File uploaded successfully",
-                "material_id": material.id,
-                "session_id": session.id,
-                "topic": topic,
-                "title": title,
-                "filename": filename,
-                "content_preview": relevant_content[:200] if relevant_content else "",
-                "chunks": chunks,
-                "is_new_upload": existing_material is None
+            topic = topics[position] if position < len(topics) and topics[position] else default_topic
+            entries.append({
+                'filename': filename,
+                'title': titles[position] if position < len(titles) and titles[position] else file.filename,
+                'topic': topic,
+                'content_digest': content_digest,
+                'cached': cached,
+                'spool_ms': round((time.perf_counter() - spool_started) * 1000, 1),
+                'future': batch_executor.submit(_extract_batch_file, spool, filename, topic,
+                                                content_digest, time.perf_counter())
+            })
+        
+        print(f"📦 Batch upload: extracting {len(entries)} file(s) on {app.config['BATCH_UPLOAD_WORKERS']} worker(s)")
+        
+        results = []
+        materials = []
+        for entry in entries:
+            future = entry.pop('future')
+            result = {
+                "filename": entry['filename'],
+                "title": entry['title'],
+                "topic": entry['topic'],
+                "content_digest": entry['content_digest'],
+                "cached": entry['cached'],
+                "timings": {"spool_ms": entry['spool_ms']}
             }
+            try:
+                extracted = future.result()
+            except Exception as e:
+                print(f"❌ Batch extraction failed for {entry['filename']}: {e}")
+                result.update({"status": "failed", "error": str(e)})
+                results.append(result)
+                continue
             
-            print(f"📤 Sending response with {len(chunks)} chunks")
-            print(f"📋 Session ID: {session.id}, Material ID: {material.id}")
-            
-            return jsonify(response_data)
+            material, is_new_upload = _stage_material(user_id, entry['title'], entry['topic'], entry['filename'],
+                                                      extracted['full_content'], entry['content_digest'],
+                                                      extracted['content_index'])
+            materials.append((result, material))
+            result["timings"].update(queue_ms=extracted['queue_ms'], extract_ms=extracted['extract_ms'])
+            result.update({
+                "status": "completed",
+                "is_new_upload": is_new_upload,
+                "content_length": len(extracted['full_content']),
+                "content_preview": extracted['full_content'][:200]
+            })
+            results.append(result)
         
-        return jsonify({"error": "Missing file or topic"}), 400
+        # One transaction for the whole batch
+        save_started = time.perf_counter()
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Batch upload commit failed: {e}")
+            for result, _ in materials:
+                result.update({"status": "failed", "error": f"Could not save material: {e}"})
+            materials = []
+        for result, material in materials:
+            result["material_id"] = material.id
+            index_material(material)
+        save_ms = round((time.perf_counter() - save_started) * 1000, 1)
+        
+        completed = sum(1 for result in results if result["status"] == "completed")
+        total_ms = round((time.perf_counter() - batch_started) * 1000, 1)
+        print(f"📦 Batch upload finished: {completed}/{len(results)} file(s) in {total_ms}ms")
+        
+        return jsonify({
+            "message": f"Processed {len(results)} file(s)",
+            "completed": completed,
+            "failed": len(results) - completed,
+            "results": results,
+            "timings": {"save_ms": save_ms, "total_ms": total_ms}
+        })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def _serialize_job(job):
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "filename": job.filename,
+        "topic": job.topic,
+        "material_id": job.material_id,
+        "session_id": job.session_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "status_url": f"/api/jobs/{job.id}"
+    }
+    if job.status == 'completed' and job.result:
+        # Same payload the synchronous upload used to return (chunks, ids, preview)
+        data.update(json.loads(job.result))
+    return data
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_upload_job(job_id):
+    """Report the current stage, progress and (once finished) the chunks of an upload job"""
+    job = db.session.get(UploadJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_serialize_job(job))
+
 @app.route('/api/materials/<int:user_id>', methods=['GET'])
 def get_user_materials(user_id):
     """Get all uploaded materials for a user"""
@@ -356,6 +1119,57 @@ def get_user_materials(user_id):
         "content_preview": m.content[:200] + "..." if len(m.content) > 200 else m.content
     } for m in materials])
 
+@app.route('/api/materials/<int:material_id>/chapters', methods=['GET'])
+def get_material_chapters(material_id):
+    """List a material's chapters from its stored table of contents (the content isn't loaded)"""
+    row = db.session.query(LearningMaterial.toc_index).filter_by(id=material_id).first()
+    if row is None:
+        return jsonify({"error": "Material not found"}), 404
+    toc_index = json.loads(row.toc_index) if row.toc_index else None
+    return jsonify({"material_id": material_id, "chapters": _serialize_toc(toc_index)})
+
+@app.route('/api/chapters/<content_digest>', methods=['GET'])
+def get_document_chapters(content_digest):
+    """List the chapters of an uploaded document by its content digest"""
+    if len(content_digest) != 64 or not all(char in '0123456789abcdef' for char in content_digest):
+        return jsonify({"error": "Invalid content digest"}), 400
+    
+    toc_index = content_cache.get_meta(content_digest, 'toc')
+    if toc_index is None:
+        row = (db.session.query(LearningMaterial.toc_index)
+               .filter(LearningMaterial.content_digest == content_digest,
+                       LearningMaterial.toc_index.isnot(None))
+               .first())
+        toc_index = json.loads(row.toc_index) if row else None
+    if toc_index is None:
+        return jsonify({"error": "Document not found"}), 404
+    return jsonify({"content_digest": content_digest, "chapters": _serialize_toc(toc_index)})
+
+@app.route('/api/materials/<int:material_id>/similar', methods=['GET'])
+def get_similar_materials(material_id):
+    """
+    Near-duplicate materials (MinHash similarity >= threshold, default NEAR_DUPLICATE_THRESHOLD).
+    Thresholds below min_threshold, the LSH candidate threshold, are raised to it.
+    """
+    row = db.session.query(LearningMaterial.minhash).filter_by(id=material_id).first()
+    if row is None:
+        return jsonify({"error": "Material not found"}), 404
+    
+    threshold = near_duplicate_threshold(request.args.get('threshold', type=float))
+    matches = find_near_duplicates(material_id, row.minhash, threshold)
+    titles = dict(db.session.query(LearningMaterial.id, LearningMaterial.title)
+                  .filter(LearningMaterial.id.in_([other_id for other_id, _ in matches])).all()) if matches else {}
+    return jsonify({
+        "material_id": material_id,
+        "threshold": round(threshold, 3),
+        "min_threshold": round(material_lsh.candidate_threshold, 3),
+        "similar": [{
+            "material_id": other_id,
+            "title": titles.get(other_id),
+            "similarity": round(similarity, 3)
+        } for other_id, similarity in matches if other_id in titles]
+    })
+
 @app.route('/api/materials/<int:material_id>/sessions', methods=['GET'])
 def get_material_sessions(material_id):
     """Get all learning sessions for a material"""
@@ -368,6 +1182,57 @@ def get_material_sessions(material_id):
         "updated_at": s.updated_at.isoformat()
     } for s in sessions])
 
+def continue_learning_content(data):
+    """
+    Topic-relevant content for a continue-learning request: the material text (from the
+    content cache when content_digest is given, else from the request), narrowed to the
+    optional chapter, then to the topic. Raises ValueError for missing topic or content.
+    """
+    topic = data.get('topic')
+    material_content = data.get('content')  # Get content from frontend
+    material_title = data.get('title', 'Study Material')
+    content_digest = data.get('content_digest')
+    content_index = data.get('content_index')
+    chapter = data.get('chapter')  # Optional chapter from /api/chapters, e.g. "Chapter 5"
+    
+    if not topic:
+        raise ValueError("topic required")
+    
+    section_index = None
+    text_digest = None
+    if content_digest:
+        # Prefer the original document text (and its offset and BM25 indexes) from the content cache
+        cached_content = content_cache.get(content_digest)
+        if cached_content:
+            material_content = cached_content
+            content_index = content_cache.get_meta(content_digest, 'index')
+            section_index = load_section_index(material_content, content_digest)
+            text_digest = content_digest
+    
+    if not material_content:
+        raise ValueError("material content required")
+    
+    print(f"📚 Continuing learning from material: {material_title}")
+    print(f"🎯 New topic: {topic}")
+    print(f"📄 Content length: {len(material_content)} characters")
+    
+    if chapter:
+        # Narrow the search to the chosen chapter, looked up in the table of contents
+        chapter_content = content_extractor.extract_chapter_content(
+            material_content, [chapter], toc_index=load_toc_index(material_content, text_digest))
+        print(f"📖 Chapter '{chapter}': {len(chapter_content)} characters")
+        material_content, content_index, section_index, text_digest = chapter_content, None, None, None
+    
+    # SMART EXTRACTION: Extract only topic-relevant content
+    print(f"🔍 Extracting topic-relevant content for: {topic}")
+    relevant_content = content_extractor.extract_topic_content(material_content, topic,
+                                                               content_index=content_index,
+                                                               section_index=section_index,
+                                                               content_digest=text_digest)
+    print(f"✂️  Extracted {len(relevant_content)} characters (from {len(material_content)})")
+    print(f"📊 Reduction: {100 - int(len(relevant_content)/len(material_content)*100)}%")
+    return relevant_content
+
 @app.route('/api/continue-learning', methods=['POST'])
 def continue_learning():
     """Continue learning from an existing material with a new topic"""
@@ -375,34 +1240,18 @@ def continue_learning():
         data = request.json
         material_id = data.get('material_id')  # This is Firestore ID (string)
         topic = data.get('topic')
-        user_id = data.get('user_id', 1)
-        material_content = data.get('content')  # Get content from frontend
         material_title = data.get('title', 'Study Material')
         
         print(f"📥 Continue learning request: material_id={material_id}, topic={topic}")
-        
-        if not topic:
-            return jsonify({"error": "topic required"}), 400
-        
-        if not material_content:
-            return jsonify({"error": "material content required"}), 400
-        
-        print(f"📚 Continuing learning from material: {material_title}")
-        print(f"🎯 New topic: {topic}")
-        print(f"📄 Content length: {len(material_content)} characters")
-        
-        # SMART EXTRACTION: Extract only topic-relevant content
-        print(f"🔍 Extracting topic-relevant content for: {topic}")
-        relevant_content = content_extractor.extract_topic_content(material_content, topic)
-        print(f"✂️  Extracted {len(relevant_content)} characters (from {len(material_content)})")
-        print(f"📊 Reduction: {100 - int(len(relevant_content)/len(material_content)*100)}%")
+        relevant_content = continue_learning_content(data)
         
         # Generate learning chunks using ONLY relevant content
         chunks = []
         if gemini_service:
             try:
                 print(f"🤖 Generating chunks with Gemini for topic: {topic}")
-                chunks = gemini_service.generate_learning_chunks(relevant_content, topic)
+                chunks = gemini_service.generate_learning_chunks(relevant_content, topic,
+                                                                 use_cache=not data.get('refresh', False))
                 print(f"✅ Generated {len(chunks)} chunks")
             except Exception as e:
                 print(f"❌ Error generating chunks: {e}")
@@ -424,12 +1273,153 @@ def continue_learning():
             "is_continuation": True
         })
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error in continue_learning: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def sse_event(event, data):
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/continue-learning/stream', methods=['GET', 'POST'])
+def continue_learning_stream():
+    """
+    Streaming /api/continue-learning: Server-Sent Events with a "meta" event, one
+    "chunk" event per learning chunk as soon as Gemini has written it, then "done"
+    (count, fallback, time_to_first_chunk, elapsed). A failure after the stream has
+    started ends it with an "error" event instead. Takes the same fields as
+    /api/continue-learning, as a JSON body or (for EventSource) query parameters.
+    """
+    data = request.get_json(silent=True) or request.args.to_dict()
+    material_id = data.get('material_id')
+    topic = data.get('topic')
+    material_title = data.get('title', 'Study Material')
+    use_cache = str(data.get('refresh', False)).lower() not in ('true', '1')
+    
+    print(f"📥 Streaming continue learning request: material_id={material_id}, topic={topic}")
+    try:
+        relevant_content = continue_learning_content(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in continue_learning_stream: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        try:
+            yield from stream_chunks()
+        except Exception as e:
+            # Headers are already sent: report the failure as the stream's last event
+            print(f"Error in continue_learning_stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event('error', {"error": str(e), "final": True})
+    
+    def stream_chunks():
+        started = time.perf_counter()
+        first_chunk_at = None
+        count = 0
+        yield sse_event('meta', {
+            "material_id": material_id,
+            "session_id": f"session_{int(datetime.utcnow().timestamp())}",
+            "topic": topic,
+            "title": material_title,
+            "is_continuation": True
+        })
+        
+        if gemini_service:
+            try:
+                print(f"🤖 Streaming chunks with Gemini for topic: {topic}")
+                for chunk in gemini_service.stream_learning_chunks(relevant_content, topic, use_cache=use_cache):
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter() - started
+                        print(f"⚡ First chunk after {first_chunk_at:.2f}s")
+                    count += 1
+                    yield sse_event('chunk', chunk)
+            except Exception as e:
+                print(f"❌ Error streaming chunks: {e}")
+                if count:
+                    # Part of the response already went out: end with the error, not "done"
+                    yield sse_event('error', {"error": str(e), "final": True})
+                    return
+        
+        fallback = count == 0
+        if fallback:
+            print(f"⚠️  Using fallback chunks")
+            for chunk in generate_fallback_chunks(topic, material_title, relevant_content):
+                count += 1
+                yield sse_event('chunk', chunk)
+        
+        elapsed = time.perf_counter() - started
+        print(f"✅ Streamed {count} chunks in {elapsed:.2f}s")
+        yield sse_event('done', {
+            "count": count,
+            "fallback": fallback,
+            "time_to_first_chunk": round(first_chunk_at, 3) if first_chunk_at is not None else None,
+            "elapsed": round(elapsed, 3)
+        })
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/extract-topics', methods=['POST'])
+def extract_topics():
+    """
+    Extract the relevant content for several topics of one material in a single
+    pass (e.g. a study plan's topics). Body: topics, content_digest and/or content,
+    optional max_chars.
+    """
+    try:
+        data = request.json or {}
+        topics = [topic for topic in (data.get('topics') or []) if isinstance(topic, str) and topic.strip()]
+        material_content = data.get('content')
+        content_digest = data.get('content_digest')
+        max_chars = int(data.get('max_chars', 15000))
+        
+        if not topics:
+            return jsonify({"error": "topics required"}), 400
+        if len(topics) > app.config['EXTRACT_TOPICS_MAX']:
+            return jsonify({"error": f"At most {app.config['EXTRACT_TOPICS_MAX']} topics per request"}), 400
+        
+        text_digest = None
+        if content_digest:
+            # Prefer the original document text from the content cache
+            cached_content = content_cache.get(content_digest)
+            if cached_content:
+                material_content = cached_content
+                text_digest = content_digest
+        
+        if not material_content:
+            return jsonify({"error": "material content required"}), 400
+        
+        started = time.perf_counter()
+        extracted = content_extractor.extract_topics_content(material_content, topics, max_chars=max_chars,
+                                                             content_digest=text_digest)
+        elapsed = time.perf_counter() - started
+        print(f"🔍 Extracted {len(topics)} topics from {len(material_content)} characters in {elapsed:.2f}s")
+        
+        return jsonify({
+            "content_length": len(material_content),
+            "elapsed": round(elapsed, 3),
+            "topics": [{
+                "topic": topic,
+                "content": extracted[topic],
+                "length": len(extracted[topic])
+            } for topic in topics]
+        })
+        
+    except Exception as e:
+        print(f"Error in extract_topics: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
 def generate_fallback_chunks(topic, filename, content):
     """Generate fallback chunks when Gemini fails"""
     content_parts = content.split('\n\n') if content else []
@@ -519,7 +1509,7 @@ def simplify_content():
         if not gemini_service:
             return jsonify({"error": "AI service not available"}), 503
         
-        simplified = gemini_service.simplify_content(content)
+        simplified = gemini_service.simplify_content(content, use_cache=not data.get('refresh', False))
         
         return jsonify({
             "simplified_content": simplified
@@ -551,7 +1541,8 @@ def generate_quiz():
         if not gemini_service:
             return jsonify({"error": "AI service not available"}), 503
         
-        quiz = gemini_service.generate_quiz(content, topic, question_count)
+        quiz = gemini_service.generate_quiz(content, topic, question_count,
+                                            use_cache=not data.get('refresh', False))
         
         return jsonify(quiz)
         
@@ -618,7 +1609,8 @@ def generate_flashcards():
         if not gemini_service:
             return jsonify({"error": "AI service not available"}), 503
         
-        flashcards = gemini_service.generate_flashcards(content, topic, card_count)
+        flashcards = gemini_service.generate_flashcards(content, topic, card_count,
+                                                        use_cache=not data.get('refresh', False))
         
         return jsonify(flashcards)
         
@@ -626,6 +1618,56 @@ def generate_flashcards():
         print(f"Error in generate_flashcards: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/study-pack', methods=['POST'])
+def generate_study_pack():
+    """
+    Learning chunks, quiz, flashcards and summary for a topic in one request,
+    generated concurrently. Parts not finished by the deadline are listed in
+    timed_out (and null) instead of holding up the rest.
+    """
+    try:
+        data = request.json
+        material_id = data.get('material_id')
+        topic = data.get('topic')
+        content = data.get('content')
+        
+        if material_id:
+            material = LearningMaterial.query.get(material_id)
+            if not material:
+                return jsonify({"error": "Material not found"}), 404
+            topic = topic or material.topic
+            content = material.content
+        elif not topic or not content:
+            return jsonify({"error": "Topic and content required"}), 400
+        
+        if not gemini_service:
+            return jsonify({"error": "AI service not available"}), 503
+        
+        deadline = min(float(data.get('deadline', app.config['STUDY_PACK_DEADLINE'])),
+                       app.config['STUDY_PACK_DEADLINE'])
+        pack = gemini_service.generate_study_pack(content, topic,
+                                                  question_count=data.get('question_count', 5),
+                                                  card_count=data.get('card_count', 10),
+                                                  deadline=deadline,
+                                                  use_cache=not data.get('refresh', False))
+        print(f"📦 Study pack for '{topic}' in {pack['elapsed']:.1f}s (timed out: {pack['timed_out'] or 'none'})")
+        
+        results = pack['results']
+        return jsonify({
+            "topic": topic,
+            "chunks": results.get('chunks'),
+            "quiz": results.get('quiz'),
+            "flashcards": results.get('flashcards'),
+            "summary": results.get('summary'),
+            "timed_out": pack['timed_out'],
+            "errors": pack['errors'],
+            "elapsed": pack['elapsed']
+        })
+        
+    except Exception as e:
+        print(f"Error in generate_study_pack: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/emotion-data', methods=['POST'])
 def handle_emotion_data():
     try:
@@ -892,34 +1934,11 @@ Review your materials, flashcards, and quiz results to reinforce your understand
             })
         
         # Generate comprehensive summary using Gemini
-        if content:
-            prompt = f"""Based on the following study materials about {topic}, generate a comprehensive summary:
-
-{content[:3000]}
-
-Please provide:
-1. Key concepts and definitions
-2. Main points to remember
-3. Important relationships or connections
-4. Practical applications
-5. Common misconceptions to avoid
-
-Keep it concise but informative, around 200-300 words."""
-        else:
-            prompt = f"""Generate a comprehensive summary for the topic: {topic}
-
-Please provide:
-1. Key concepts and definitions
-2. Main points to remember
-3. Important relationships or connections
-4. Practical applications
-5. Common misconceptions to avoid
-
-Keep it concise but informative, around 200-300 words."""
+        prompt = build_summary_prompt(topic, content)
 
         try:
             # Use the GeminiService instance that's already initialized
-            summary = gemini_service.generate_summary(prompt)
+            summary = gemini_service.generate_summary(prompt, use_cache=not data.get('refresh', False))
             
             return jsonify({
                 'summary': summary,
@@ -947,7 +1966,13 @@ Continue practicing with flashcards and quizzes to solidify your understanding."
         print(f"Error in generate_summary: {e}")
         return jsonify({'error': str(e)}), 500
 
+# WSGI servers import the app instead of running this module - resume jobs on import
+# Not in the PDF pool's worker processes either, which import the main module again
+if __name__ != '__main__' and multiprocessing.parent_process() is None:
+    start_upload_job_recovery()
+
 if __name__ == '__main__':
+    debug = True
     with app.app_context():
         # Try to migrate database schema
         try:
@@ -966,12 +1991,53 @@ if __name__ == '__main__':
                     conn.commit()
                 print("✅ Added title and last_accessed columns")
             
+            if 'content_digest' not in columns:
+                print("🔄 Adding content_digest column...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE learning_material ADD COLUMN content_digest VARCHAR(64)'))
+                    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_learning_material_content_digest ON learning_material (content_digest)'))
+                    conn.commit()
+                print("✅ Added content_digest column")
+            
+            if 'content_index' not in columns:
+                print("🔄 Adding content_index column...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE learning_material ADD COLUMN content_index TEXT'))
+                    conn.commit()
+                print("✅ Added content_index column")
+            
+            if 'toc_index' not in columns:
+                print("🔄 Adding toc_index column...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE learning_material ADD COLUMN toc_index TEXT'))
+                    conn.commit()
+                print("✅ Added toc_index column")
+            
+            if 'minhash' not in columns:
+                print("🔄 Adding minhash column...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE learning_material ADD COLUMN minhash BLOB'))
+                    conn.commit()
+                print("✅ Added minhash column")
+            
             # Check if learning_session table exists
             if 'learning_session' not in inspector.get_table_names():
                 print("🔄 Creating learning_session table...")
                 db.create_all()
                 print("✅ Created learning_session table")
             
+            if 'upload_job' not in inspector.get_table_names():
+                print("🔄 Creating upload_job table...")
+                db.create_all()
+                print("✅ Created upload_job table")
+            elif 'owner' not in [col['name'] for col in inspector.get_columns('upload_job')]:
+                print("🔄 Adding upload job lease columns...")
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE upload_job ADD COLUMN owner VARCHAR(64)'))
+                    conn.execute(text('ALTER TABLE upload_job ADD COLUMN heartbeat_at DATETIME'))
+                    conn.commit()
+                print("✅ Added owner and heartbeat_at columns")
+            
             # Update existing records
             with db.engine.connect() as conn:
                 # Set title = filename for existing records
@@ -986,7 +2052,12 @@ if __name__ == '__main__':
             print(f"⚠️  Migration note: {e}")
             # If migration fails, just create all tables (for new databases)
             db.create_all()
+        
+    # The debug reloader's parent process only watches files; resume jobs in the
+    # process that serves requests (the only process without the reloader)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_upload_job_recovery()
     
-    app.run(debug=True, port=5000)
+    app.run(debug=debug, port=5000)
     
     
\ No newline at end of file
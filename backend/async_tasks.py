@@ -0,0 +1,121 @@
+"""
+Async Tasks
+A background asyncio event loop for the synchronous Flask app: sync code
+submits coroutines to it and blocks for the result, so async clients (like
+Gemini's generate_content_async) keep a single loop for their connections.
+Async generators can be iterated from sync code the same way (for streaming
+responses). gather_with_deadline runs independent coroutines concurrently
+and returns whatever finished before the deadline.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, Optional
+
+# Returned by _next_item when an async iterator is exhausted
+_EXHAUSTED = object()
+
+
+async def _next_item(iterator: AsyncIterator) -> Any:
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _EXHAUSTED
+
+
+async def _close_iterator(iterator: AsyncIterator) -> None:
+    await iterator.aclose()
+
+
+class EventLoopThread:
+    def __init__(self, name: str = 'async-tasks'):
+        """
+        Args:
+            name: Name of the daemon thread running the loop
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result (from any thread but the loop's own).
+
+        Args:
+            coroutine: The coroutine to run
+            timeout: Seconds to wait before raising concurrent.futures.TimeoutError (None = no limit)
+
+        Returns:
+            The coroutine's result (its exception is re-raised)
+        """
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("EventLoopThread.run() called from its own loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def iterate(self, iterable: AsyncIterator) -> Iterator:
+        """
+        Iterate an async iterator (e.g. an async generator) on the loop from sync code,
+        such as a streaming Flask response. Closing the iterator early (a client
+        disconnecting) closes the async generator too.
+        """
+        iterator = iterable.__aiter__()
+        try:
+            while True:
+                item = self.run(_next_item(iterator))
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            if hasattr(iterator, 'aclose'):
+                self.run(_close_iterator(iterator))
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+async def gather_with_deadline(calls: Dict[str, Awaitable], deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run independent coroutines concurrently until all finish or the deadline hits.
+    Calls still running at the deadline are cancelled.
+
+    Args:
+        calls: Coroutines by name
+        deadline: Seconds to wait (None = wait for all)
+
+    Returns:
+        Dict with results (name -> value), errors (name -> message), timed_out
+        (names cancelled at the deadline) and elapsed seconds
+    """
+    started = time.monotonic()
+    tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+    pending = set()
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Let the cancelled calls unwind before reporting
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results, errors, timed_out = {}, {}, []
+    for name, task in tasks.items():
+        if task in pending or task.cancelled():
+            timed_out.append(name)
+        elif task.exception() is not None:
+            errors[name] = str(task.exception())
+        else:
+            results[name] = task.result()
+
+    return {
+        'results': results,
+        'errors': errors,
+        'timed_out': timed_out,
+        'elapsed': round(time.monotonic() - started, 3),
+    }
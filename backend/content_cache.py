@@ -0,0 +1,132 @@
+"""
+Content Cache
+Content-addressed, compressed on-disk store of extracted document text.
+Uploads are keyed by the SHA-256 of their bytes, so the same file uploaded
+again (by anyone, under any name) never has to be parsed twice.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Iterable, Optional
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ContentCache:
+    def __init__(self, cache_dir: str = 'content_cache', compress_level: int = 6):
+        """
+        Args:
+            cache_dir: Directory holding the cached text files
+            compress_level: gzip compression level (1 = fastest, 9 = smallest)
+        """
+        self.cache_dir = cache_dir
+        self.compress_level = compress_level
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def digest_file(filepath: str) -> str:
+        """SHA-256 hex digest of a file, read in fixed-size chunks"""
+        sha256 = hashlib.sha256()
+        with open(filepath, 'rb') as file:
+            for block in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def _path_for(self, digest: str) -> str:
+        # Fan out by the first two hex chars so no directory grows unbounded
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.txt.gz")
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self._path_for(digest))
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return the cached text for a digest, or None on a miss"""
+        path = self._path_for(digest)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError) as e:
+            # Truncated or corrupt entry - drop it and treat as a miss
+            print(f"⚠️  Discarding unreadable cache entry {digest[:12]}: {e}")
+            self.delete(digest)
+            return None
+
+    def put(self, digest: str, text: str) -> None:
+        """Store text under a digest. Writes are atomic, so readers never see partial files."""
+        self.put_stream(digest, [text])
+
+    def put_stream(self, digest: str, pieces: Iterable[str]) -> int:
+        """
+        Store text arriving as a stream of pieces, compressing as it goes so the
+        full text is never held in memory. Nothing is stored if the stream fails.
+
+        Returns:
+            Number of characters written
+        """
+        path = self._path_for(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        chars = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=self.compress_level) as file:
+                    for piece in pieces:
+                        file.write(piece.encode('utf-8'))
+                        chars += len(piece)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return chars
+
+    def _meta_path_for(self, digest: str, name: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.{name}.json")
+
+    def get_meta(self, digest: str, name: str) -> Optional[Any]:
+        """Return a JSON document stored next to the text (e.g. its offset index), or None"""
+        try:
+            with open(self._meta_path_for(digest, name), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Discarding unreadable {name} for {digest[:12]}: {e}")
+            return None
+
+    def put_meta(self, digest: str, name: str, data: Any) -> None:
+        """Store a small JSON document next to the cached text"""
+        path = self._meta_path_for(digest, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(data, file, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, digest: str) -> None:
+        """Remove the cached text and everything stored alongside it"""
+        directory = os.path.join(self.cache_dir, digest[:2])
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(digest + '.'):
+                os.remove(os.path.join(directory, name))
+
+
+# Global instance
+content_cache = ContentCache(os.getenv('CONTENT_CACHE_DIR', 'content_cache'))
@@ -0,0 +1,166 @@
+"""
+Content Compressor
+Query-focused extractive compression: scores the sentences of extracted
+content against the topic (TF-IDF cosine similarity, plus centrality in the
+text as a cheap TextRank) and keeps the best ones that fit a character or
+token budget, in their original order. Used to fit the LLM prompt instead of
+cutting the text off at the budget.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Rough size of a Gemini token, for token budgets
+CHARS_PER_TOKEN = 4
+
+# Share of a sentence's score from topic similarity (the rest is centrality)
+RELEVANCE_WEIGHT = 0.7
+
+# Short first lines of a block without sentence punctuation are kept as its header
+MAX_HEADER_LENGTH = 100
+
+# Sentence boundaries inside a line: punctuation, whitespace, then a likely sentence start
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+BLOCK_SEPARATOR = re.compile(r'\n\s*\n')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is',
+    'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'which', 'with',
+})
+
+
+def _split_units(content: str) -> Tuple[List[str], List[Tuple[int, int, bool]]]:
+    """
+    Split text into sentences.
+
+    Returns:
+        (texts, positions) - position is (block, line, is_header) for each sentence
+    """
+    texts, positions = [], []
+    for block_number, block in enumerate(BLOCK_SEPARATOR.split(content.strip())):
+        lines = [line.strip() for line in block.split('\n') if line.strip()]
+        for line_number, line in enumerate(lines):
+            is_header = (line_number == 0 and len(lines) > 1 and len(line) <= MAX_HEADER_LENGTH
+                         and not line.endswith(('.', '!', '?')))
+            for sentence in ([line] if is_header else SENTENCE_BOUNDARY.split(line)):
+                texts.append(sentence)
+                positions.append((block_number, line_number, is_header))
+    return texts, positions
+
+
+def score_sentences(sentences: List[str], topic: str) -> np.ndarray:
+    """
+    Score sentences for a topic: RELEVANCE_WEIGHT * TF-IDF cosine similarity to the
+    topic + the rest * similarity to the centroid of all sentences (how central
+    the sentence is to the text, like TextRank's degree). Sentences without
+    content words score 0.
+    """
+    vocabulary = {}
+    token_ids, unit_ids = [], []
+    for unit, sentence in enumerate(sentences):
+        for token in TOKEN_PATTERN.findall(sentence.lower()):
+            if token not in STOP_WORDS:
+                token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                unit_ids.append(unit)
+    unit_count = len(sentences)
+    if not token_ids:
+        return np.zeros(unit_count)
+
+    # Distinct (sentence, token) pairs with their term frequencies
+    pairs, frequencies = np.unique(np.array(unit_ids, dtype=np.int64) * len(vocabulary) + token_ids,
+                                   return_counts=True)
+    units, tokens = np.divmod(pairs, len(vocabulary))
+
+    document_frequency = np.bincount(tokens, minlength=len(vocabulary))
+    idf = np.log((1 + unit_count) / (1 + document_frequency)) + 1.0
+    weights = (1.0 + np.log(frequencies)) * idf[tokens]
+    norms = np.sqrt(np.bincount(units, weights ** 2, minlength=unit_count))
+    norms[norms == 0] = 1.0
+    normalized = weights / norms[units]
+
+    # Similarity to the topic
+    query = np.zeros(len(vocabulary))
+    for token in TOKEN_PATTERN.findall(topic.lower()):
+        if token in vocabulary and token not in STOP_WORDS:
+            query[vocabulary[token]] = idf[vocabulary[token]]
+    query_norm = np.linalg.norm(query)
+    relevance = (np.bincount(units, normalized * query[tokens], minlength=unit_count) / query_norm
+                 if query_norm else np.zeros(unit_count))
+
+    # Similarity to the centroid = mean cosine similarity to every sentence
+    centroid = np.bincount(tokens, normalized, minlength=len(vocabulary)) / unit_count
+    centrality = np.bincount(units, normalized * centroid[tokens], minlength=unit_count)
+    if centrality.max() > 0:
+        centrality /= centrality.max()
+
+    return RELEVANCE_WEIGHT * relevance + (1 - RELEVANCE_WEIGHT) * centrality
+
+
+def compress_content(content: str, topic: str, max_chars: Optional[int] = None,
+                     max_tokens: Optional[int] = None) -> str:
+    """
+    Keep the sentences most relevant to the topic that fit the budget.
+
+    Args:
+        content: Text to compress (e.g. extract_topic_content output)
+        topic: The topic the text is for
+        max_chars: Character budget of the result
+        max_tokens: Token budget (converted with CHARS_PER_TOKEN); the tighter budget wins
+
+    Returns:
+        The content unchanged if it fits, else its best sentences in original
+        order, grouped by block and line (headers kept with their blocks)
+    """
+    budgets = [budget for budget in (max_chars, max_tokens and max_tokens * CHARS_PER_TOKEN) if budget]
+    if not budgets or len(content) <= min(budgets):
+        return content
+    budget = min(budgets)
+
+    sentences, positions = _split_units(content)
+    scores = score_sentences(sentences, topic)
+    header_of = {block: unit for unit, (block, _, is_header) in enumerate(positions) if is_header}
+
+    # Best sentences first (ties in document order), skipping those that no longer fit
+    selected = set()
+    selected_texts = set()  # Repeated sentences (running headers, boilerplate) are kept once
+    used = 0
+    for unit in np.argsort(-scores, kind='stable'):
+        unit = int(unit)
+        if scores[unit] <= 0:
+            break
+        block, _, is_header = positions[unit]
+        # Headers only come with a selected sentence of their block, and repeats are skipped
+        if is_header or sentences[unit] in selected_texts:
+            continue
+        header = header_of.get(block)
+        cost = len(sentences[unit]) + 2
+        if header is not None and header not in selected:
+            cost += len(sentences[header]) + 1
+        if used + cost > budget:
+            continue
+        selected.add(unit)
+        selected_texts.add(sentences[unit])
+        if header is not None:
+            selected.add(header)
+        used += cost
+
+    if not selected:
+        return content[:budget]
+
+    # Reassemble in document order: sentences of a line with spaces, lines with
+    # newlines, blocks with blank lines
+    blocks = []
+    previous = None
+    for unit in sorted(selected):
+        block, line, _ = positions[unit]
+        if previous is None or previous[0] != block:
+            blocks.append(sentences[unit])
+        elif previous[1] != line:
+            blocks[-1] += '\n' + sentences[unit]
+        else:
+            blocks[-1] += ' ' + sentences[unit]
+        previous = (block, line)
+    return '\n\n'.join(blocks)
@@ -3,14 +3,251 @@ Smart Content Extractor
 Extracts only topic-relevant content from large documents
 """
 
+import bisect
+import hashlib
+import heapq
+import os
 import re
-from typing import List, Tuple
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from keyword_matcher import AHOCORASICK_AVAILABLE, KeywordMatcher
+from memo_cache import LRUCache
+from section_index import approximate_index_size, build_section_index, index_matches, score_sections, top_scores
+from toc_index import build_toc_index, find_toc_entries, toc_matches
+
+# Optional imports
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Memory budgets of the in-process memo caches (split sections / final extractions / term matrices)
+SECTION_CACHE_MAX_BYTES = int(os.getenv('SECTION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+TOPIC_CACHE_MAX_BYTES = int(os.getenv('TOPIC_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+MATRIX_CACHE_MAX_BYTES = int(os.getenv('MATRIX_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+INDEX_CACHE_MAX_BYTES = int(os.getenv('INDEX_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+
+# Section scoring: 'sparse' (SciPy term-section matrices), 'python' (per-section str.count)
+# or 'auto' (sparse when SciPy is installed and the document has enough sections)
+SCORING_ENGINE = os.getenv('SCORING_ENGINE', 'auto').lower()
+SPARSE_MIN_SECTIONS = int(os.getenv('SPARSE_MIN_SECTIONS', 64))
+
+# Per-section keyword counting: 'aho-corasick' (one automaton scan per section), 'count'
+# (one str.count per keyword) or 'auto' (the automaton when pyahocorasick is installed
+# and the topic has enough keywords for one scan to beat several C-level count passes).
+# Measured on 300-section documents: the scan overtakes str.count at ~32 keywords when
+# matches are rare and is still ~3x slower at 12 when they are dense, so short topics use count
+KEYWORD_MATCHER = os.getenv('KEYWORD_MATCHER', 'auto').lower()
+AHO_CORASICK_MIN_KEYWORDS = int(os.getenv('AHO_CORASICK_MIN_KEYWORDS', 32))
+
+# Sections ranked at first by the BM25 and sparse paths (doubled until they fill the budget)
+RANKED_PREFIX_START = 16
+
+# Page/slide ranges inside a topic, e.g. "pp. 120-160", "page 12", "slides 3 to 7"
+UNIT_RANGE_PATTERN = re.compile(
+    r'\b(?:pp?\.\s*|pp?\s+|pages?\s+|slides?\s+)(\d+)(?:\s*(?:-|–|to)\s*(\d+))?',
+    re.IGNORECASE
+)
+
+# Section header lines: markdown ("# Title"), numbered ("1. Title") or ALL CAPS.
+# [^\S\n] is whitespace other than a newline, so a match never runs past its line.
+SECTION_HEADER_PATTERN = re.compile(
+    r'^(?:#{1,6}[^\S\n]+.+|\d+\.[^\S\n]+[A-Z].+|[A-Z](?:[A-Z]|[^\S\n])+)$',
+    re.MULTILINE
+)
+
+NON_SPACE_PATTERN = re.compile(r'\S')
+
+WORD_PATTERN = re.compile(r'\w+')
+
+_sparse_unavailable_logged = False
+
+def _log_sparse_unavailable() -> None:
+    """Say (once per process) that documents the sparse engine would score use the Python loop"""
+    global _sparse_unavailable_logged
+    if not _sparse_unavailable_logged:
+        _sparse_unavailable_logged = True
+        print("⚠️  SciPy not available - scoring large documents with the Python loop (pip install scipy)")
+
+class SectionMatrix:
+    """
+    Sparse term-section matrices of one document, built once, that reproduce
+    ContentExtractor's relevance score for any topic with matrix products:
+    
+        counts = term_counts @ keyword_counts       (sections x keywords)
+        bonus  = 10 * (head_terms @ keyword_hits > 0)
+        score  = counts @ keyword_weights + bonus summed over the topic's keywords
+    
+    Keywords are substrings, not tokens ("lock" counts in "blocking"). A keyword
+    made of word characters always falls inside a single \\w+ token, so its count
+    in a section is the sum over the section's tokens of token.count(keyword).
+    Keywords with other characters (the whole-topic phrase) are counted directly.
+    """
+    
+    def __init__(self, content_lower: str, spans: Sequence[Tuple[int, int]]):
+        """
+        Args:
+            content_lower: The lower-cased document (same length as the original)
+            spans: (start, end) offsets of each section
+        """
+        self.content_lower = content_lower
+        self.spans = [tuple(span) for span in spans]
+        self.starts = np.array([start for start, _ in self.spans], dtype=np.int64)
+        self.ends = np.array([end for _, end in self.spans], dtype=np.int64)
+        self.line_ends = []
+        
+        vocabulary: Dict[str, int] = {}
+        columns, lengths, head_columns, head_lengths = [], [], [], []
+        for start, end in self.spans:
+            line_end = content_lower.find('\n', start, end)
+            line_end = end if line_end == -1 else line_end
+            self.line_ends.append(line_end)
+            
+            tokens = WORD_PATTERN.findall(content_lower, start, end)
+            columns.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokens])
+            lengths.append(len(tokens))
+            head_tokens = WORD_PATTERN.findall(content_lower, start, line_end)
+            head_columns.extend([vocabulary[token] for token in head_tokens])
+            head_lengths.append(len(head_tokens))
+        
+        shape = (len(self.spans), len(vocabulary))
+        rows = np.repeat(np.arange(len(self.spans)), lengths)
+        self.term_counts = sparse.csr_matrix((np.ones(len(columns)), (rows, columns)), shape=shape)
+        head_rows = np.repeat(np.arange(len(self.spans)), head_lengths)
+        self.head_terms = sparse.csr_matrix((np.ones(len(head_columns)), (head_rows, head_columns)), shape=shape)
+        self.head_terms.data[:] = 1.0
+        self.line_ends = np.array(self.line_ends, dtype=np.int64)
+        
+        # All tokens in one newline-separated string, so finding every token that
+        # contains a keyword is a single C-level scan instead of a Python loop
+        self.vocabulary = '\n'.join(vocabulary)
+        token_lengths = np.fromiter((len(token) + 1 for token in vocabulary), dtype=np.int64, count=len(vocabulary))
+        self.token_starts = np.concatenate(([0], np.cumsum(token_lengths)[:-1])) if len(vocabulary) else token_lengths
+    
+    @property
+    def nbytes(self) -> int:
+        matrices = (self.term_counts, self.head_terms)
+        return (sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes for m in matrices)
+                + self.token_starts.nbytes + self.starts.nbytes * 3
+                + len(self.vocabulary) + len(self.content_lower) + 64 * len(self.spans))
+    
+    def _keyword_tokens(self, keyword: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary ids of the tokens containing keyword, and how often each contains it"""
+        positions = [match.start() for match in re.finditer(re.escape(keyword), self.vocabulary)]
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        ids = np.searchsorted(self.token_starts, positions, side='right') - 1
+        return np.unique(ids, return_counts=True)
+    
+    def _scan_keyword(self, keyword: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-section counts and first-line hits of a keyword that isn't a single word
+        (e.g. the whole-topic phrase), from one scan over the document.
+        """
+        counts = np.zeros(len(self.spans))
+        head_hits = np.zeros(len(self.spans), dtype=bool)
+        if not keyword:
+            # str.count('') semantics; never happens for real topics
+            for position, (start, end) in enumerate(self.spans):
+                counts[position] = end - start + 1
+            head_hits[:] = True
+            return counts, head_hits
+        
+        positions = np.array([match.start() for match in re.finditer(re.escape(keyword), self.content_lower)],
+                             dtype=np.int64)
+        if not len(positions):
+            return counts, head_hits
+        
+        sections = np.searchsorted(self.starts, positions, side='right') - 1
+        inside = (sections >= 0) & (positions + len(keyword) <= self.ends[np.maximum(sections, 0)])
+        np.add.at(counts, sections[inside], 1)
+        first_in_section = np.unique(sections[inside], return_index=True)
+        head_hits[first_in_section[0]] = (positions[inside][first_in_section[1]]
+                                          + len(keyword) <= self.line_ends[first_in_section[0]])
+        
+        # A match straddling two sections may hide one inside the next; recount those exactly
+        for section in np.unique(sections[~inside] + 1):
+            if 0 <= section < len(self.spans):
+                start, end = self.spans[section]
+                counts[section] = self.content_lower.count(keyword, start, end)
+                head_hits[section] = self.content_lower.find(keyword, start, self.line_ends[section]) != -1
+        return counts, head_hits
+    
+    def score(self, keywords: List[str]) -> np.ndarray:
+        """Relevance score of every section for one topic's keywords"""
+        return self.score_many([keywords])[:, 0]
+    
+    def score_many(self, keyword_lists: List[List[str]]) -> np.ndarray:
+        """
+        Score every section against several topics at once. Keyword counts for all
+        topics come from one sparse matrix-matrix product; they are then combined
+        in the same order as _calculate_relevance_score, so scores are identical.
+        
+        Returns:
+            (sections x topics) array of relevance scores
+        """
+        section_count, vocabulary_size = self.term_counts.shape
+        
+        # One column per distinct keyword across all topics
+        keyword_columns: Dict[str, int] = {}
+        rows, columns, occurrences = [], [], []
+        scanned = {}
+        for keywords in keyword_lists:
+            for keyword in keywords:
+                if keyword in keyword_columns or keyword in scanned:
+                    continue
+                if not WORD_PATTERN.fullmatch(keyword):
+                    scanned[keyword] = self._scan_keyword(keyword)
+                    continue
+                ids, counts = self._keyword_tokens(keyword)
+                rows.extend(ids)
+                columns.extend([len(keyword_columns)] * len(ids))
+                occurrences.extend(counts)
+                keyword_columns[keyword] = len(keyword_columns)
+        
+        if keyword_columns:
+            keyword_counts = sparse.csr_matrix((np.asarray(occurrences, dtype=np.float64), (rows, columns)),
+                                               shape=(vocabulary_size, len(keyword_columns)))
+            counts = np.ascontiguousarray((self.term_counts @ keyword_counts).toarray().T)
+            keyword_hits = keyword_counts.copy()
+            keyword_hits.data[:] = 1.0
+            head_hits = np.ascontiguousarray((self.head_terms @ keyword_hits).toarray().T > 0)
+        
+        scores = np.zeros((section_count, len(keyword_lists)))
+        for topic_position, keywords in enumerate(keyword_lists):
+            score = np.zeros(section_count)
+            for keyword in keywords:
+                keyword_count = (counts[keyword_columns[keyword]] if keyword in keyword_columns
+                                 else scanned[keyword][0])
+                score = score + keyword_count * (len(keyword) / 5.0)
+            # Bonus for section headers containing keywords
+            for keyword in keywords:
+                head_hit = (head_hits[keyword_columns[keyword]] if keyword in keyword_columns
+                            else scanned[keyword][1])
+                score = score + np.where(head_hit, 10.0, 0.0)
+            scores[:, topic_position] = score
+        return scores
 
 class ContentExtractor:
     def __init__(self):
-        pass
+        # Section offsets keyed by content digest, extractions by (digest, topic, max_chars, ...)
+        self.section_cache = LRUCache(SECTION_CACHE_MAX_BYTES, name='sections')
+        self.topic_cache = LRUCache(TOPIC_CACHE_MAX_BYTES, name='topic_extractions')
+        self.matrix_cache = LRUCache(MATRIX_CACHE_MAX_BYTES, sizeof=lambda matrix: matrix.nbytes,
+                                     name='section_matrices')
+        # Parsed BM25 section indexes keyed by content digest (see load_section_index in the app)
+        self.index_cache = LRUCache(INDEX_CACHE_MAX_BYTES, sizeof=approximate_index_size, name='section_indexes')
+        self.scoring_engine = SCORING_ENGINE
+        self.keyword_matcher = KEYWORD_MATCHER
     
-    def extract_topic_content(self, full_content: str, topic: str, max_chars: int = 15000) -> str:
+    def extract_topic_content(self, full_content: str, topic: str, max_chars: int = 15000,
+                              content_index: Optional[Dict] = None,
+                              section_index: Optional[Dict] = None,
+                              content_digest: Optional[str] = None) -> str:
         """
         Extract only the sections relevant to the topic from full content.
         Uses keyword matching and section detection.
@@ -19,40 +256,187 @@ class ContentExtractor:
             full_content: The complete document text
             topic: The specific topic to focus on (e.g., "Transactions in DBMS")
             max_chars: Maximum characters to extract (default 15000 for Gemini)
+            content_index: Optional page/slide offset index of full_content. When the
+                topic names a range (e.g. "chapter 5, pp. 120-160") only that range is searched.
+            section_index: Optional BM25 index of full_content (see build_section_index).
+                When given, sections are ranked from its postings instead of rescanned.
+            content_digest: Optional digest identifying full_content (e.g. the content
+                cache key). Computed from the text when omitted.
         
         Returns:
             Extracted relevant content
         """
+        # Hash the content once per call; both memo caches are keyed by it
+        content_digest = content_digest or self.digest_content(full_content)
+        topic = ' '.join(topic.lower().split())
+        
+        result_key = (content_digest, topic, max_chars, self._content_index_key(content_index),
+                      bool(section_index) and index_matches(section_index, full_content, content_digest))
+        extracted_content = self.topic_cache.get(result_key)
+        if extracted_content is None:
+            extracted_content = self._extract_uncached(full_content, topic, max_chars, content_index,
+                                                       section_index, content_digest)
+            self.topic_cache.put(result_key, extracted_content)
+        return extracted_content
+    
+    def _extract_uncached(self, full_content: str, topic: str, max_chars: int, content_index: Optional[Dict],
+                          section_index: Optional[Dict], content_digest: str) -> str:
+        sections_key = content_digest
+        if content_index:
+            unit_range, focused_topic = self.parse_unit_range(topic)
+            if unit_range:
+                range_content = self.slice_units(full_content, content_index, *unit_range)
+                if range_content is not None:
+                    full_content = range_content
+                    topic = focused_topic or topic
+                    sections_key = (content_digest, *unit_range)
+        
         # Split topic into keywords
         topic_keywords = self._extract_keywords(topic)
         
-        # Split content into sections
-        sections = self._split_into_sections(full_content)
+        # Rank with the stored BM25 index when it covers this exact text
+        # (the last keyword is the whole-topic phrase, which isn't a single token)
+        terms = topic_keywords[:-1]
+        if section_index and terms and index_matches(section_index, full_content, content_digest):
+            spans = section_index['spans']
+            scores = score_sections(section_index, terms)
+            scored_sections = self._ranked_prefix(
+                lambda limit: [(score, *spans[section_id]) for score, section_id in top_scores(scores, limit)],
+                len(scores), max_chars)
+            return self._select_sections(full_content, scored_sections, max_chars)
         
-        # Score each section based on topic relevance
-        scored_sections = []
-        for section in sections:
-            score = self._calculate_relevance_score(section, topic_keywords)
-            if score > 0:
-                scored_sections.append((score, section))
+        # Split content into sections (as offsets - nothing is copied yet)
+        spans = self._cached_section_spans(full_content, sections_key)
+        
+        # Sparse engine: reuse (or build once) the document's term-section matrices
+        matrix = self._section_matrix(full_content, sections_key, spans)
+        if matrix is not None:
+            scores = matrix.score(topic_keywords)
+            relevant = np.flatnonzero(scores > 0)
+            
+            def top_relevant(limit: int) -> List[Tuple[float, int, int]]:
+                best = relevant
+                if limit < len(relevant):
+                    # Partition out the limit-th best score; keep everything that good (ties included)
+                    relevant_scores = scores[relevant]
+                    kth_score = relevant_scores[np.argpartition(-relevant_scores, limit - 1)[limit - 1]]
+                    best = relevant[relevant_scores >= kth_score]
+                # Stable sort keeps document order between equal scores, like list.sort
+                best = best[np.argsort(-scores[best], kind='stable')]
+                return [(float(scores[i]), *matrix.spans[i]) for i in best]
+            
+            scored_sections = self._ranked_prefix(top_relevant, len(relevant), max_chars)
+            return self._select_sections(full_content, scored_sections, max_chars)
+        
+        # Lower-case once; per-section counts then run on offsets of the same buffer
+        content_lower = self._lower_with_offsets(full_content)
+        matcher = self._build_keyword_matcher(topic_keywords)
+        
+        # Score sections lazily, in document order
+        def iter_scored_sections() -> Iterator[Tuple[float, int, int]]:
+            for start, end in spans:
+                if content_lower is None:
+                    score = self._calculate_relevance_score(full_content[start:end], topic_keywords)
+                else:
+                    score = self._score_span(content_lower, start, end, topic_keywords, matcher)
+                if score > 0:
+                    yield score, start, end
+        
+        # No later section can outscore this: each keyword scores at most one point
+        # per 5 characters of a section, plus the header bonus, so the longest
+        # section still ahead bounds every later score. (Not when lower-casing
+        # changed lengths: sections are then scored on copies that may be longer.)
+        max_score_after = None
+        if content_lower is not None:
+            starts = [start for start, _ in spans]
+            suffix_max_len = [0] * (len(spans) + 1)
+            for i in range(len(spans) - 1, -1, -1):
+                suffix_max_len[i] = max(suffix_max_len[i + 1], spans[i][1] - spans[i][0])
+            keyword_count = len(topic_keywords)
+            def max_score_after(offset: int) -> float:
+                return keyword_count * (suffix_max_len[bisect.bisect_left(starts, offset)] / 5.0 + 10.0)
+        
+        # Keep only the best sections that can fit the budget, highest first
+        scored_sections = self._top_sections(iter_scored_sections(), max_chars, max_score_after)
+        
+        return self._select_sections(full_content, scored_sections, max_chars)
+    
+    def _ranked_prefix(self, top: Callable[[int], List[Tuple[float, int, int]]], count: int,
+                       max_chars: int) -> List[Tuple[float, int, int]]:
+        """
+        The best-first sections _select_sections can use, without ranking all count
+        scored sections: top(limit) returns (at least) the best limit of them, best
+        first. The limit doubles until those sections alone overflow max_chars, since
+        greedy selection stops at the first section that doesn't fit.
+        """
+        limit = RANKED_PREFIX_START
+        while True:
+            ranked = top(limit)
+            # Every section taken adds its length + 2, so greedy selection can't get past these
+            if len(ranked) >= count or sum(end - start + 2 for _, start, end in ranked) > max_chars + 2:
+                return ranked
+            limit *= 2
+    
+    def _top_sections(self, scored_sections: Iterable[Tuple[float, int, int]], max_chars: int,
+                      max_score_after: Optional[Callable[[int], float]] = None) -> List[Tuple[float, int, int]]:
+        """
+        The sections _select_sections can use, from (score, start, end) tuples in
+        document order, sorted best first (ties in document order).
+        
+        A bounded min-heap holds the candidates: the weakest is dropped once the
+        stronger ones alone exceed max_chars (greedy selection stops before it),
+        so memory follows the output size rather than the document's.
+        
+        Args:
+            scored_sections: Scored sections in document order (may be a generator)
+            max_chars: The extraction budget
+            max_score_after: Upper bound on the score of any section starting at or
+                after an offset; once the selection is full and its weakest section
+                beats the bound, the remaining sections are not scored at all
         
-        # Sort by relevance score (highest first)
-        scored_sections.sort(reverse=True, key=lambda x: x[0])
+        Returns:
+            Selected (score, start, end) tuples, best first
+        """
+        heap = []  # (score, -position, start, end): the weakest candidate on top
+        heap_chars = 0  # Characters the candidates add to the extraction
+        
+        for position, (score, start, end) in enumerate(scored_sections):
+            heapq.heappush(heap, (score, -position, start, end))
+            heap_chars += end - start + 2
+            
+            # Drop the weakest while the others already fill the budget
+            while heap_chars - (heap[0][3] - heap[0][2] + 2) > max_chars:
+                _, _, dropped_start, dropped_end = heapq.heappop(heap)
+                heap_chars -= dropped_end - dropped_start + 2
+            
+            # Full, and no later section could displace the weakest (ties go to the earlier one)
+            if (max_score_after is not None and heap_chars > max_chars
+                    and heap[0][0] >= max_score_after(end)):
+                break
         
+        return [(score, start, end) for score, _, start, end in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+    
+    def _select_sections(self, full_content: str, scored_sections: Iterable[Tuple[float, int, int]],
+                         max_chars: int) -> str:
+        """Greedily take the best (score, start, end) sections until max_chars is reached"""
         # Take top relevant sections (limited by max_chars for Gemini)
-        extracted_content = ""
+        parts = []
+        extracted_length = 0
         
-        for score, section in scored_sections:
+        for score, start, end in scored_sections:
             # Check if adding this section would exceed limit
-            if len(extracted_content) + len(section) <= max_chars:
-                extracted_content += section + "\n\n"
-            elif len(extracted_content) < max_chars * 0.8:
+            if extracted_length + (end - start) <= max_chars:
+                parts.append(full_content[start:end] + "\n\n")
+            elif extracted_length < max_chars * 0.8:
                 # If we haven't reached 80% of limit, add partial section
-                remaining = max_chars - len(extracted_content)
-                extracted_content += section[:remaining] + "...\n\n"
+                remaining = max_chars - extracted_length
+                parts.append(full_content[start:start + remaining] + "...\n\n")
                 break
             else:
                 break
+            extracted_length += len(parts[-1])
+        
+        extracted_content = "".join(parts)
         
         # If we got very little content, take from beginning
         if len(extracted_content) < 1000:
@@ -60,6 +444,172 @@ class ContentExtractor:
         
         return extracted_content.strip()
     
+    def digest_content(self, full_content: str) -> str:
+        """SHA-256 of the text, used as the memo cache key"""
+        return hashlib.sha256(full_content.encode('utf-8', 'surrogatepass')).hexdigest()
+    
+    def _content_index_key(self, content_index: Optional[Dict]) -> Optional[Tuple]:
+        if not content_index:
+            return None
+        return content_index.get('unit'), tuple(content_index.get('offsets') or ())
+    
+    def _cached_section_spans(self, full_content: str, key) -> List[Tuple[int, int]]:
+        """_section_spans, memoized; offsets are stored flat in an array to keep entries small"""
+        flat = self.section_cache.get(key)
+        if flat is not None:
+            return list(zip(flat[0::2], flat[1::2]))
+        
+        spans = self._section_spans(full_content)
+        self.section_cache.put(key, array('q', [offset for span in spans for offset in span]))
+        return spans
+    
+    def _lower_with_offsets(self, full_content: str) -> Optional[str]:
+        """full_content.lower(), or None if lower-casing changed its length (rare Unicode)"""
+        content_lower = full_content.lower()
+        return content_lower if len(content_lower) == len(full_content) else None
+    
+    def _build_keyword_matcher(self, keywords: List[str]) -> Optional[KeywordMatcher]:
+        """A KeywordMatcher for the topic if KEYWORD_MATCHER selects one, else None"""
+        if self.keyword_matcher == 'aho-corasick':
+            return KeywordMatcher(keywords)
+        if (self.keyword_matcher == 'auto' and AHOCORASICK_AVAILABLE
+                and len(keywords) >= AHO_CORASICK_MIN_KEYWORDS):
+            return KeywordMatcher(keywords)
+        return None
+    
+    def _section_matrix(self, full_content: str, key, spans: List[Tuple[int, int]],
+                        force: bool = False) -> Optional[SectionMatrix]:
+        """
+        The document's SectionMatrix if the sparse engine applies (built once and
+        memoized by key), else None. force skips the size threshold of the 'auto' engine.
+        """
+        if self.scoring_engine == 'python':
+            return None
+        if self.scoring_engine == 'auto' and len(spans) < SPARSE_MIN_SECTIONS and not force:
+            return None
+        if not SCIPY_AVAILABLE:
+            _log_sparse_unavailable()
+            return None
+        
+        matrix = self.matrix_cache.get(key)
+        if matrix is not None:
+            return matrix
+        
+        content_lower = self._lower_with_offsets(full_content)
+        if content_lower is None:
+            return None
+        
+        matrix = SectionMatrix(content_lower, spans)
+        self.matrix_cache.put(key, matrix)
+        return matrix
+    
+    def score_topics(self, full_content: str, topics: List[str],
+                     content_digest: Optional[str] = None) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        """
+        Score every section of a document against several topics at once.
+        
+        Returns:
+            (spans, scores) - section offsets and a (sections x topics) score array
+        """
+        content_digest = content_digest or self.digest_content(full_content)
+        keyword_lists = [self._extract_keywords(' '.join(topic.lower().split())) for topic in topics]
+        
+        spans = self._cached_section_spans(full_content, content_digest)
+        matrix = self._section_matrix(full_content, content_digest, spans, force=True)
+        if matrix is not None:
+            return matrix.spans, matrix.score_many(keyword_lists)
+        
+        content_lower = self._lower_with_offsets(full_content)
+        scores = np.zeros((len(spans), len(topics)))
+        if content_lower is None:
+            for row, (start, end) in enumerate(spans):
+                for column, keywords in enumerate(keyword_lists):
+                    scores[row, column] = self._calculate_relevance_score(full_content[start:end], keywords)
+            return spans, scores
+        
+        # One sweep per section: count every distinct keyword of every topic once
+        all_keywords = list(dict.fromkeys(keyword for keywords in keyword_lists for keyword in keywords))
+        matcher = self._build_keyword_matcher(all_keywords)
+        for row, (start, end) in enumerate(spans):
+            line_end = content_lower.find('\n', start, end)
+            line_end = end if line_end == -1 else line_end
+            if matcher is not None:
+                counts, in_first_line = matcher.scan(content_lower, start, end, line_end)
+            else:
+                counts = [content_lower.count(keyword, start, end) for keyword in all_keywords]
+                in_first_line = [content_lower.find(keyword, start, line_end) != -1 for keyword in all_keywords]
+            keyword_counts = dict(zip(all_keywords, counts))
+            keyword_hits = dict(zip(all_keywords, in_first_line))
+            
+            # Same summation order as _score_span, so scores match it exactly
+            for column, keywords in enumerate(keyword_lists):
+                score = 0.0
+                for keyword in keywords:
+                    score += keyword_counts[keyword] * (len(keyword) / 5.0)
+                for keyword in keywords:
+                    if keyword_hits[keyword]:
+                        score += 10.0
+                scores[row, column] = score
+        return spans, scores
+    
+    def extract_topics_content(self, full_content: str, topics: List[str], max_chars: int = 15000,
+                               content_digest: Optional[str] = None) -> Dict[str, str]:
+        """
+        Extract content for several topics from one document: the text is split
+        once and every section is scored against every topic in one sweep.
+        
+        Args:
+            full_content: The complete document text
+            topics: Topics to extract (e.g. a study plan's 8-12 topics)
+            max_chars: Maximum characters per topic
+            content_digest: Optional digest identifying full_content
+        
+        Returns:
+            Dict mapping each topic (as given) to its extracted content - the same
+            text extract_topic_content returns for it
+        """
+        content_digest = content_digest or self.digest_content(full_content)
+        
+        # Serve repeated topics from the memo cache, score the rest together
+        results = {}
+        pending = {}
+        for topic in topics:
+            normalized = ' '.join(topic.lower().split())
+            result_key = (content_digest, normalized, max_chars, None, False)
+            cached = self.topic_cache.get(result_key)
+            if cached is not None:
+                results[topic] = cached
+            else:
+                pending.setdefault(normalized, []).append(topic)
+        if not pending:
+            return results
+        
+        spans, scores = self.score_topics(full_content, list(pending), content_digest)
+        for column, (normalized, originals) in enumerate(pending.items()):
+            topic_scores = scores[:, column]
+            relevant = np.flatnonzero(topic_scores > 0)
+            relevant = relevant[np.argsort(-topic_scores[relevant], kind='stable')]
+            scored_sections = ((float(topic_scores[i]), *spans[i]) for i in relevant)
+            extracted_content = self._select_sections(full_content, scored_sections, max_chars)
+            
+            self.topic_cache.put((content_digest, normalized, max_chars, None, False), extracted_content)
+            for topic in originals:
+                results[topic] = extracted_content
+        return {topic: results[topic] for topic in topics}
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters and memory use of the memo caches"""
+        return {cache.name: cache.stats()
+                for cache in (self.section_cache, self.topic_cache, self.matrix_cache, self.index_cache)}
+    
+    def build_section_index(self, full_content: str, content_digest: Optional[str] = None) -> Dict:
+        """
+        Split the content into sections and build its BM25 inverted index (once per document).
+        content_digest identifies the text (e.g. its content cache key); computed when omitted.
+        """
+        return build_section_index(full_content, self._section_spans(full_content),
+                                   content_digest or self.digest_content(full_content))
+    
     def _extract_keywords(self, topic: str) -> List[str]:
         """Extract important keywords from topic"""
         # Remove common words
@@ -76,44 +626,78 @@ class ContentExtractor:
     
     def _split_into_sections(self, content: str) -> List[str]:
         """Split content into logical sections"""
-        # Try to split by headers (markdown style or numbered)
-        sections = []
-        
-        # Split by common section markers
-        patterns = [
-            r'\n#{1,6}\s+.+\n',  # Markdown headers
-            r'\n\d+\.\s+[A-Z].+\n',  # Numbered sections
-            r'\n[A-Z][A-Z\s]+\n',  # ALL CAPS headers
-            r'\n\n\n+',  # Multiple blank lines
-        ]
-        
-        current_section = ""
-        lines = content.split('\n')
-        
-        for line in lines:
-            # Check if this line is a section header
-            is_header = False
-            for pattern in patterns[:3]:  # Check header patterns
-                if re.match(pattern, '\n' + line + '\n'):
-                    is_header = True
-                    break
-            
-            if is_header and current_section.strip():
-                # Save current section and start new one
-                sections.append(current_section.strip())
-                current_section = line + '\n'
-            else:
-                current_section += line + '\n'
+        return [content[start:end] for start, end in self._section_spans(content)]
+    
+    def _section_spans(self, content: str) -> List[Tuple[int, int]]:
+        """
+        Split content into logical sections in a single pass, returning the
+        (start, end) offsets of each stripped section instead of copies.
+        A header line starts a new section unless only whitespace precedes it;
+        if that yields fewer than two sections, blank-line paragraphs are used.
+        """
+        spans = []
+        section_start = 0
         
-        # Add last section
-        if current_section.strip():
-            sections.append(current_section.strip())
+        for match in SECTION_HEADER_PATTERN.finditer(content):
+            header_start = match.start()
+            if NON_SPACE_PATTERN.search(content, section_start, header_start):
+                spans.append(self._strip_span(content, section_start, header_start))
+                section_start = header_start
+        
+        if NON_SPACE_PATTERN.search(content, section_start):
+            spans.append(self._strip_span(content, section_start, len(content)))
         
         # If no sections found, split by paragraphs
-        if len(sections) <= 1:
-            sections = [p.strip() for p in content.split('\n\n') if p.strip()]
+        if len(spans) <= 1:
+            spans = []
+            start = 0
+            while True:
+                separator = content.find('\n\n', start)
+                end = len(content) if separator == -1 else separator
+                if NON_SPACE_PATTERN.search(content, start, end):
+                    spans.append(self._strip_span(content, start, end))
+                if separator == -1:
+                    break
+                start = separator + 2
+        
+        return spans
+    
+    def _strip_span(self, content: str, start: int, end: int) -> Tuple[int, int]:
+        """Offsets of content[start:end].strip() (the span must contain non-whitespace)"""
+        start = NON_SPACE_PATTERN.search(content, start, end).start()
+        while content[end - 1].isspace():
+            end -= 1
+        return start, end
+    
+    def _score_span(self, content_lower: str, start: int, end: int, keywords: List[str],
+                    matcher: Optional[KeywordMatcher] = None) -> float:
+        """
+        _calculate_relevance_score for content[start:end], without copying the section.
+        With a matcher (built for these keywords) all counts come from one scan.
+        """
+        score = 0.0
+        
+        line_end = content_lower.find('\n', start, end)
+        line_end = end if line_end == -1 else line_end
+        if matcher is not None:
+            counts, in_first_line = matcher.scan(content_lower, start, end, line_end)
+            for keyword, count in zip(keywords, counts):
+                score += count * (len(keyword) / 5.0)
+            # Bonus for section headers containing keywords
+            for hit in in_first_line:
+                if hit:
+                    score += 10.0
+            return score
+        
+        for keyword in keywords:
+            score += content_lower.count(keyword, start, end) * (len(keyword) / 5.0)
+        
+        # Bonus for section headers containing keywords
+        for keyword in keywords:
+            if content_lower.find(keyword, start, line_end) != -1:
+                score += 10.0
         
-        return sections
+        return score
     
     def _calculate_relevance_score(self, section: str, keywords: List[str]) -> float:
         """Calculate how relevant a section is to the topic"""
@@ -137,45 +721,123 @@ class ContentExtractor:
         
         return score
     
-    def extract_chapter_content(self, full_content: str, chapter_keywords: List[str]) -> str:
+    def parse_unit_range(self, topic: str) -> Tuple[Optional[Tuple[int, int]], str]:
+        """
+        Find a page or slide range in a topic.
+        
+        Returns:
+            ((first, last), topic_without_range) - range is None if the topic has none
+        """
+        match = UNIT_RANGE_PATTERN.search(topic)
+        if not match:
+            return None, topic
+        
+        first = int(match.group(1))
+        last = int(match.group(2)) if match.group(2) else first
+        if last < first:
+            first, last = last, first
+        
+        remaining = (topic[:match.start()] + topic[match.end():]).strip(' ,;:-–()')
+        return (first, last), remaining
+    
+    def slice_units(self, full_content: str, content_index: Dict, first: int, last: int) -> Optional[str]:
+        """
+        Return pages/slides first..last (1-based, inclusive) using the offset index,
+        without rescanning the content. Returns None if the index can't serve the range.
+        """
+        offsets = content_index.get('offsets') or []
+        unit_count = len(offsets) - 1
+        if content_index.get('unit') not in ('page', 'slide') or unit_count < 1:
+            return None
+        if first > unit_count or last < 1:
+            return None
+        
+        first = max(first, 1)
+        last = min(last, unit_count)
+        return full_content[offsets[first - 1]:offsets[last]].strip()
+    
+    def find_topic_pages(self, topic: str, sections: List[Dict],
+                         page_labels: Optional[List[str]] = None) -> List[Tuple[int, int]]:
+        """
+        Find the pages a topic is about from a PDF's outline, before any text is extracted.
+        A page range in the topic wins (matched against the printed page labels,
+        so "pp. 120-160" means the pages numbered 120-160); otherwise the outline
+        sections whose titles best match the topic keywords are used.
+        
+        Args:
+            topic: The topic (e.g., "Transactions in DBMS")
+            sections: Outline sections with title, start and end (0-based, inclusive)
+            page_labels: Printed label of each page, if the PDF defines them
+        
+        Returns:
+            Merged (start, end) page ranges, 0-based and inclusive - empty if nothing matched
+        """
+        unit_range, _ = self.parse_unit_range(topic)
+        if unit_range:
+            first, last = unit_range
+            labels = page_labels or []
+            if str(first) in labels and str(last) in labels:
+                start = labels.index(str(first))
+                end = len(labels) - 1 - labels[::-1].index(str(last))
+                if end >= start:
+                    return [(start, end)]
+            return [(first - 1, last - 1)]
+        
+        # Word keywords only - the whole-topic phrase rarely appears verbatim in a bookmark
+        keywords = [k for k in self._extract_keywords(topic) if ' ' not in k]
+        if not keywords or not sections:
+            return []
+        
+        # Tolerate plurals: "transactions" should match a "Transaction Management" bookmark
+        patterns = [re.compile(r'\b' + re.escape(k[:-1] if k.endswith('s') and len(k) > 3 else k))
+                    for k in keywords]
+        
+        scored = []
+        for section in sections:
+            title = section['title'].lower()
+            score = sum(1 for pattern in patterns if pattern.search(title))
+            if score:
+                scored.append((score, section))
+        if not scored:
+            return []
+        
+        best = max(score for score, _ in scored)
+        if best < (len(keywords) + 1) // 2:
+            return []
+        
+        ranges = sorted((s['start'], s['end']) for score, s in scored if score == best)
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            if start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+    
+    def build_toc_index(self, full_content: str) -> Dict:
+        """Build the document's table of contents (chapter/unit/section spans), once per document"""
+        return build_toc_index(full_content)
+    
+    def extract_chapter_content(self, full_content: str, chapter_keywords: List[str],
+                                toc_index: Optional[Dict] = None) -> str:
         """
         Extract a specific chapter or unit from content.
         
         Args:
             full_content: The complete document text
             chapter_keywords: Keywords identifying the chapter (e.g., ["chapter 5", "transactions"])
+            toc_index: Optional stored table of contents of full_content (see build_toc_index).
+                Built on the fly when missing or stale.
         
         Returns:
             Extracted chapter content
         """
-        sections = self._split_into_sections(full_content)
+        if not toc_matches(toc_index, full_content):
+            toc_index = self.build_toc_index(full_content)
         
-        # Find sections matching chapter keywords
-        chapter_sections = []
-        in_chapter = False
-        
-        for i, section in enumerate(sections):
-            section_lower = section.lower()
-            
-            # Check if this section starts the chapter
-            matches_start = any(keyword.lower() in section_lower[:200] for keyword in chapter_keywords)
-            
-            if matches_start:
-                in_chapter = True
-            
-            # Check if we've moved to next chapter
-            if in_chapter and i > 0:
-                # Look for next chapter markers
-                next_chapter_markers = ['chapter', 'unit', 'section', 'part']
-                first_line = section.split('\n')[0].lower()
-                
-                # If we see a new chapter marker and it's not our chapter, stop
-                if any(marker in first_line for marker in next_chapter_markers):
-                    if not any(keyword.lower() in first_line for keyword in chapter_keywords):
-                        break
-            
-            if in_chapter:
-                chapter_sections.append(section)
+        # Look the chapter up in the table of contents ('chapter 5' by key, else by title)
+        chapter_sections = [full_content[entry['start']:entry['end']].strip()
+                            for entry in find_toc_entries(toc_index, chapter_keywords)]
         
         if chapter_sections:
             return '\n\n'.join(chapter_sections)
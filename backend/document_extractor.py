@@ -0,0 +1,603 @@
+"""
+Document Extractor
+Streaming, page-level text extraction for uploaded documents.
+Each file format has a pluggable extractor, looked up by extension, that
+imports its parser library only on first use and yields the text segment
+by segment so callers never need the whole document in memory.
+Large PDFs are split across a process pool.
+"""
+
+import abc
+import codecs
+import importlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ooxml_extractor import iter_docx_blocks, iter_pptx_slides
+from pdf_backends import PageReader, get_backend
+
+# Default number of worker processes used for PDF extraction
+DEFAULT_PDF_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', os.cpu_count() or 1))
+
+# PDFs with fewer pages than this are parsed in-process (pool start-up isn't worth it)
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 32))
+
+# Bytes read per block from plain-text files and spilled uploads
+TEXT_SEGMENT_SIZE = 1024 * 1024
+
+# How DOCX/PPTX files are read: 'stream' parses the XML parts incrementally
+# (flat memory, includes tables and speaker notes); 'object' uses python-docx/python-pptx
+OOXML_MODE = os.getenv('OOXML_MODE', 'stream').lower()
+
+# A document source is either a path on disk or a seekable binary file object
+Source = Union[str, BinaryIO]
+
+# (kind, title) on the first segment of a page / slide / heading section, else None
+Unit = Optional[Tuple[str, Optional[str]]]
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the shared PDF process pool. It is created once, with at least
+    DEFAULT_PDF_WORKERS processes, and never replaced: other threads may be
+    extracting with it. A larger workers value just queues more ranges on it.
+    """
+    global _pdf_pool
+
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # The server is multi-threaded by the time a large PDF arrives; forking it can
+            # copy locks held by other threads, so start workers from a clean process
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pdf_pool = ProcessPoolExecutor(max_workers=max(workers, DEFAULT_PDF_WORKERS), mp_context=context)
+        return _pdf_pool
+
+
+def _extract_pages(reader: PageReader, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """
+    Extract pages [start, end) from an open PageReader.
+
+    Returns:
+        List of (page_number, text, seconds) tuples
+    """
+    results = []
+    for page_number in range(start, end):
+        page_start = time.perf_counter()
+        try:
+            text = reader.page_text(page_number)
+        except Exception as e:
+            print(f"⚠️  Could not extract page {page_number + 1}: {e}")
+            text = ""
+        results.append((page_number, text, time.perf_counter() - page_start))
+    return results
+
+
+def _extract_pdf_page_range(filepath: str, start: int, end: int,
+                            backend_name: Optional[str] = None) -> Tuple[List[Tuple[int, str, float]], int]:
+    """
+    Worker-process entry point: open the PDF and extract pages [start, end).
+
+    Returns:
+        (results, fallback_pages) - see _extract_pages for results
+    """
+    reader = PageReader(filepath, get_backend(backend_name))
+    try:
+        return _extract_pages(reader, start, end), reader.fallback_pages
+    finally:
+        reader.close()
+
+
+def _split_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous ranges, several per worker to balance uneven pages"""
+    batches = max(1, min(page_count, workers * 4))
+    batch_size = -(-page_count // batches)  # ceil division
+    return [(start, min(start + batch_size, page_count))
+            for start in range(0, page_count, batch_size)]
+
+
+def iter_pdf_pages(source: Source, workers: Optional[int] = None,
+                   stats: Optional[Dict] = None, backend: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the text of every page in a PDF, in page order.
+    Large PDFs are spread across a process pool; page ranges are yielded as
+    soon as they (and every range before them) are done.
+
+    Args:
+        source: Path to the PDF, or a seekable binary file object
+        workers: Number of worker processes (default PDF_EXTRACT_WORKERS or CPU count)
+        stats: Optional dict filled with page count, worker count, backend and per-page timings
+        backend: PDF text backend name (default PDF_BACKEND, 'auto' = fastest installed)
+    """
+    workers = max(1, workers or DEFAULT_PDF_WORKERS)
+    stats = stats if stats is not None else {}
+    started = time.perf_counter()
+    page_times = []
+    stats.update({'pages': 0, 'workers': 1, 'page_times': page_times, 'total_time': 0.0,
+                  'backend': None, 'fallback_pages': 0})
+
+    reader = PageReader(source, get_backend(backend))
+    try:
+        page_count = reader.page_count
+        stats['pages'] = page_count
+        stats['backend'] = reader.backend.name
+
+        if workers == 1 or page_count < PARALLEL_MIN_PAGES:
+            for page_number in range(page_count):
+                _, text, seconds = _extract_pages(reader, page_number, page_number + 1)[0]
+                page_times.append(seconds)
+                stats['fallback_pages'] = reader.fallback_pages
+                yield text
+            return
+    finally:
+        stats['total_time'] = time.perf_counter() - started
+        reader.close()
+
+    # Worker processes need a path to open; spill in-memory uploads to a temp file
+    temp_path = None
+    if isinstance(source, str):
+        filepath = source
+    else:
+        source.seek(0)
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as temp_file:
+            for block in iter(lambda: source.read(TEXT_SEGMENT_SIZE), b''):
+                temp_file.write(block)
+        filepath = temp_path
+
+    try:
+        stats['workers'] = workers
+        pool = _get_pdf_pool(workers)
+        futures = [pool.submit(_extract_pdf_page_range, filepath, start, end, stats['backend'])
+                   for start, end in _split_page_ranges(page_count, workers)]
+        # Ranges are contiguous and submitted in order, so yielding per future keeps page order
+        for future in futures:
+            results, fallback_pages = future.result()
+            stats['fallback_pages'] += fallback_pages
+            for _, text, seconds in results:
+                page_times.append(seconds)
+                yield text
+    finally:
+        stats['total_time'] = time.perf_counter() - started
+        if temp_path:
+            os.remove(temp_path)
+
+
+def extract_pdf_pages(source: Source, workers: Optional[int] = None,
+                      backend: Optional[str] = None) -> Tuple[List[str], Dict]:
+    """
+    Extract the text of every page in a PDF.
+
+    Returns:
+        (page_texts, stats) where page_texts is in page order and stats holds
+        per-page timings in seconds
+    """
+    stats = {}
+    page_texts = list(iter_pdf_pages(source, workers, stats, backend))
+    return page_texts, stats
+
+
+def extract_pdf_text(source: Source, workers: Optional[int] = None,
+                     backend: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Extract the full text of a PDF, one page per line block, joined in page order.
+
+    Returns:
+        (text, stats) - see extract_pdf_pages for stats
+    """
+    page_texts, stats = extract_pdf_pages(source, workers, backend)
+    return "\n".join(page_texts), stats
+
+
+def _roman(number: int) -> str:
+    numerals = [(1000, 'm'), (900, 'cm'), (500, 'd'), (400, 'cd'), (100, 'c'), (90, 'xc'),
+                (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i')]
+    result = ''
+    for value, numeral in numerals:
+        while number >= value:
+            result += numeral
+            number -= value
+    return result
+
+
+def _read_page_labels(reader, page_count: int) -> List[str]:
+    """
+    Decode the /PageLabels number tree into one printed label per page
+    (PyPDF2 3.0 doesn't expose page labels). Returns [] if the PDF has none.
+    """
+    root = reader.trailer['/Root']
+    if '/PageLabels' not in root:
+        return []
+
+    ranges = []
+
+    def collect(node):
+        node = node.get_object()
+        nums = node.get('/Nums', [])
+        for position in range(0, len(nums) - 1, 2):
+            ranges.append((int(nums[position]), nums[position + 1].get_object()))
+        for kid in node.get('/Kids', []):
+            collect(kid)
+
+    collect(root['/PageLabels'])
+    ranges.sort(key=lambda item: item[0])
+
+    labels = [str(page + 1) for page in range(page_count)]
+    for position, (first_page, label) in enumerate(ranges):
+        last_page = ranges[position + 1][0] if position + 1 < len(ranges) else page_count
+        style = label.get('/S')
+        prefix = str(label.get('/P', ''))
+        start = int(label.get('/St', 1))
+        for page in range(max(first_page, 0), min(last_page, page_count)):
+            number = start + page - first_page
+            if style == '/D':
+                text = str(number)
+            elif style in ('/R', '/r'):
+                text = _roman(number)
+                text = text.upper() if style == '/R' else text
+            elif style in ('/A', '/a'):
+                letter = chr(ord('a') + (number - 1) % 26) * ((number - 1) // 26 + 1)
+                text = letter.upper() if style == '/A' else letter
+            else:
+                text = ''
+            labels[page] = prefix + text
+    return labels
+
+
+def read_pdf_outline(source: Source) -> Tuple[List[Dict], List[str], int]:
+    """
+    Read a PDF's bookmarks and page labels without extracting any page text.
+
+    Returns:
+        (sections, page_labels, page_count). sections is a list of dicts with
+        title, level, start and end (0-based, inclusive pages) in outline order;
+        page_labels holds the printed label of each page (e.g. 'xii', '120').
+    """
+    PyPDF2 = importlib.import_module('PyPDF2')
+    reader = PyPDF2.PdfReader(source)
+    page_count = len(reader.pages)
+
+    try:
+        page_labels = _read_page_labels(reader, page_count)
+    except Exception as e:
+        print(f"⚠️  Could not read PDF page labels: {e}")
+        page_labels = []
+
+    entries = []
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                walk(item, level + 1)
+                continue
+            try:
+                page_number = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            if page_number is not None and 0 <= page_number < page_count:
+                entries.append((str(item.title or '').strip(), level, page_number))
+
+    try:
+        walk(reader.outline, 0)
+    except Exception as e:
+        print(f"⚠️  Could not read PDF outline: {e}")
+
+    # A section runs until the next bookmark at the same or a higher level
+    sections = []
+    for position, (title, level, start) in enumerate(entries):
+        end = page_count - 1
+        for _, next_level, next_start in entries[position + 1:]:
+            if next_level <= level:
+                end = max(start, next_start - 1)
+                break
+        sections.append({'title': title, 'level': level, 'start': start, 'end': end})
+
+    return sections, page_labels, page_count
+
+
+def iter_pdf_page_ranges(source: Source, ranges: Iterable[Tuple[int, int]],
+                         backend: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for only the given pages, in-process.
+    ranges are 0-based inclusive (start, end) pairs; overlapping ranges are merged.
+    """
+    pages = sorted({page for start, end in ranges for page in range(start, end + 1)})
+    reader = PageReader(source, get_backend(backend))
+    try:
+        for page_number in pages:
+            if page_number < reader.page_count:
+                yield _extract_pages(reader, page_number, page_number + 1)[0][:2]
+    finally:
+        reader.close()
+
+
+def iter_text_file(source: Source) -> Iterator[str]:
+    """
+    Yield a UTF-8 text file in bounded segments, split on line breaks so that
+    joining the segments with newlines reproduces the file exactly.
+    """
+    file = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        buffer = ""
+        for block in iter(lambda: file.read(TEXT_SEGMENT_SIZE), b''):
+            buffer += decoder.decode(block)
+            cut = buffer.rfind('\n')
+            if cut >= 0:
+                yield buffer[:cut]
+                buffer = buffer[cut + 1:]
+        yield buffer + decoder.decode(b'', final=True)
+    finally:
+        if file is not source:
+            file.close()
+
+
+class ContentIndexBuilder:
+    """
+    Records where each page, slide or heading starts while segments stream past,
+    producing a compact offset index into the final (stripped) document text:
+
+        {"unit": "page", "offsets": [0, 1834, 3920, ...]}
+
+    Unit i (0-based) spans text[offsets[i]:offsets[i + 1]]. DOCX headings also
+    get a parallel "titles" list.
+    """
+
+    def __init__(self, separator: str = "\n"):
+        self.separator = separator
+        self.kind = None
+        self.starts = []
+        self.titles = []
+        self._raw_length = 0
+        self._first = True
+
+    def track(self, tagged_segments: Iterable[Tuple[Unit, str]]) -> Iterator[str]:
+        """Pass (unit, text) pairs through as plain text, noting where each new unit opens"""
+        for unit, text in tagged_segments:
+            start = self._raw_length if self._first else self._raw_length + len(self.separator)
+            if unit is not None:
+                self.kind, title = unit
+                self.starts.append(start)
+                self.titles.append(title)
+            self._raw_length = start + len(text)
+            self._first = False
+            yield text
+
+    def build(self, leading_stripped: int, length: int) -> Optional[Dict]:
+        """
+        Args:
+            leading_stripped: Characters removed from the front by iter_stripped_text
+            length: Length of the final text
+        """
+        if not self.starts:
+            return None
+
+        offsets = [min(max(start - leading_stripped, 0), length) for start in self.starts]
+        index = {'unit': self.kind, 'offsets': offsets + [length]}
+        if any(self.titles):
+            index['titles'] = self.titles
+        return index
+
+
+class FormatExtractor(abc.ABC):
+    """
+    Base class for a document format. Subclasses list the extensions they handle
+    and implement iter_segments(); parser libraries are imported inside
+    iter_segments so workers that never see the format never pay for the import.
+    """
+
+    extensions: Tuple[str, ...] = ()
+
+    @abc.abstractmethod
+    def iter_segments(self, source: Source, stats: Optional[Dict] = None,
+                      **options) -> Iterator[Tuple[Unit, str]]:
+        """
+        Yield (unit, text) pairs. unit is (kind, title) on the first segment of a
+        new page / slide / heading section and None for segments continuing it.
+        Joining the texts with newlines gives the full document text.
+        """
+
+
+class PDFExtractor(FormatExtractor):
+    extensions = ('pdf',)
+
+    def iter_segments(self, source, stats=None, pdf_workers=None, pdf_backend=None, **options):
+        for text in iter_pdf_pages(source, pdf_workers, stats, pdf_backend):
+            yield ('page', None), text
+
+
+class DocxExtractor(FormatExtractor):
+    extensions = ('doc', 'docx')
+
+    def iter_segments(self, source, stats=None, **options):
+        docx = importlib.import_module('docx')
+        doc = docx.Document(source)
+        for position, paragraph in enumerate(doc.paragraphs):
+            style_name = paragraph.style.name if paragraph.style is not None else ''
+            if style_name.startswith('Heading') or style_name == 'Title':
+                yield ('heading', paragraph.text.strip()), paragraph.text
+            elif position == 0:
+                # Text before the first heading gets an untitled section
+                yield ('heading', ''), paragraph.text
+            else:
+                yield None, paragraph.text
+
+
+class PptxExtractor(FormatExtractor):
+    extensions = ('ppt', 'pptx')
+
+    def iter_segments(self, source, stats=None, **options):
+        pptx = importlib.import_module('pptx')
+        prs = pptx.Presentation(source)
+        for slide in prs.slides:
+            unit = ('slide', None)
+            for shape in slide.shapes:
+                if hasattr(shape, "text"):
+                    yield unit, shape.text
+                    unit = None
+            if unit is not None:
+                # Keep slide numbering aligned even when a slide has no text
+                yield unit, ''
+
+
+class StreamingDocxExtractor(FormatExtractor):
+    """DOCX via incremental XML parsing - also reads table rows (cells joined with ' | ')"""
+
+    extensions = ('docx',)
+
+    def iter_segments(self, source, stats=None, **options):
+        first = True
+        for kind, text in iter_docx_blocks(source):
+            if kind == 'heading':
+                yield ('heading', text.strip()), text
+            elif first:
+                yield ('heading', ''), text
+            else:
+                yield None, text
+            first = False
+
+
+class StreamingPptxExtractor(FormatExtractor):
+    """PPTX via incremental XML parsing - also reads table rows and speaker notes"""
+
+    extensions = ('pptx',)
+
+    def iter_segments(self, source, stats=None, **options):
+        current_slide = None
+        for slide_number, text in iter_pptx_slides(source):
+            if slide_number != current_slide:
+                current_slide = slide_number
+                yield ('slide', None), text
+            else:
+                yield None, text
+
+
+class TextExtractor(FormatExtractor):
+    extensions = ('txt',)
+
+    def iter_segments(self, source, stats=None, **options):
+        for text in iter_text_file(source):
+            yield None, text
+
+
+# Extension -> extractor
+_extractors: Dict[str, FormatExtractor] = {}
+
+
+def register_extractor(extractor: FormatExtractor, extensions: Optional[Iterable[str]] = None) -> None:
+    """
+    Register an extractor for its extensions (or the ones given), replacing any
+    extractor previously registered for them.
+    """
+    if not isinstance(extractor, FormatExtractor):
+        raise TypeError(f"Expected a FormatExtractor instance, got {type(extractor).__name__}")
+    for extension in (extensions or extractor.extensions):
+        _extractors[extension.lower().lstrip('.')] = extractor
+
+
+def get_extractor(filename: str) -> Optional[FormatExtractor]:
+    """Return the extractor registered for a file name's extension, or None"""
+    return _extractors.get(filename.lower().split('.')[-1])
+
+
+for _extractor in (PDFExtractor(), DocxExtractor(), PptxExtractor(), TextExtractor()):
+    register_extractor(_extractor)
+
+if OOXML_MODE == 'stream':
+    # Legacy .doc/.ppt aren't zip packages, so they stay on the object-model extractors
+    register_extractor(StreamingDocxExtractor())
+    register_extractor(StreamingPptxExtractor())
+elif OOXML_MODE != 'object':
+    print(f"⚠️  Unknown OOXML_MODE '{OOXML_MODE}', using python-docx/python-pptx")
+
+
+def iter_file_segments(source: Source, filename: str, pdf_workers: Optional[int] = None,
+                       stats: Optional[Dict] = None,
+                       index: Optional[ContentIndexBuilder] = None, **options) -> Iterator[str]:
+    """
+    Yield the text of a document segment by segment (page, paragraph or shape).
+    Joining the segments with newlines gives the full document text.
+    Unsupported formats yield nothing.
+
+    Args:
+        source: Path to the file, or a seekable binary file object
+        filename: Original file name, used to pick the extractor
+        pdf_workers: Worker processes for PDF extraction
+        stats: Optional dict filled with PDF extraction timings
+        index: Optional ContentIndexBuilder that records page/slide/heading offsets
+        options: Format-specific options passed to the extractor (e.g. pdf_backend)
+    """
+    extractor = get_extractor(filename)
+    if extractor is None:
+        return
+
+    tagged = extractor.iter_segments(source, stats=stats, pdf_workers=pdf_workers, **options)
+    if index is not None:
+        yield from index.track(tagged)
+    else:
+        for _, text in tagged:
+            yield text
+
+
+def iter_stripped_text(segments: Iterable[str], separator: str = "\n",
+                       counts: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Stream the equivalent of separator.join(segments).strip() without building it.
+    Trailing whitespace is held back until more text arrives, so memory stays
+    bounded by the largest single segment.
+
+    Args:
+        counts: Optional dict filled with 'leading' (characters stripped from the
+            front) and 'length' (characters yielded)
+    """
+    counts = counts if counts is not None else {}
+    counts.update({'leading': 0, 'length': 0})
+    started = False
+    pending = ""
+    first = True
+
+    for segment in segments:
+        piece = segment if first else separator + segment
+        first = False
+
+        if not started:
+            stripped = piece.lstrip()
+            counts['leading'] += len(piece) - len(stripped)
+            piece = stripped
+            if not piece:
+                continue
+            started = True
+
+        body = piece.rstrip()
+        if body:
+            if pending:
+                counts['length'] += len(pending)
+                yield pending
+            counts['length'] += len(body)
+            yield body
+            pending = piece[len(body):]
+        else:
+            pending += piece
+
+
+def format_pdf_stats(stats: Dict) -> str:
+    """Human-readable summary of extraction timings for logging"""
+    page_times = stats.get('page_times') or []
+    if not page_times:
+        return f"0 pages in {stats.get('total_time', 0):.2f}s"
+
+    slowest = max(range(len(page_times)), key=page_times.__getitem__)
+    average = sum(page_times) / len(page_times)
+    fallback = f", {stats['fallback_pages']} via fallback" if stats.get('fallback_pages') else ""
+    return (f"{stats['pages']} pages in {stats['total_time']:.2f}s "
+            f"with {stats['workers']} worker(s) using {stats.get('backend')}{fallback} - "
+            f"avg {average * 1000:.1f}ms/page, "
+            f"slowest page {slowest + 1} ({page_times[slowest] * 1000:.1f}ms)")
@@ -1,13 +1,84 @@
-import google.generativeai as genai
+import asyncio
 import os
 from dotenv import load_dotenv
 import json
-import time
+from async_tasks import EventLoopThread, gather_with_deadline
+from content_compressor import compress_content
+from json_stream import JSONArrayStream
+from rate_limiter import TokenBucketLimiter, estimate_tokens
+from response_cache import ResponseCache, response_cache_key
+from single_flight import SingleFlight
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
 
 load_dotenv()
 
+# Source text budget of a learning-chunks prompt. Longer content is compressed to
+# its most topic-relevant sentences (or cut off when CONTENT_COMPRESSION is false)
+LLM_CONTENT_MAX_CHARS = int(os.getenv('LLM_CONTENT_MAX_CHARS', 8000))
+CONTENT_COMPRESSION = os.getenv('CONTENT_COMPRESSION', 'true').lower() == 'true'
+
+# Gemini quota: requests and prompt tokens per minute, plus a burst of back-to-back requests.
+# Set GEMINI_RATE_LIMIT_DB to share the quota between worker processes.
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', 10))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', 250000))
+GEMINI_BURST = int(os.getenv('GEMINI_BURST', 2))
+GEMINI_RATE_LIMIT_DB = os.getenv('GEMINI_RATE_LIMIT_DB')
+# Give up (and use fallback content) rather than queue longer than this many seconds
+GEMINI_MAX_QUEUE_WAIT = float(os.getenv('GEMINI_MAX_QUEUE_WAIT', 60))
+
+# Persistent response cache shared by worker processes (identical prompts skip the API)
+GEMINI_CACHE_ENABLED = os.getenv('GEMINI_CACHE_ENABLED', 'true').lower() == 'true'
+GEMINI_CACHE_DB = os.getenv('GEMINI_CACHE_DB', 'gemini_cache.db')
+GEMINI_CACHE_TTL = float(os.getenv('GEMINI_CACHE_TTL', 7 * 24 * 3600))
+GEMINI_CACHE_MAX_BYTES = int(os.getenv('GEMINI_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def build_summary_prompt(topic, content=''):
+    """Prompt for a topic summary (from up to 3000 characters of study material, if given)"""
+    if content:
+        return f"""Based on the following study materials about {topic}, generate a comprehensive summary:
+
+{content[:3000]}
+
+Please provide:
+1. Key concepts and definitions
+2. Main points to remember
+3. Important relationships or connections
+4. Practical applications
+5. Common misconceptions to avoid
+
+Keep it concise but informative, around 200-300 words."""
+    return f"""Generate a comprehensive summary for the topic: {topic}
+
+Please provide:
+1. Key concepts and definitions
+2. Main points to remember
+3. Important relationships or connections
+4. Practical applications
+5. Common misconceptions to avoid
+
+Keep it concise but informative, around 200-300 words."""
+
+
+class CachedResponse:
+    """Stands in for a Gemini response served from the response cache"""
+    def __init__(self, text):
+        self.text = text
+
 class GeminiService:
+    """
+    Gemini calls for learning content. The *_async methods are the implementation
+    (built on generate_content_async, so independent generations run concurrently);
+    the synchronous methods run them on the service's background event loop.
+    """
     def __init__(self):
+        if not GENAI_AVAILABLE:
+            raise ImportError("google-generativeai is not installed")
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
@@ -21,28 +92,72 @@ class GeminiService:
             'max_output_tokens': 8192,  # Increased for complete responses
         }
         # Use gemini-2.5-flash - CONFIRMED available with your API key!
-        self.model = genai.GenerativeModel('gemini-2.5-flash', generation_config=generation_config)
-        self.last_request_time = 0
-        self.min_request_interval = 6  # 6 seconds between requests (10 per minute max)
+        self.model_name = 'gemini-2.5-flash'
+        self.generation_config = generation_config
+        self.model = genai.GenerativeModel(self.model_name, generation_config=generation_config)
+        self.response_cache = (ResponseCache(GEMINI_CACHE_DB, GEMINI_CACHE_TTL, GEMINI_CACHE_MAX_BYTES)
+                               if GEMINI_CACHE_ENABLED else None)
+        # Identical prompts in flight at once (e.g. a class opening the same topic) share one call
+        self.single_flight = SingleFlight()
+        self.rate_limiter = TokenBucketLimiter(GEMINI_RPM, GEMINI_TPM, burst=GEMINI_BURST,
+                                               sqlite_path=GEMINI_RATE_LIMIT_DB)
+        # All async calls share one loop (and the async client's connections bound to it)
+        self.loop = EventLoopThread(name='gemini-service')
+    
+    async def _rate_limit(self, prompt=''):
+        """
+        Ensure we don't exceed rate limits: reserve a slot in the shared token bucket
+        and wait for it. Raises RateLimitExceeded if the queue is longer than
+        GEMINI_MAX_QUEUE_WAIT.
+        """
+        # The shared (SQLite) limiter may block on its lock, so reserve off the loop
+        reservation = await asyncio.to_thread(self.rate_limiter.reserve, estimate_tokens(prompt),
+                                              max_wait=GEMINI_MAX_QUEUE_WAIT)
+        if reservation.wait > 0:
+            print(f"⏳ Rate limiting: {reservation.position} request(s) ahead, waiting {reservation.wait:.1f}s...")
+            await asyncio.sleep(reservation.wait)
+        return reservation
     
-    def _rate_limit(self):
-        """Ensure we don't exceed rate limits"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+    def _cache_key(self, prompt):
+        return response_cache_key(self.model_name, self.generation_config, prompt)
+    
+    async def _forget_response(self, prompt):
+        """Drop a cached response that turned out to be unusable (e.g. unparseable JSON)"""
+        if self.response_cache:
+            await asyncio.to_thread(self.response_cache.delete, self._cache_key(prompt))
+    
+    async def _call_with_retry(self, prompt, max_retries=2, use_cache=True, cacheable=True):
+        """
+        Call Gemini API with retry logic for rate limits and timeouts.
+        Identical prompts are answered from the response cache unless use_cache is False
+        (a bypassed call still refreshes the cached response), and identical prompts
+        already in flight share that call. cacheable=False skips both.
+        """
+        if not cacheable:
+            return await self._generate_with_retry(prompt, max_retries)
         
-        if time_since_last < self.min_request_interval:
-            wait_time = self.min_request_interval - time_since_last
-            print(f"⏳ Rate limiting: waiting {wait_time:.1f}s...")
-            time.sleep(wait_time)
+        key = self._cache_key(prompt)
+        if self.response_cache and use_cache:
+            cached_text = await asyncio.to_thread(self.response_cache.get, key)
+            if cached_text is not None:
+                print(f"💾 Gemini response served from cache")
+                return CachedResponse(cached_text)
         
-        self.last_request_time = time.time()
+        # Concurrent callers with the same prompt wait for the first one's call (or error)
+        return await self.single_flight.do_async(key, lambda: self._generate_with_retry(prompt, max_retries, key))
     
-    def _call_with_retry(self, prompt, max_retries=2):
-        """Call Gemini API with retry logic for rate limits and timeouts"""
+    async def _generate_with_retry(self, prompt, max_retries=2, cache_key=None):
+        """Send the prompt to Gemini, retrying rate limits and timeouts; stores the response under cache_key"""
         for attempt in range(max_retries + 1):
             try:
-                self._rate_limit()  # Enforce rate limiting
-                response = self.model.generate_content(prompt)
+                await self._rate_limit(prompt)  # Enforce rate limiting
+                response = await self.model.generate_content_async(prompt)
+                if self.response_cache and cache_key and response is not None:
+                    try:
+                        await asyncio.to_thread(self.response_cache.put, cache_key, response.text)
+                    except Exception as e:
+                        # Blocked/empty responses have no text; just don't cache them
+                        print(f"⚠️  Response not cached: {e}")
                 return response
             except Exception as e:
                 error_str = str(e)
@@ -58,7 +173,7 @@ class GeminiService:
                             retry_delay = 10
                         
                         print(f"⚠️  Rate limit hit. Retrying in {retry_delay:.1f}s... (attempt {attempt + 1}/{max_retries + 1})")
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                     else:
                         print(f"❌ Rate limit exceeded after {max_retries + 1} attempts")
                         raise
@@ -69,7 +184,7 @@ class GeminiService:
                         retry_delay = 5  # Wait 5 seconds before retry
                         print(f"⏱️  Request timed out. Retrying in {retry_delay}s... (attempt {attempt + 1}/{max_retries + 1})")
                         print(f"💡 Tip: Content might be too long. Consider using a more specific topic.")
-                        time.sleep(retry_delay)
+                        await asyncio.sleep(retry_delay)
                     else:
                         print(f"❌ Request timed out after {max_retries + 1} attempts")
                         print(f"💡 Using fallback content. Try a more specific topic next time.")
@@ -81,10 +196,69 @@ class GeminiService:
         
         return None
     
-    def generate_learning_chunks(self, content, topic):
+    async def generate_learning_chunks_async(self, content, topic, use_cache=True):
         """Break content into comprehensive, in-depth learning chunks"""
-        # Limit content to prevent truncation - use first 8000 chars for better processing
-        content_preview = content[:8000] if len(content) > 8000 else content
+        prompt = await self._learning_chunks_prompt(content, topic)
+        chunks = await self._request_learning_chunks(prompt, use_cache)
+        if not chunks:
+            await self._forget_response(prompt)
+        return chunks
+    
+    async def stream_learning_chunks_async(self, content, topic, use_cache=True):
+        """
+        Learning chunks as they are generated: streams the response and yields each
+        chunk as soon as its JSON object is complete, instead of after the whole array.
+        If the stream fails before the first chunk, falls back to generate_learning_chunks
+        (yields nothing if that fails too); a failure after that is raised, so the caller
+        can tell a partial response from a complete one.
+        """
+        prompt = await self._learning_chunks_prompt(content, topic)
+        key = self._cache_key(prompt)
+        if self.response_cache and use_cache:
+            cached_text = await asyncio.to_thread(self.response_cache.get, key)
+            if cached_text is not None:
+                print(f"💾 Gemini response served from cache")
+                for chunk in JSONArrayStream().feed(cached_text) or self._parse_learning_chunks(cached_text):
+                    yield chunk
+                return
+        
+        parser = JSONArrayStream()
+        parts = []
+        try:
+            await self._rate_limit(prompt)
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for part in response:
+                parts.append(part.text)
+                for chunk in parser.feed(part.text):
+                    yield chunk
+        except Exception as e:
+            print(f"❌ Gemini streaming error after {parser.parsed} chunks: {e}")
+            if parser.parsed:
+                raise
+            for chunk in await self.generate_learning_chunks_async(content, topic, use_cache=False):
+                yield chunk
+            return
+        
+        print(f"✅ Streamed {parser.parsed} chunks ({parser.skipped} unparseable)")
+        if not parser.parsed:
+            # Not a clean array (e.g. truncated); let the buffered parser try to repair it
+            for chunk in self._parse_learning_chunks(''.join(parts)):
+                yield chunk
+        elif self.response_cache and parser.finished and not parser.skipped:
+            await asyncio.to_thread(self.response_cache.put, key, ''.join(parts))
+    
+    async def _learning_chunks_prompt(self, content, topic):
+        """The learning-chunks prompt, with the content compressed to the prompt budget"""
+        # Limit content to prevent truncation - keep the most relevant sentences within the budget
+        content_preview = content
+        if len(content) > LLM_CONTENT_MAX_CHARS:
+            if CONTENT_COMPRESSION:
+                # CPU-bound; keep the loop free for other requests
+                content_preview = await asyncio.to_thread(compress_content, content, topic,
+                                                          max_chars=LLM_CONTENT_MAX_CHARS)
+                print(f"🗜️  Compressed content for the prompt: {len(content)} → {len(content_preview)} characters")
+            else:
+                content_preview = content[:LLM_CONTENT_MAX_CHARS]
         prompt = f"""You are an expert educator creating COMPREHENSIVE learning material about "{topic}".
 
 SOURCE CONTENT (extract ALL key information from this):
@@ -145,16 +319,30 @@ Return ONLY valid JSON array (absolutely NO markdown, NO code blocks, NO explana
 
 CRITICAL: Your response MUST start with [ and end with ] - nothing else!"""
         
+        print(f"📤 Sending request to Gemini... (content length: {len(content_preview)} chars)")
+        return prompt
+    
+    async def _request_learning_chunks(self, prompt, use_cache=True):
+        """Send the learning-chunks prompt and parse (or repair) the JSON array in the response"""
         try:
-            print(f"📤 Sending request to Gemini... (content length: {len(content_preview)} chars)")
-            response = self._call_with_retry(prompt)
+            response = await self._call_with_retry(prompt, use_cache=use_cache)
             
             if not response:
                 print(f"❌ No response from Gemini (returned None)")
                 return []
             
             print(f"✅ Got response from Gemini")
-            text = response.text.strip()
+            return self._parse_learning_chunks(response.text)
+        except Exception as e:
+            print(f"❌ Gemini error: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    def _parse_learning_chunks(self, text):
+        """Parse (or repair) the JSON array of learning chunks in a response"""
+        try:
+            text = text.strip()
             print(f"📝 Response length: {len(text)} characters")
             print(f"📄 First 200 chars: {text[:200]}")
             print(f"📄 Last 200 chars: {text[-200:]}")
@@ -273,12 +461,12 @@ CRITICAL: Your response MUST start with [ and end with ] - nothing else!"""
             print(f"Failed text preview: {text[:500] if 'text' in locals() else 'N/A'}...")
             return []
         except Exception as e:
-            print(f"❌ Gemini error: {e}")
+            print(f"❌ Chunk parsing error: {e}")
             import traceback
             traceback.print_exc()
             return []
     
-    def simplify_content(self, content):
+    async def simplify_content_async(self, content, use_cache=True):
         """Simplify complex content while maintaining depth and technical accuracy"""
         prompt = f"""Transform this content into an easier-to-understand format WITHOUT losing important details.
 
@@ -332,7 +520,7 @@ Content to simplify (keep all important details):
 Return ONLY clean HTML - no markdown, no code blocks, no explanations."""
         
         try:
-            response = self._call_with_retry(prompt)
+            response = await self._call_with_retry(prompt, use_cache=use_cache)
             if not response:
                 return content
             simplified_text = response.text.strip()
@@ -362,7 +550,7 @@ Return ONLY clean HTML - no markdown, no code blocks, no explanations."""
             print(f"Error simplifying content: {e}")
             return content
     
-    def generate_quiz(self, content, topic, question_count=5):
+    async def generate_quiz_async(self, content, topic, question_count=5, use_cache=True):
         """Generate quiz questions based on ACTUAL content, not metadata"""
         # Use ALL content and focus on the TOPIC
         content_text = content  # Use full content, not just beginning
@@ -445,7 +633,9 @@ Return ONLY valid JSON:
 }}"""
         
         try:
-            response = self.model.generate_content(prompt)
+            response = await self._call_with_retry(prompt, use_cache=use_cache)
+            if not response:
+                return self._fallback_quiz(topic, question_count)
             response_text = response.text.strip()
             
             # Clean up markdown formatting
@@ -471,9 +661,10 @@ Return ONLY valid JSON:
             return quiz_data
         except Exception as e:
             print(f"Error generating quiz: {e}")
+            await self._forget_response(prompt)
             return self._fallback_quiz(topic, question_count)
     
-    def chat_response(self, message, context=""):
+    async def chat_response_async(self, message, context=""):
         """Generate detailed, technical chatbot responses"""
         prompt = f"""You are an expert tutor providing DETAILED, TECHNICAL answers about the learning material.
 
@@ -518,7 +709,8 @@ DO NOT give shallow responses like:
 Response:"""
         
         try:
-            response = self._call_with_retry(prompt)
+            # Chat replies aren't cached: follow-ups to the same question should vary
+            response = await self._call_with_retry(prompt, cacheable=False)
             if not response:
                 return "I'm currently experiencing rate limits. Please wait a moment and try again."
             return response.text.strip()
@@ -587,7 +779,7 @@ Response:"""
         ]
         return {"questions": questions[:question_count]}
     
-    def generate_flashcards(self, content, topic, card_count=10):
+    async def generate_flashcards_async(self, content, topic, card_count=10, use_cache=True):
         """Generate flashcards based on ACTUAL content, not metadata"""
         # Use ALL content and focus on the TOPIC
         content_text = content  # Use full content, not just beginning
@@ -662,7 +854,7 @@ Return ONLY valid JSON:
 }}"""
         
         try:
-            response = self._call_with_retry(prompt)
+            response = await self._call_with_retry(prompt, use_cache=use_cache)
             if not response:
                 return self._fallback_flashcards(topic, card_count)
             response_text = response.text.strip()
@@ -686,6 +878,7 @@ Return ONLY valid JSON:
             return flashcard_data
         except Exception as e:
             print(f"Error generating flashcards: {e}")
+            await self._forget_response(prompt)
             return self._fallback_flashcards(topic, card_count)
     
     def _fallback_flashcards(self, topic, card_count=10):
@@ -735,13 +928,64 @@ Return ONLY valid JSON:
         ]
         return {"flashcards": flashcards[:card_count]}
 
-    def generate_summary(self, prompt):
+    async def generate_summary_async(self, prompt, use_cache=True):
         """Generate a summary using Gemini"""
         try:
-            response = self._call_with_retry(prompt)
+            response = await self._call_with_retry(prompt, use_cache=use_cache)
             if not response:
                 return "Unable to generate summary at this time. Please try again later."
             return response.text.strip()
         except Exception as e:
             print(f"Error generating summary: {e}")
             return "Unable to generate summary. Please try again later."
+    
+    async def generate_study_pack_async(self, content, topic, question_count=5, card_count=10,
+                                        deadline=None, use_cache=True):
+        """
+        Learning chunks, quiz, flashcards and summary for a topic, generated concurrently
+        (one round trip of wall time instead of four, within the shared rate limit).
+        
+        Args:
+            deadline: Seconds to wait; parts still generating then are left out (None = wait for all)
+        
+        Returns:
+            gather_with_deadline result with results keyed chunks / quiz / flashcards / summary
+        """
+        return await gather_with_deadline({
+            'chunks': self.generate_learning_chunks_async(content, topic, use_cache),
+            'quiz': self.generate_quiz_async(content, topic, question_count, use_cache),
+            'flashcards': self.generate_flashcards_async(content, topic, card_count, use_cache),
+            'summary': self.generate_summary_async(build_summary_prompt(topic, content), use_cache),
+        }, deadline)
+    
+    # Synchronous API: run the async implementation on the service's event loop
+    
+    def run(self, coroutine):
+        """Run any of the *_async coroutines (or a gather_with_deadline of them) from sync code"""
+        return self.loop.run(coroutine)
+    
+    def generate_learning_chunks(self, content, topic, use_cache=True):
+        return self.run(self.generate_learning_chunks_async(content, topic, use_cache))
+    
+    def stream_learning_chunks(self, content, topic, use_cache=True):
+        """Iterator over the chunks of stream_learning_chunks_async as they arrive"""
+        return self.loop.iterate(self.stream_learning_chunks_async(content, topic, use_cache))
+    
+    def simplify_content(self, content, use_cache=True):
+        return self.run(self.simplify_content_async(content, use_cache))
+    
+    def generate_quiz(self, content, topic, question_count=5, use_cache=True):
+        return self.run(self.generate_quiz_async(content, topic, question_count, use_cache))
+    
+    def chat_response(self, message, context=""):
+        return self.run(self.chat_response_async(message, context))
+    
+    def generate_flashcards(self, content, topic, card_count=10, use_cache=True):
+        return self.run(self.generate_flashcards_async(content, topic, card_count, use_cache))
+    
+    def generate_summary(self, prompt, use_cache=True):
+        return self.run(self.generate_summary_async(prompt, use_cache))
+    
+    def generate_study_pack(self, content, topic, question_count=5, card_count=10, deadline=None, use_cache=True):
+        return self.run(self.generate_study_pack_async(content, topic, question_count, card_count,
+                                                       deadline, use_cache))
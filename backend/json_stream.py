@@ -0,0 +1,96 @@
+"""
+JSON Stream
+Incremental parser for a JSON array of objects arriving in pieces (a streamed
+LLM response): each object is returned as soon as its closing brace arrives,
+without waiting for the rest of the array. Text before the opening bracket
+(markdown fences, preambles) and after the closing one is ignored.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# The only characters that change the parser's state
+SPECIAL_CHARACTERS = re.compile(r'[\[\]{}"\\]')
+
+
+class JSONArrayStream:
+    def __init__(self):
+        self.started = False  # Seen the array's opening bracket
+        self.finished = False  # Seen its closing bracket
+        self.parsed = 0  # Objects returned so far
+        self.skipped = 0  # Complete objects that weren't valid JSON
+        self._depth = 0  # Brace depth inside the current object
+        self._in_string = False
+        self._escape = False  # The previous piece ended with a backslash inside a string
+        self._pieces: List[str] = []  # Text of the current object from earlier pieces
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Add the next piece of the response.
+
+        Returns:
+            The objects completed by this piece, in order
+        """
+        objects = []
+        if self.finished or not text:
+            return objects
+
+        position = 0
+        if self._escape:
+            self._escape = False
+            position = 1
+        object_start: Optional[int] = 0 if self._depth else None
+
+        while True:
+            match = SPECIAL_CHARACTERS.search(text, position)
+            if match is None:
+                break
+            char, index = match.group(), match.start()
+            position = index + 1
+
+            if self._in_string:
+                if char == '\\':
+                    # Skip the escaped character, which may be in the next piece
+                    if position < len(text):
+                        position += 1
+                    else:
+                        self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif not self.started:
+                self.started = char == '['
+            elif char == '"':
+                self._in_string = True
+            elif self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    object_start = index
+                elif char == ']':
+                    self.finished = True
+                    break
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pieces.append(text[object_start:position])
+                    parsed = self._parse(''.join(self._pieces))
+                    self._pieces = []
+                    object_start = None
+                    if parsed is not None:
+                        objects.append(parsed)
+
+        if self._depth and object_start is not None:
+            self._pieces.append(text[object_start:])
+        return objects
+
+    def _parse(self, object_text: str) -> Optional[Dict[str, Any]]:
+        try:
+            # strict=False accepts raw newlines and tabs inside strings, a common LLM slip
+            parsed = json.loads(object_text, strict=False)
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return None
+        self.parsed += 1
+        return parsed
@@ -0,0 +1,133 @@
+"""
+Keyword Matcher
+Aho-Corasick automaton over a topic's keywords, so the occurrence counts of
+every keyword in a section (and whether each appears on its first line) come
+from one linear scan instead of one str.count pass per keyword.
+
+Counts follow str.count semantics: occurrences of the same keyword never
+overlap, while different keywords may share characters.
+"""
+
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+# Optional imports
+try:
+    import ahocorasick  # pyahocorasick, a C implementation
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Sequence[str], accelerated: bool = True):
+        """
+        Args:
+            keywords: Keywords to match (duplicates and '' are allowed)
+            accelerated: Use pyahocorasick when it is installed
+        """
+        self.keywords = list(keywords)
+        self.patterns = list(dict.fromkeys(keyword for keyword in self.keywords if keyword))
+        self.lengths = [len(pattern) for pattern in self.patterns]
+        self.positions = {pattern: pattern_id for pattern_id, pattern in enumerate(self.patterns)}
+        self.backend = 'pyahocorasick' if accelerated and AHOCORASICK_AVAILABLE else 'python'
+
+        if self.backend == 'pyahocorasick':
+            self.automaton = ahocorasick.Automaton()
+            for pattern_id, pattern in enumerate(self.patterns):
+                self.automaton.add_word(pattern, pattern_id)
+            if self.patterns:
+                self.automaton.make_automaton()
+        else:
+            self._build_python_automaton()
+
+    def _build_python_automaton(self) -> None:
+        """Trie goto table, failure links and merged outputs"""
+        self.goto: List[Dict[str, int]] = [{}]
+        self.outputs: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(pattern_id)
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def _iter_matches(self, text: str, start: int, end: int):
+        """(last_index, pattern_id) of every match inside text[start:end], by end position"""
+        if not self.patterns:
+            return
+        if self.backend == 'pyahocorasick':
+            # iter() converts the whole string it is given on every call (even with bounds),
+            # so pass just the section: a copy the size of the section, not the document
+            for last_index, pattern_id in self.automaton.iter(text[start:end]):
+                yield start + last_index, pattern_id
+            return
+
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for index in range(start, end):
+            char = text[index]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in outputs[state]:
+                yield index, pattern_id
+
+    def scan(self, text: str, start: int = 0, end: int = None,
+             line_end: int = None) -> Tuple[List[int], List[bool]]:
+        """
+        Count every keyword in text[start:end] in one pass.
+
+        Args:
+            text: Text to search (already lower-cased by the caller)
+            start, end: Bounds of the section inside text
+            line_end: End of the section's first line (default: no first-line check)
+
+        Returns:
+            (counts, in_first_line) - one entry per keyword, in keyword order
+        """
+        end = len(text) if end is None else end
+        line_end = start if line_end is None else line_end
+        counts = [0] * len(self.patterns)
+        in_first_line = [False] * len(self.patterns)
+        # Next index where each pattern may start again (str.count skips overlaps)
+        next_start = [start] * len(self.patterns)
+        lengths = self.lengths
+
+        for last_index, pattern_id in self._iter_matches(text, start, end):
+            match_start = last_index + 1 - lengths[pattern_id]
+            if match_start >= next_start[pattern_id]:
+                counts[pattern_id] += 1
+                next_start[pattern_id] = last_index + 1
+            if last_index < line_end:
+                in_first_line[pattern_id] = True
+
+        positions = self.positions
+        keyword_counts, keyword_hits = [], []
+        for keyword in self.keywords:
+            if keyword:
+                keyword_counts.append(counts[positions[keyword]])
+                keyword_hits.append(in_first_line[positions[keyword]])
+            else:
+                # str.count('') / '' in s semantics
+                keyword_counts.append(end - start + 1)
+                keyword_hits.append(True)
+        return keyword_counts, keyword_hits
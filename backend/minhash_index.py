@@ -0,0 +1,155 @@
+"""
+MinHash Index
+Near-duplicate detection for uploaded materials. Each text gets a MinHash
+signature over its word shingles (robust to different editions, scans and
+filenames, unlike the exact file hash), and an LSH index over the signatures
+finds candidate duplicates without comparing against every material.
+"""
+
+import re
+import threading
+import zlib
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Signature length and shingle size (words)
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 5
+
+# Shingles hashed per step, bounding the (shingles x permutations) work array
+HASH_BLOCK_SIZE = 16384
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Fixed seed, so signatures stay comparable across processes and restarts
+_rng = np.random.default_rng(20240601)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def _shingle_hashes(text: str, shingle_size: int) -> np.ndarray:
+    """Distinct 32-bit hashes of the text's lower-cased word shingles"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+
+    distinct = {word: zlib.crc32(word.encode('utf-8', 'surrogatepass')) for word in set(words)}
+    word_hashes = np.fromiter(map(distinct.__getitem__, words), dtype=np.uint64, count=len(words))
+    size = min(shingle_size, len(words))
+    # Polynomial combination of each window of word hashes (wraps mod 2^64)
+    shingles = np.zeros(len(words) - size + 1, dtype=np.uint64)
+    for position in range(size):
+        shingles = shingles * np.uint64(1000003) + word_hashes[position:len(word_hashes) - size + 1 + position]
+    return np.unique(shingles >> np.uint64(32) ^ (shingles & np.uint64(0xFFFFFFFF)))
+
+
+def minhash_signature(text: str, shingle_size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    MinHash signature of a text: for each of MINHASH_PERMUTATIONS multiply-shift
+    hash functions, the minimum hash over the text's shingles.
+
+    Returns:
+        uint32 array of MINHASH_PERMUTATIONS values (all 0xFFFFFFFF for empty text)
+    """
+    shingles = _shingle_hashes(text, shingle_size)
+    signature = np.full(MINHASH_PERMUTATIONS, 0xFFFFFFFF, dtype=np.uint64)
+    for start in range(0, len(shingles), HASH_BLOCK_SIZE):
+        block = shingles[start:start + HASH_BLOCK_SIZE, None]
+        hashed = (block * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype('<u4').tobytes()
+
+
+def signature_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype='<u4').astype(np.uint32)
+
+
+def estimate_similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two texts' shingle sets (0.0-1.0)"""
+    return float(np.mean(signature_a == signature_b))
+
+
+class LSHIndex:
+    def __init__(self, bands: int = 32):
+        """
+        Args:
+            bands: Number of LSH bands the signature is cut into. Texts sharing any
+                whole band become candidates; more bands find less similar pairs
+                (candidate threshold ~ (1 / bands) ** (1 / rows))
+        """
+        if MINHASH_PERMUTATIONS % bands:
+            raise ValueError(f"bands must divide {MINHASH_PERMUTATIONS}")
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self._buckets: Dict[Tuple[int, bytes], Set[Hashable]] = {}
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def candidate_threshold(self) -> float:
+        """
+        Similarity at which a pair becomes an LSH candidate about half the time
+        (~0.42 for 32 bands of 4 rows). Less similar pairs are rarely compared, so
+        query thresholds below this don't find them reliably.
+        """
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        """Index a signature under key (replacing the key's previous signature)"""
+        with self._lock:
+            self._remove_locked(key)
+            self._signatures[key] = signature
+            for band_key in self._band_keys(signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: Hashable) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, signature: np.ndarray, threshold: float = 0.0,
+              exclude: Optional[Hashable] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Near-duplicates of a signature: LSH candidates whose estimated similarity
+        is at least threshold.
+
+        Returns:
+            (key, similarity) pairs, most similar first
+        """
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            candidates.discard(exclude)
+            matches = [(key, estimate_similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._signatures.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def __len__(self) -> int:
+        return len(self._signatures)
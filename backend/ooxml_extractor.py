@@ -0,0 +1,227 @@
+"""
+OOXML Extractor
+Lightweight DOCX/PPTX text extraction that reads the zip parts directly with
+incremental iterparse instead of building python-docx / python-pptx object
+models. Memory stays flat as documents grow, and it also picks up table cells
+and speaker notes.
+"""
+
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+NOTES_SLIDE_REL = R_NS + '/notesSlide'
+
+# Separator between the cells of a table row
+CELL_SEPARATOR = ' | '
+
+Source = Union[str, BinaryIO]
+
+
+def _w(tag: str) -> str:
+    return f'{{{W_NS}}}{tag}'
+
+
+def _a(tag: str) -> str:
+    return f'{{{A_NS}}}{tag}'
+
+
+def _p(tag: str) -> str:
+    return f'{{{P_NS}}}{tag}'
+
+
+def _read_rels(archive: zipfile.ZipFile, part_name: str) -> Dict[str, Tuple[str, str]]:
+    """Map relationship id -> (type, absolute part name) for one part"""
+    directory, filename = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, '_rels', filename + '.rels')
+    try:
+        root = ET.fromstring(archive.read(rels_name))
+    except KeyError:
+        return {}
+
+    rels = {}
+    for rel in root.iter(f'{{{PKG_REL_NS}}}Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = posixpath.normpath(posixpath.join(directory, rel.get('Target')))
+        rels[rel.get('Id')] = (rel.get('Type'), target.lstrip('/'))
+    return rels
+
+
+def _heading_style_ids(archive: zipfile.ZipFile) -> set:
+    """Style ids whose display name is a heading or title (ids are localised, names aren't)"""
+    try:
+        root = ET.fromstring(archive.read('word/styles.xml'))
+    except KeyError:
+        return set()
+
+    style_ids = set()
+    for style in root.iter(_w('style')):
+        name = style.find(_w('name'))
+        style_name = name.get(_w('val'), '') if name is not None else ''
+        if style_name.lower().startswith('heading') or style_name.lower() == 'title':
+            style_ids.add(style.get(_w('styleId')))
+    return style_ids
+
+
+def iter_docx_blocks(source: Source) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (kind, text) for each body paragraph and table row in document order.
+    kind is 'heading', 'paragraph' or 'table_row'; row cells are joined with ' | '.
+    """
+    with zipfile.ZipFile(source) as archive:
+        heading_styles = _heading_style_ids(archive)
+
+        with archive.open('word/document.xml') as part:
+            body = None
+            depth = 0
+            runs: List[str] = []
+            style_id = None
+            # One entry per open table: (cells of the current row, paragraphs of the current cell)
+            tables: List[Tuple[List[str], List[str]]] = []
+
+            for event, element in ET.iterparse(part, events=('start', 'end')):
+                tag = element.tag
+
+                if event == 'start':
+                    depth += 1
+                    if tag == _w('body'):
+                        body = element
+                    elif tag == _w('p'):
+                        runs = []
+                        style_id = None
+                    elif tag == _w('tbl'):
+                        tables.append(([], []))
+                    continue
+
+                depth -= 1
+
+                if tag == _w('t'):
+                    runs.append(element.text or '')
+                elif tag == _w('tab'):
+                    runs.append('\t')
+                elif tag in (_w('br'), _w('cr')):
+                    runs.append('\n')
+                elif tag == _w('pStyle'):
+                    style_id = element.get(_w('val'))
+                elif tag == _w('p'):
+                    text = ''.join(runs)
+                    if tables:
+                        tables[-1][1].append(text)
+                    elif style_id in heading_styles:
+                        yield 'heading', text
+                    else:
+                        yield 'paragraph', text
+                elif tag == _w('tc') and tables:
+                    cells, paragraphs = tables[-1]
+                    cells.append(' '.join(p for p in paragraphs if p))
+                    paragraphs.clear()
+                elif tag == _w('tr') and tables:
+                    cells = tables[-1][0]
+                    if any(cells):
+                        yield 'table_row', CELL_SEPARATOR.join(cells)
+                    cells.clear()
+                elif tag == _w('tbl') and tables:
+                    tables.pop()
+
+                # Drop finished top-level blocks so memory doesn't grow with the document
+                if depth == 2 and body is not None:
+                    body.clear()
+
+
+def _iter_shape_texts(archive: zipfile.ZipFile, part_name: str,
+                      placeholder_types: Optional[set] = None) -> Iterator[str]:
+    """
+    Yield the text of each shape (and each table row) on a slide-like part.
+    If placeholder_types is given, only placeholders of those types are read.
+    """
+    with archive.open(part_name) as part:
+        paragraphs: List[str] = []
+        runs: List[str] = []
+        has_text_body = False
+        placeholder_type = None
+        cells: List[str] = []
+        in_table = 0
+
+        for event, element in ET.iterparse(part, events=('start', 'end')):
+            tag = element.tag
+
+            if event == 'start':
+                if tag == _p('sp'):
+                    paragraphs, has_text_body, placeholder_type = [], False, None
+                elif tag == _a('p'):
+                    runs = []
+                elif tag == _a('tbl'):
+                    in_table += 1
+                elif tag == _a('tc'):
+                    paragraphs = []
+                elif tag == _p('txBody'):
+                    has_text_body = True
+                continue
+
+            if tag == _a('t'):
+                runs.append(element.text or '')
+            elif tag == _a('br'):
+                runs.append('\n')
+            elif tag == _p('ph'):
+                placeholder_type = element.get('type', 'body')
+            elif tag == _a('p'):
+                paragraphs.append(''.join(runs))
+            elif tag == _a('tc') and in_table:
+                cells.append('\n'.join(p for p in paragraphs if p))
+                paragraphs = []
+            elif tag == _a('tr') and in_table:
+                if any(cells):
+                    yield CELL_SEPARATOR.join(cells)
+                cells = []
+            elif tag == _a('tbl'):
+                in_table -= 1
+                paragraphs = []
+            elif tag == _p('sp'):
+                wanted = placeholder_types is None or placeholder_type in placeholder_types
+                if has_text_body and wanted:
+                    yield '\n'.join(paragraphs)
+                element.clear()
+
+
+def iter_pptx_slides(source: Source, include_notes: bool = True) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (slide_number, text) for every shape, table row and speaker note,
+    in slide order. Every slide yields at least once (with '' if it has no text)
+    so slide numbers stay aligned.
+    """
+    with zipfile.ZipFile(source) as archive:
+        part_names = set(archive.namelist())
+        presentation_rels = _read_rels(archive, 'ppt/presentation.xml')
+
+        slide_parts = []
+        root = ET.fromstring(archive.read('ppt/presentation.xml'))
+        slide_list = root.find(_p('sldIdLst'))
+        for slide_id in (slide_list if slide_list is not None else []):
+            rel = presentation_rels.get(slide_id.get(f'{{{R_NS}}}id'))
+            if rel:
+                slide_parts.append(rel[1])
+
+        for slide_number, slide_part in enumerate(slide_parts, start=1):
+            yielded = False
+            for text in _iter_shape_texts(archive, slide_part):
+                yielded = True
+                yield slide_number, text
+
+            if include_notes:
+                for rel_type, target in _read_rels(archive, slide_part).values():
+                    if rel_type == NOTES_SLIDE_REL and target in part_names:
+                        for text in _iter_shape_texts(archive, target, placeholder_types={'body'}):
+                            if text.strip():
+                                yielded = True
+                                yield slide_number, f"Notes: {text}"
+
+            if not yielded:
+                yield slide_number, ''
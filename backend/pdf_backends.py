@@ -0,0 +1,277 @@
+"""
+PDF Backends
+Interchangeable PDF text backends (pypdfium2, pdfminer.six, PyPDF2).
+The fastest installed backend is used by default; any page it fails on is
+re-extracted with PyPDF2. Run this module to benchmark the backends:
+
+    python pdf_backends.py textbook.pdf
+"""
+
+import abc
+import argparse
+import importlib
+import importlib.util
+import io
+import os
+import sys
+import threading
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+# auto, pypdfium2, pdfminer or pypdf2
+DEFAULT_PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+
+Source = Union[str, BinaryIO]
+
+
+class PDFBackend(abc.ABC):
+    """One PDF text library. Subclasses import it lazily in open()."""
+
+    name = ''
+    module = ''
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec(self.module) is not None
+
+    @abc.abstractmethod
+    def open(self, source: Source) -> Any:
+        """Open a document and return a handle for page_count/page_text/close"""
+
+    @abc.abstractmethod
+    def page_count(self, document: Any) -> int:
+        pass
+
+    @abc.abstractmethod
+    def page_text(self, document: Any, page_number: int) -> str:
+        """Text of a 0-based page"""
+
+    def close(self, document: Any) -> None:
+        pass
+
+
+class PyPDF2Backend(PDFBackend):
+    name = 'pypdf2'
+    module = 'PyPDF2'
+
+    def open(self, source):
+        PyPDF2 = importlib.import_module('PyPDF2')
+        return PyPDF2.PdfReader(source)
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def page_text(self, document, page_number):
+        return document.pages[page_number].extract_text() or ""
+
+
+class PdfiumBackend(PDFBackend):
+    """Google's PDFium via pypdfium2 - typically several times faster than PyPDF2"""
+
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    # PDFium is not thread-safe; serialise in-process use (pool workers are separate processes)
+    lock = threading.RLock()
+
+    def open(self, source):
+        pdfium = importlib.import_module('pypdfium2')
+        with self.lock:
+            return pdfium.PdfDocument(source)
+
+    def page_count(self, document):
+        with self.lock:
+            return len(document)
+
+    def page_text(self, document, page_number):
+        with self.lock:
+            page = document[page_number]
+            textpage = page.get_textpage()
+            try:
+                # PDFium separates lines with \r\n
+                return textpage.get_text_range().replace('\r\n', '\n')
+            finally:
+                textpage.close()
+                page.close()
+
+    def close(self, document):
+        with self.lock:
+            document.close()
+
+
+class PdfMinerBackend(PDFBackend):
+    """pdfminer.six - slower than PDFium but pure Python and good at layout"""
+
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def open(self, source):
+        pdfpage = importlib.import_module('pdfminer.pdfpage')
+        file = open(source, 'rb') if isinstance(source, str) else source
+        return {
+            'file': file,
+            'owns_file': file is not source,
+            'pages': list(pdfpage.PDFPage.get_pages(file)),
+        }
+
+    def page_count(self, document):
+        return len(document['pages'])
+
+    def page_text(self, document, page_number):
+        converter = importlib.import_module('pdfminer.converter')
+        layout = importlib.import_module('pdfminer.layout')
+        pdfinterp = importlib.import_module('pdfminer.pdfinterp')
+
+        output = io.StringIO()
+        resource_manager = pdfinterp.PDFResourceManager()
+        device = converter.TextConverter(resource_manager, output, laparams=layout.LAParams())
+        try:
+            interpreter = pdfinterp.PDFPageInterpreter(resource_manager, device)
+            interpreter.process_page(document['pages'][page_number])
+            # pdfminer ends every page with a form feed
+            return output.getvalue().rstrip('\x0c')
+        finally:
+            device.close()
+
+    def close(self, document):
+        if document['owns_file']:
+            document['file'].close()
+
+
+# Fastest first - 'auto' picks the first one installed
+_backends: Dict[str, PDFBackend] = {
+    backend.name: backend for backend in (PdfiumBackend(), PdfMinerBackend(), PyPDF2Backend())
+}
+
+FALLBACK_BACKEND = _backends['pypdf2']
+
+
+def available_backends() -> List[str]:
+    return [name for name, backend in _backends.items() if backend.is_available()]
+
+
+def get_backend(name: Optional[str] = None) -> PDFBackend:
+    """
+    Resolve a backend name ('auto' or None = fastest installed).
+    Unknown or uninstalled backends fall back to PyPDF2 with a warning.
+    """
+    name = (name or DEFAULT_PDF_BACKEND).lower()
+    if name == 'auto':
+        for backend in _backends.values():
+            if backend.is_available():
+                return backend
+        return FALLBACK_BACKEND
+
+    backend = _backends.get(name)
+    if backend is None or not backend.is_available():
+        print(f"⚠️  PDF backend '{name}' is not available, using {FALLBACK_BACKEND.name}")
+        return FALLBACK_BACKEND
+    return backend
+
+
+class PageReader:
+    """
+    Reads pages with a primary backend, re-extracting any page it fails on
+    (or the whole document, if it can't even open it) with PyPDF2.
+    """
+
+    def __init__(self, source: Source, backend: Optional[PDFBackend] = None):
+        self.source = source
+        self.backend = backend or get_backend()
+        self.fallback_pages = 0
+        self._fallback_document = None
+
+        try:
+            self._document = self.backend.open(source)
+            self.page_count = self.backend.page_count(self._document)
+        except Exception as e:
+            if self.backend is FALLBACK_BACKEND:
+                raise
+            print(f"⚠️  {self.backend.name} could not open the PDF ({e}), using {FALLBACK_BACKEND.name}")
+            self._rewind()
+            self.backend = FALLBACK_BACKEND
+            self._document = self.backend.open(source)
+            self.page_count = self.backend.page_count(self._document)
+
+    def _rewind(self):
+        if not isinstance(self.source, str):
+            self.source.seek(0)
+
+    def page_text(self, page_number: int) -> str:
+        try:
+            return self.backend.page_text(self._document, page_number)
+        except Exception as e:
+            if self.backend is FALLBACK_BACKEND:
+                raise
+            print(f"⚠️  {self.backend.name} failed on page {page_number + 1} ({e}), retrying with {FALLBACK_BACKEND.name}")
+            if self._fallback_document is None:
+                self._rewind()
+                self._fallback_document = FALLBACK_BACKEND.open(self.source)
+            self.fallback_pages += 1
+            return FALLBACK_BACKEND.page_text(self._fallback_document, page_number)
+
+    def close(self):
+        self.backend.close(self._document)
+        if self._fallback_document is not None:
+            FALLBACK_BACKEND.close(self._fallback_document)
+
+
+def benchmark(filepath: str, backends: Optional[List[str]] = None, max_pages: Optional[int] = None) -> List[Dict]:
+    """
+    Time each backend extracting the same pages in-process.
+
+    Returns:
+        One dict per backend with pages, seconds, pages_per_sec, chars and errors
+    """
+    results = []
+    for name in backends or available_backends():
+        backend = _backends[name]
+        started = time.perf_counter()
+        document = backend.open(filepath)
+        try:
+            page_count = backend.page_count(document)
+            if max_pages:
+                page_count = min(page_count, max_pages)
+
+            chars = errors = 0
+            for page_number in range(page_count):
+                try:
+                    chars += len(backend.page_text(document, page_number))
+                except Exception:
+                    errors += 1
+        finally:
+            backend.close(document)
+
+        seconds = time.perf_counter() - started
+        results.append({
+            'backend': name,
+            'pages': page_count,
+            'seconds': seconds,
+            'pages_per_sec': page_count / seconds if seconds else 0.0,
+            'chars': chars,
+            'errors': errors,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the installed PDF text backends on a file")
+    parser.add_argument('pdf', help="PDF file to extract")
+    parser.add_argument('--backend', action='append', choices=list(_backends),
+                        help="Backend to test (repeatable, default: every installed backend)")
+    parser.add_argument('--pages', type=int, help="Only extract the first N pages")
+    args = parser.parse_args()
+
+    print(f"📊 Benchmarking PDF backends on {args.pdf}")
+    print(f"   Installed: {', '.join(available_backends())}")
+    print(f"   Selected for uploads: {get_backend().name} (PDF_BACKEND={DEFAULT_PDF_BACKEND})\n")
+
+    results = benchmark(args.pdf, args.backend, args.pages)
+    print(f"{'backend':<12}{'pages':>8}{'seconds':>10}{'pages/sec':>12}{'chars':>12}{'errors':>8}")
+    for result in sorted(results, key=lambda r: r['pages_per_sec'], reverse=True):
+        print(f"{result['backend']:<12}{result['pages']:>8}{result['seconds']:>10.2f}"
+              f"{result['pages_per_sec']:>12.1f}{result['chars']:>12}{result['errors']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
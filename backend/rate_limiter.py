@@ -0,0 +1,193 @@
+"""
+Rate Limiter
+Token-bucket limiter for the Gemini API: a request bucket (requests per
+minute, with a burst) and a token bucket (prompt tokens per minute).
+Callers reserve a slot and get back their wait time and queue position,
+instead of sleeping blindly. Reservations are atomic: in-process behind a
+lock, or across processes (several workers sharing one API key) in a small
+SQLite database.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Rough size of a Gemini token, for estimating prompt tokens
+CHARS_PER_TOKEN = 4
+
+
+class RateLimitExceeded(Exception):
+    """The wait for a slot would exceed the caller's max_wait"""
+
+    def __init__(self, wait: float, position: int):
+        super().__init__(f"Rate limit queue too long: {position} request(s) ahead, retry in {wait:.1f}s")
+        self.wait = wait
+        self.position = position
+
+
+@dataclass
+class Reservation:
+    wait: float  # Seconds until the request may be sent
+    position: int  # Requests reserved ahead of this one that haven't started yet
+    tokens: int  # Tokens taken from the token bucket
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _refill(level: float, updated: float, now: float, rate: float, capacity: float) -> float:
+    """Bucket level at now (levels below 0 are debt owed by earlier reservations)"""
+    return min(capacity, level + (now - updated) * rate)
+
+
+class TokenBucketLimiter:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 burst: int = 1, sqlite_path: Optional[str] = None, name: str = 'gemini'):
+        """
+        Args:
+            requests_per_minute: Sustained request rate
+            tokens_per_minute: Sustained prompt-token rate (None = unlimited)
+            burst: Requests that may be sent back to back when the limiter is idle
+            sqlite_path: Share the buckets across processes through this database
+                (None = in-process only)
+            name: Bucket name in the shared database (one per API key / quota)
+        """
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0 if tokens_per_minute else None
+        self.burst = max(1, burst)
+        # One minute's worth of tokens may be spent at once
+        self.token_capacity = tokens_per_minute or 0
+        self.sqlite_path = sqlite_path
+        self.name = name
+
+        self._lock = threading.Lock()
+        # In-process state: bucket levels, their timestamps and pending start times
+        self._state = {'requests': float(self.burst), 'tokens': float(self.token_capacity),
+                       'updated': time.time(), 'pending': []}
+
+        if sqlite_path:
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, requests REAL, '
+                             'tokens REAL, updated REAL)')
+                conn.execute('CREATE TABLE IF NOT EXISTS reservations (name TEXT, start_at REAL)')
+                conn.execute('CREATE INDEX IF NOT EXISTS ix_reservations ON reservations (name, start_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.sqlite_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _plan(self, requests: float, tokens: float, updated: float, now: float,
+              cost: int) -> Tuple[float, float, float]:
+        """Refill both buckets, take one request and cost tokens; returns (requests, tokens, wait)"""
+        requests = _refill(requests, updated, now, self.request_rate, self.burst) - 1
+        wait = max(0.0, -requests / self.request_rate)
+        if self.token_rate:
+            # A prompt bigger than the whole bucket waits for a full bucket, not forever
+            tokens = (_refill(tokens, updated, now, self.token_rate, self.token_capacity)
+                      - min(cost, self.token_capacity))
+            wait = max(wait, -tokens / self.token_rate)
+        return requests, tokens, wait
+
+    def reserve(self, tokens: int = 1, max_wait: Optional[float] = None) -> Reservation:
+        """
+        Reserve a slot for one request of about `tokens` prompt tokens.
+
+        Args:
+            tokens: Estimated prompt tokens (see estimate_tokens)
+            max_wait: Raise RateLimitExceeded instead of reserving if the wait would be longer
+
+        Returns:
+            Reservation - sleep reservation.wait seconds, then send the request
+        """
+        if self.sqlite_path:
+            return self._reserve_shared(tokens, max_wait)
+
+        with self._lock:
+            now = time.time()
+            state = self._state
+            state['pending'] = [start for start in state['pending'] if start > now]
+            requests, token_level, wait = self._plan(state['requests'], state['tokens'], state['updated'],
+                                                     now, tokens)
+            position = len(state['pending'])
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitExceeded(wait, position)
+            state.update(requests=requests, tokens=token_level, updated=now)
+            if wait > 0:
+                state['pending'].append(now + wait)
+        return Reservation(wait, position, tokens)
+
+    def _reserve_shared(self, tokens: int, max_wait: Optional[float]) -> Reservation:
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so concurrent processes reserve one at a time
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute('SELECT requests, tokens, updated FROM buckets WHERE name = ?',
+                               (self.name,)).fetchone()
+            if row is None:
+                row = (float(self.burst), float(self.token_capacity), now)
+            conn.execute('DELETE FROM reservations WHERE name = ? AND start_at <= ?', (self.name, now))
+            position = conn.execute('SELECT COUNT(*) FROM reservations WHERE name = ?',
+                                    (self.name,)).fetchone()[0]
+
+            requests, token_level, wait = self._plan(*row, now, tokens)
+            if max_wait is not None and wait > max_wait:
+                conn.execute('ROLLBACK')
+                raise RateLimitExceeded(wait, position)
+
+            conn.execute('INSERT OR REPLACE INTO buckets (name, requests, tokens, updated) VALUES (?, ?, ?, ?)',
+                         (self.name, requests, token_level, now))
+            if wait > 0:
+                conn.execute('INSERT INTO reservations (name, start_at) VALUES (?, ?)', (self.name, now + wait))
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return Reservation(wait, position, tokens)
+
+    def acquire(self, tokens: int = 1, max_wait: Optional[float] = None) -> Reservation:
+        """reserve(), then sleep until the reserved slot"""
+        reservation = self.reserve(tokens, max_wait)
+        if reservation.wait > 0:
+            time.sleep(reservation.wait)
+        return reservation
+
+    def status(self) -> Dict:
+        """Current bucket levels and queue length (without reserving anything)"""
+        now = time.time()
+        if self.sqlite_path:
+            with closing(self._connect()) as conn:
+                row = conn.execute('SELECT requests, tokens, updated FROM buckets WHERE name = ?',
+                                   (self.name,)).fetchone()
+                queued = conn.execute('SELECT COUNT(*) FROM reservations WHERE name = ? AND start_at > ?',
+                                      (self.name, now)).fetchone()[0]
+            row = row or (float(self.burst), float(self.token_capacity), now)
+        else:
+            with self._lock:
+                state = self._state
+                row = (state['requests'], state['tokens'], state['updated'])
+                queued = sum(1 for start in state['pending'] if start > now)
+
+        requests = _refill(row[0], row[2], now, self.request_rate, self.burst)
+        status = {
+            'backend': 'sqlite' if self.sqlite_path else 'memory',
+            'requests_per_minute': self.request_rate * 60,
+            'burst': self.burst,
+            'available_requests': round(requests, 2),
+            'queued': queued,
+            'next_slot_in': round(max(0.0, (1 - requests) / self.request_rate), 2),
+        }
+        if self.token_rate:
+            status.update(tokens_per_minute=self.token_capacity,
+                          available_tokens=int(_refill(row[1], row[2], now, self.token_rate, self.token_capacity)))
+        return status
@@ -0,0 +1,115 @@
+"""
+Response Cache
+Persistent cache of LLM responses in a local SQLite database, keyed by a
+hash of the model, its generation config and the fully rendered prompt.
+Entries expire after a TTL and the least recently used ones are evicted
+beyond a size budget. SQLite (WAL mode) lets every worker process share it.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+
+def response_cache_key(model_name: str, generation_config: Dict[str, Any], prompt: str) -> str:
+    """SHA-256 identifying one exact request"""
+    payload = json.dumps({'model': model_name, 'config': generation_config, 'prompt': prompt},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str = 'gemini_cache.db', ttl_seconds: float = 7 * 24 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite database file (shared by all processes using the same path)
+            ttl_seconds: Entries older than this are treated as missing
+            max_bytes: Evict least recently used entries beyond this total response size
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, '
+                         'size INTEGER, created_at REAL, accessed_at REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """The cached response text, or None if missing or expired"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+            if row is not None:
+                conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, then evict expired and least recently used entries over budget"""
+        size = len(response.encode('utf-8', 'surrogatepass'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, response, size, now, now))
+            conn.execute('DELETE FROM responses WHERE created_at < ?', (now - self.ttl_seconds,))
+
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from the least recently used entry until enough is freed
+                freed, cutoff = 0, None
+                for accessed_at, entry_size in conn.execute(
+                        'SELECT accessed_at, size FROM responses ORDER BY accessed_at'):
+                    freed += entry_size
+                    cutoff = accessed_at
+                    if total - freed <= self.max_bytes:
+                        break
+                conn.execute('DELETE FROM responses WHERE accessed_at <= ? AND key != ?', (cutoff, key))
+            conn.execute('COMMIT')
+
+    def delete(self, key: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            entries, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'bytes': total,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
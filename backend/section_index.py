@@ -0,0 +1,137 @@
+"""
+Section Index
+BM25 inverted index over a document's sections. It is built once per document
+and stored next to the text in the content cache. Ranking a topic then only
+walks the postings of the topic's terms instead of rescanning the document.
+"""
+
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Bump when the stored layout or tokenizer changes, so old indexes get rebuilt
+INDEX_VERSION = 2
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens (same notion of a word as ContentExtractor keywords)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def content_digest(content: str) -> str:
+    """SHA-256 of a text (the digest indexes are tied to when no cache key is given)"""
+    return hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def build_section_index(content: str, spans: Sequence[Tuple[int, int]], digest: Optional[str] = None) -> Dict:
+    """
+    Build the inverted index for a document already split into sections.
+
+    Args:
+        content: The document text
+        spans: (start, end) offsets of each section in content
+        digest: Digest identifying content (e.g. its content cache key); SHA-256 of it by default
+
+    Returns:
+        JSON-serialisable dict: section spans and token lengths, plus postings
+        mapping each token to a flat [section_id, term_frequency, ...] list
+    """
+    postings: Dict[str, List[int]] = {}
+    lengths = []
+
+    for section_id, (start, end) in enumerate(spans):
+        counts = Counter(tokenize(content[start:end]))
+        lengths.append(sum(counts.values()))
+        for token, frequency in counts.items():
+            postings.setdefault(token, []).extend((section_id, frequency))
+
+    return {
+        'version': INDEX_VERSION,
+        'length': len(content),
+        'digest': digest or content_digest(content),
+        'spans': [[start, end] for start, end in spans],
+        'lengths': lengths,
+        'avg_length': sum(lengths) / len(lengths) if lengths else 0.0,
+        'postings': postings,
+    }
+
+
+def index_matches(index: Dict, content: str, digest: Optional[str] = None) -> bool:
+    """
+    True if a stored index was built (by this version) for this text: same length
+    and same digest (SHA-256 of content when no digest is given), so an edited
+    text of the same length doesn't reuse stale postings.
+    """
+    return (bool(index) and index.get('version') == INDEX_VERSION and index.get('length') == len(content)
+            and index.get('digest') == (digest or content_digest(content)))
+
+
+def approximate_index_size(index: Dict) -> int:
+    """Rough in-memory size of a parsed index in bytes, for the memo cache budget"""
+    postings = index['postings']
+    entries = sum(len(section_postings) for section_postings in postings.values())
+    # ~32 bytes per list slot + small int, ~120 per token (key, list header, dict slot)
+    return entries * 32 + len(postings) * 120 + len(index['spans']) * 120
+
+
+def score_sections(index: Dict, terms: Iterable[str],
+                   k1: float = BM25_K1, b: float = BM25_B) -> Dict[int, float]:
+    """
+    Score sections against query terms with BM25. Only sections containing at
+    least one term are touched, so the cost follows the terms' postings.
+
+    Returns:
+        Mapping of section_id to score (sections without any term are left out)
+    """
+    lengths = index['lengths']
+    section_count = len(lengths)
+    avg_length = index['avg_length'] or 1.0
+    scores: Dict[int, float] = {}
+
+    for term in set(terms):
+        postings = index['postings'].get(term)
+        if not postings:
+            continue
+
+        document_frequency = len(postings) // 2
+        idf = math.log(1 + (section_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        for position in range(0, len(postings), 2):
+            section_id, frequency = postings[position], postings[position + 1]
+            norm = frequency + k1 * (1 - b + b * lengths[section_id] / avg_length)
+            scores[section_id] = scores.get(section_id, 0.0) + idf * frequency * (k1 + 1) / norm
+
+    return scores
+
+
+def top_scores(scores: Dict[int, float], limit: Optional[int] = None) -> List[Tuple[float, int]]:
+    """
+    (score, section_id) pairs, best first (ties in document order). With a limit,
+    only the best limit pairs, from a bounded heap instead of sorting every match.
+    """
+    if limit is None or limit >= len(scores):
+        return sorted(((score, section_id) for section_id, score in scores.items()),
+                      key=lambda item: (-item[0], item[1]))
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+    return [(score, section_id) for section_id, score in best]
+
+
+def rank_sections(index: Dict, terms: Iterable[str], k1: float = BM25_K1, b: float = BM25_B,
+                  limit: Optional[int] = None) -> List[Tuple[float, int]]:
+    """
+    Rank sections against query terms with BM25 (see score_sections).
+
+    Returns:
+        (score, section_id) pairs, best first (ties in document order); only the
+        best limit of them if a limit is given
+    """
+    return top_scores(score_sections(index, terms, k1, b), limit)
@@ -0,0 +1,108 @@
+"""
+Single Flight
+Coalesces identical concurrent calls: the first caller for a key runs the
+function, and callers arriving while it is in flight wait for that call and
+share its result (or its exception) instead of making their own. Threads
+(do) and asyncio tasks (do_async) can share the same calls.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Hashable, int] = {}  # Callers waiting on each in-flight call
+        self._tasks: Set[asyncio.Future] = set()  # Strong references to running async calls
+        self.calls = 0  # Calls that ran the function
+        self.coalesced = 0  # Calls that shared another call's result
+        self.peak_waiters = 0  # Most callers sharing one call
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """
+        Run function() once per key at a time.
+
+        Args:
+            key: Identifies identical calls (e.g. the response cache key of a prompt)
+            function: The call to make; only the first concurrent caller runs it
+
+        Returns:
+            The function's result; if it raised, every waiting caller raises the same exception
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                del self._waiters[key]
+
+    async def do_async(self, key: Hashable, function: Callable[[], Awaitable]) -> Any:
+        """
+        Await function() once per key at a time. The call runs as its own task,
+        so a caller that is cancelled (e.g. at a deadline) stops waiting while
+        the call carries on for the other callers.
+
+        Args:
+            key: Identifies identical calls
+            function: Returns the coroutine to run; only the first concurrent caller calls it
+
+        Returns:
+            The coroutine's result; if it raised, every waiting caller raises the same exception
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(function())
+            self._tasks.add(task)
+            task.add_done_callback(lambda done: self._finish(key, future, done))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The in-flight call for key (registering a new one if there is none), and whether it is new"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+                self._waiters[key] = 0
+                self.calls += 1
+                return future, True
+            self._waiters[key] += 1
+            self.coalesced += 1
+            self.peak_waiters = max(self.peak_waiters, self._waiters[key])
+            return future, False
+
+    def _finish(self, key: Hashable, future: Future, task: asyncio.Future) -> None:
+        with self._lock:
+            del self._in_flight[key]
+            del self._waiters[key]
+            self._tasks.discard(task)
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._in_flight),
+                'waiting': sum(self._waiters.values()),
+                'peak_waiters': self.peak_waiters,
+            }
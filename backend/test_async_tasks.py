@@ -0,0 +1,76 @@
+"""
+Tests for the async helpers: gather_with_deadline runs calls concurrently on
+an EventLoopThread and cancels the ones still running at the deadline, while
+coalesced calls (SingleFlight.do_async) outlive a caller that timed out;
+EventLoopThread.iterate drives async generators from sync code.
+
+Run with pytest, or directly: python test_async_tasks.py
+"""
+
+import asyncio
+import time
+
+from async_tasks import EventLoopThread, gather_with_deadline
+from single_flight import SingleFlight
+
+
+def test_fan_out_runs_concurrently_until_deadline():
+    loop = EventLoopThread()
+    flight = SingleFlight()
+    made = []
+
+    async def generate(name, seconds):
+        made.append(name)
+        await asyncio.sleep(seconds)
+        if name == "error":
+            raise ValueError("bad response")
+        return name
+
+    try:
+        started = time.monotonic()
+        pack = loop.run(gather_with_deadline({
+            "quiz": flight.do_async("quiz", lambda: generate("quiz", 0.2)),
+            "same quiz": flight.do_async("quiz", lambda: generate("quiz", 0.2)),
+            "summary": generate("summary", 0.2),
+            "error": generate("error", 0.1),
+            "slow": flight.do_async("slow", lambda: generate("slow", 0.4)),
+        }, deadline=0.3))
+        assert time.monotonic() - started < 0.38  # Concurrent, and not waiting for "slow"
+        assert pack["results"] == {"quiz": "quiz", "same quiz": "quiz", "summary": "summary"}
+        assert pack["errors"] == {"error": "bad response"} and pack["timed_out"] == ["slow"]
+        assert made.count("quiz") == 1
+
+        # The shared call outlives the caller that timed out, so a later caller joins it
+        assert loop.run(flight.do_async("slow", lambda: generate("slow", 0.4))) == "slow"
+        assert made.count("slow") == 1 and flight.stats()["in_flight"] == 0
+    finally:
+        loop.close()
+
+
+def test_event_loop_thread_iterates_async_generators():
+    loop = EventLoopThread()
+    closed = []
+
+    async def chunks():
+        try:
+            for number in range(5):
+                await asyncio.sleep(0)
+                yield number
+        finally:
+            closed.append(True)
+
+    try:
+        assert list(loop.iterate(chunks())) == [0, 1, 2, 3, 4]
+        iterator = loop.iterate(chunks())
+        assert next(iterator) == 0
+        iterator.close()  # e.g. the client disconnected
+        assert closed == [True, True]
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    for test in (test_fan_out_runs_concurrently_until_deadline, test_event_loop_thread_iterates_async_generators):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All async task tests passed")
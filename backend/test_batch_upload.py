@@ -0,0 +1,107 @@
+"""
+Tests for /api/upload-materials: results come back in upload order with
+per-file errors next to the files that succeeded, cached files skip
+extraction, and the file-count, size and topic rules are enforced.
+
+Run with pytest, or directly: python test_batch_upload.py
+"""
+
+import io
+import os
+import tempfile
+import time
+
+# An isolated database and upload folder; no Gemini calls, no automatic resuming
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(WORK_DIR, 'learning_system.db'))
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(WORK_DIR, 'uploads'))
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['RESUME_UPLOAD_JOBS'] = 'false'
+
+import app_minimal
+from app_minimal import LearningMaterial, app, db
+from content_cache import content_cache
+
+# The shared cache may have been created (in the working directory) by other tests already
+content_cache.cache_dir = os.path.join(WORK_DIR, 'content_cache')
+os.makedirs(content_cache.cache_dir, exist_ok=True)
+
+with app.app_context():
+    db.create_all()
+
+
+def text_file(name, subject):
+    body = f"{subject}\n" + f"Notes about {subject.lower()} for the batch upload test. " * 5 + name
+    return io.BytesIO(body.encode()), name
+
+
+def post_batch(files, **form):
+    data = dict(form, files=files)
+    return app.test_client().post('/api/upload-materials', data=data)
+
+
+def test_batch_reports_each_file_in_order():
+    extract = app_minimal._extract_upload_content
+
+    def flaky_extract(source, filename, topic, content_digest, pdf_workers=None):
+        if filename == 'broken.txt':
+            raise ValueError("unreadable file")
+        if filename == 'slow.txt':
+            time.sleep(0.2)  # Finishes after the files uploaded behind it
+        return extract(source, filename, topic, content_digest, pdf_workers)
+
+    app_minimal._extract_upload_content = flaky_extract
+    try:
+        response = post_batch([text_file('slow.txt', 'Locking'), text_file('broken.txt', 'Logging'),
+                               text_file('fast.txt', 'Recovery')],
+                              topics=['locking', 'logging', 'recovery'], titles=['Locks', '', 'Recovery notes'],
+                              user_id='42')
+    finally:
+        app_minimal._extract_upload_content = extract
+
+    assert response.status_code == 200
+    body = response.get_json()
+    results = body['results']
+    assert [result['filename'] for result in results] == ['slow.txt', 'broken.txt', 'fast.txt']
+    assert [result['status'] for result in results] == ['completed', 'failed', 'completed']
+    assert body['completed'] == 2 and body['failed'] == 1
+    assert results[1]['error'] == 'unreadable file' and 'material_id' not in results[1]
+    assert [result['title'] for result in results] == ['Locks', 'broken.txt', 'Recovery notes']
+    assert results[0]['content_preview'].startswith('Locking')
+    assert all(key in results[0]['timings'] for key in ('spool_ms', 'queue_ms', 'extract_ms'))
+
+    with app.app_context():
+        materials = [db.session.get(LearningMaterial, results[position]['material_id']) for position in (0, 2)]
+        assert [(material.title, material.topic) for material in materials] == [
+            ('Locks', 'locking'), ('Recovery notes', 'recovery')]
+
+    # The same bytes again come from the content cache
+    response = post_batch([text_file('fast.txt', 'Recovery')], topic='recovery', user_id='42')
+    result = response.get_json()['results'][0]
+    assert result['cached'] and result['status'] == 'completed' and not result['is_new_upload']
+    assert result['material_id'] == results[2]['material_id']
+
+
+def test_batch_limits_are_enforced():
+    max_files, max_bytes = app.config['BATCH_UPLOAD_MAX_FILES'], app.config['BATCH_UPLOAD_MAX_BYTES']
+    app.config['BATCH_UPLOAD_MAX_FILES'], app.config['BATCH_UPLOAD_MAX_BYTES'] = 2, 4096
+    try:
+        files = [text_file(f'notes{number}.txt', 'Indexes') for number in range(3)]
+        response = post_batch(files, topic='indexes')
+        assert response.status_code == 400 and 'At most 2 files' in response.get_json()['error']
+
+        response = post_batch([(io.BytesIO(b'x' * 5000), 'big.txt')], topic='indexes')
+        assert response.status_code == 413
+    finally:
+        app.config['BATCH_UPLOAD_MAX_FILES'], app.config['BATCH_UPLOAD_MAX_BYTES'] = max_files, max_bytes
+
+    assert post_batch([], topic='indexes').status_code == 400
+    response = post_batch([text_file('a.txt', 'Keys'), text_file('b.txt', 'Joins')], topics=['keys'])
+    assert response.status_code == 400 and 'one topic per file' in response.get_json()['error']
+
+
+if __name__ == "__main__":
+    for test in (test_batch_reports_each_file_in_order, test_batch_limits_are_enforced):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All batch upload tests passed")
@@ -0,0 +1,70 @@
+"""
+Tests for ContentCache: streamed writes round-trip, failed streams store
+nothing, and metadata lives and dies with its text.
+
+Run with pytest, or directly: python test_content_cache.py
+"""
+
+import hashlib
+import os
+import tempfile
+
+from content_cache import ContentCache
+
+
+def test_put_stream_round_trips_and_delete_removes_metadata():
+    cache = ContentCache(tempfile.mkdtemp(), compress_level=1)
+    digest = hashlib.sha256(b"textbook.pdf").hexdigest()
+    pieces = ["Chapter 1\n", "Transactions commit or abort. " * 1000, "\nÜnïcödé ✓"]
+
+    assert cache.get(digest) is None and not cache.has(digest)
+    assert cache.put_stream(digest, iter(pieces)) == sum(map(len, pieces))
+    assert cache.has(digest) and cache.get(digest) == "".join(pieces)
+
+    index = {"unit": "page", "offsets": [0, 10, 30010]}
+    assert cache.get_meta(digest, "index") is None
+    cache.put_meta(digest, "index", index)
+    cache.put_meta(digest, "sections", {"version": 1})
+    assert cache.get_meta(digest, "index") == index
+
+    other = digest[:-1] + ("1" if digest.endswith("0") else "0")  # Shares the fan-out directory
+    cache.put(other, "other text")
+    cache.delete(digest)
+    assert not cache.has(digest) and cache.get_meta(digest, "index") is None
+    assert cache.get_meta(digest, "sections") is None
+    assert cache.get(other) == "other text"
+    cache.delete(digest)  # Deleting a missing entry is a no-op
+
+
+def test_failed_stream_and_corrupt_entries_are_misses():
+    cache = ContentCache(tempfile.mkdtemp())
+    digest = hashlib.sha256(b"broken.docx").hexdigest()
+
+    def pieces():
+        yield "first page"
+        raise ValueError("parser crashed")
+
+    try:
+        cache.put_stream(digest, pieces())
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert not cache.has(digest)
+    assert os.listdir(os.path.dirname(cache._path_for(digest))) == []  # No temp files left behind
+
+    cache.put(digest, "complete text")
+    with open(cache._path_for(digest), "r+b") as file:
+        file.truncate(10)
+    assert cache.get(digest) is None and not cache.has(digest)
+
+    with open(cache._meta_path_for(digest, "index"), "w") as file:
+        file.write("{not json")
+    assert cache.get_meta(digest, "index") is None
+
+
+if __name__ == "__main__":
+    for test in (test_put_stream_round_trips_and_delete_removes_metadata,
+                 test_failed_stream_and_corrupt_entries_are_misses):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All content cache tests passed")
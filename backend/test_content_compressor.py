@@ -0,0 +1,56 @@
+"""
+Tests for compress_content: the most topic-relevant sentences are kept in
+document order, with their section headers, within a character or token budget.
+
+Run with pytest, or directly: python test_content_compressor.py
+"""
+
+import random
+
+from content_compressor import compress_content
+
+WORDS = ["commit", "lock", "isolation", "the", "a", "record", "page", "Transaction", "schedule", "serializable"]
+
+
+def random_document(rng):
+    """Headers, blank lines and sentences of random length"""
+    lines = []
+    for _ in range(rng.randint(0, 40)):
+        roll = rng.random()
+        if roll < 0.15:
+            lines.append("# " + rng.choice(WORDS).title())
+        elif roll < 0.3:
+            lines.append("")
+        else:
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 15)))
+            lines.append(words + rng.choice([".", "!", "?", ""]))
+    return "\n".join(lines)
+
+
+def test_compression_keeps_relevant_sentences_within_budget():
+    filler = "The weather was nice that day. Many people enjoyed a long lunch outside. "
+    content = "\n\n".join([
+        "# Transactions\n" + filler * 5 + "A transaction is atomic: it commits or aborts as a unit.",
+        "# Picnic\n" + filler * 10,
+        "# Isolation\nIsolation keeps concurrent transactions apart. " + filler * 5,
+    ])
+    compressed = compress_content(content, "transactions and isolation", max_chars=400)
+    assert len(compressed) <= 400
+    assert compressed.index("A transaction is atomic") < compressed.index("Isolation keeps concurrent")
+    assert compressed.startswith("# Transactions\n") and "# Picnic" not in compressed
+    assert compressed.count("The weather was nice") <= 1
+    assert compress_content(content, "transactions", max_chars=len(content)) == content
+
+    rng = random.Random(4)
+    for _ in range(200):
+        content = random_document(rng)
+        max_tokens = rng.randint(1, 150)
+        compressed = compress_content(content, rng.choice(["commit", "lock isolation"]), max_tokens=max_tokens)
+        assert len(compressed) <= max_tokens * 4 or compressed == content
+
+
+if __name__ == "__main__":
+    for test in (test_compression_keeps_relevant_sentences_within_budget,):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All content compressor tests passed")
@@ -0,0 +1,525 @@
+"""
+Parity test for ContentExtractor's single-pass section splitter.
+Compares it against the original line-by-line implementation on hand-written
+edge cases and randomly generated documents.
+
+Run with pytest, or directly: python test_content_extractor.py
+"""
+
+import contextlib
+import io
+import random
+import re
+
+import content_extractor
+from content_extractor import ContentExtractor
+from keyword_matcher import KeywordMatcher
+from section_index import rank_sections
+
+extractor = ContentExtractor()
+
+
+def legacy_split_into_sections(content):
+    """The original line-by-line splitter, kept as the reference"""
+    sections = []
+    patterns = [
+        r'\n#{1,6}\s+.+\n',  # Markdown headers
+        r'\n\d+\.\s+[A-Z].+\n',  # Numbered sections
+        r'\n[A-Z][A-Z\s]+\n',  # ALL CAPS headers
+    ]
+
+    current_section = ""
+    for line in content.split('\n'):
+        is_header = any(re.match(pattern, '\n' + line + '\n') for pattern in patterns)
+        if is_header and current_section.strip():
+            sections.append(current_section.strip())
+            current_section = line + '\n'
+        else:
+            current_section += line + '\n'
+
+    if current_section.strip():
+        sections.append(current_section.strip())
+
+    if len(sections) <= 1:
+        sections = [p.strip() for p in content.split('\n\n') if p.strip()]
+
+    return sections
+
+
+def legacy_extract_topic_content(full_content, topic, max_chars=15000):
+    """The original scoring and selection loop, on top of the legacy splitter"""
+    topic_keywords = extractor._extract_keywords(topic)
+
+    scored_sections = []
+    for section in legacy_split_into_sections(full_content):
+        score = extractor._calculate_relevance_score(section, topic_keywords)
+        if score > 0:
+            scored_sections.append((score, section))
+    scored_sections.sort(reverse=True, key=lambda x: x[0])
+
+    extracted_content = ""
+    for score, section in scored_sections:
+        if len(extracted_content) + len(section) <= max_chars:
+            extracted_content += section + "\n\n"
+        elif len(extracted_content) < max_chars * 0.8:
+            remaining = max_chars - len(extracted_content)
+            extracted_content += section[:remaining] + "...\n\n"
+            break
+        else:
+            break
+
+    if len(extracted_content) < 1000:
+        extracted_content = full_content[:max_chars]
+
+    return extracted_content.strip()
+
+
+EDGE_CASES = [
+    "",
+    "   \n\n  \t ",
+    "no headers at all\n\njust paragraphs\n\n\n\nand more",
+    "# Title\nbody",
+    "\n\n\n# Title after blank lines\nbody\n# Second\nmore",
+    "intro\n# A\n# B\n## C\ntext",
+    "#  \nhash and two spaces is a header\n# \nhash and one space is not",
+    "####### seven hashes\nbody\n# one\nbody",
+    "1. Numbered Section\nbody\n2. lowercase start\nbody\n10. Another One\nx",
+    "1.  A\nshort numbered\n2. B\n",
+    "ALL CAPS HEADER\nbody\nA\nsingle letter\nAB\nbody\nMIXED Case\nbody",
+    "CAPS\tWITH\tTABS\nbody\nCAPS WITH TRAILING   \nbody",
+    "WINDOWS\r\nline endings\r\n# Header\r\nbody\r\n",
+    "NBSP\xa0CAPS\nbody\n#\xa0nbsp header\nbody\n1.\u2003Em Space\nbody",
+    "FORM\x0cFEED\nbody\nVERTICAL\x0bTAB\nbody",
+    "ÉCOLE\nnon-ascii caps are not headers\nINTRO\nbody",
+    "trailing header\nTHE END",
+    "only one\nHEADER\n",
+    "text\n\n\n\n\nA\n\n\nB\n\n",
+    "\u2028LINE SEPARATOR\nbody\n# x\u2028y\nz",
+]
+
+HEADER_LINES = ["# Intro", "## Transactions", "###### Deep", "####### Too deep", "#NoSpace",
+                "1. Locking Basics", "12. Two Digits", "3. lower", "4.NoSpace",
+                "ACID", "CONCURRENCY CONTROL", "A", "A B", "Mixed Caps", "TWO\tTABS"]
+BODY_WORDS = ["transaction", "lock", "isolation", "commit", "rollback", "the", "of",
+              "database", "schedule", "serializable", "  ", "\t", "DBMS", "#", "1."]
+
+
+def random_document(rng):
+    lines = []
+    for _ in range(rng.randint(0, 60)):
+        roll = rng.random()
+        if roll < 0.2:
+            lines.append(rng.choice(HEADER_LINES))
+        elif roll < 0.35:
+            lines.append(rng.choice(["", " ", "\t", "\r"]))
+        else:
+            lines.append(" ".join(rng.choice(BODY_WORDS) for _ in range(rng.randint(1, 15))))
+    separator = rng.choice(["\n", "\n", "\r\n"])
+    return separator.join(lines) + rng.choice(["", "\n", "\n\n"])
+
+
+def test_edge_cases_match_legacy():
+    for content in EDGE_CASES:
+        assert extractor._split_into_sections(content) == legacy_split_into_sections(content), repr(content)
+
+
+def test_random_documents_match_legacy():
+    rng = random.Random(1234)
+    for _ in range(2000):
+        content = random_document(rng)
+        assert extractor._split_into_sections(content) == legacy_split_into_sections(content), repr(content)
+
+
+def test_spans_point_at_sections():
+    rng = random.Random(99)
+    for _ in range(200):
+        content = random_document(rng)
+        sections = [content[start:end] for start, end in extractor._section_spans(content)]
+        assert sections == legacy_split_into_sections(content)
+
+
+def test_topic_extraction_matches_legacy():
+    rng = random.Random(7)
+    topics = ["Transactions in DBMS", "locking and isolation", "commit", "nothing relevant"]
+    for _ in range(300):
+        content = "\n".join(random_document(rng) for _ in range(rng.randint(1, 8)))
+        topic = rng.choice(topics)
+        max_chars = rng.choice([200, 1500, 15000])
+        expected = legacy_extract_topic_content(content, topic, max_chars)
+        assert extractor.extract_topic_content(content, topic, max_chars) == expected
+
+
+def test_unit_ranges_are_parsed_and_sliced_from_the_index():
+    assert extractor.parse_unit_range("Transactions, pp. 120-160") == ((120, 160), "Transactions")
+    assert extractor.parse_unit_range("Recovery (pages 40–42)") == ((40, 42), "Recovery")
+    assert extractor.parse_unit_range("Slides 7 to 3: locking") == ((3, 7), "locking")
+    assert extractor.parse_unit_range("page 12") == ((12, 12), "")
+    assert extractor.parse_unit_range("chapter 3") == (None, "chapter 3")
+
+    pages = ["Page one text.", "Page two: transactions.", "Page three: recovery."]
+    content = "\n".join(pages)
+    offsets = [0]
+    for page in pages:
+        offsets.append(offsets[-1] + len(page) + 1)
+    content_index = {"unit": "page", "offsets": offsets[:-1] + [len(content)]}
+
+    assert extractor.slice_units(content, content_index, 2, 2) == pages[1]
+    assert extractor.slice_units(content, content_index, 2, 9) == "\n".join(pages[1:])
+    assert extractor.slice_units(content, content_index, 0, 1) == pages[0]
+    assert extractor.slice_units(content, content_index, 4, 5) is None
+    assert extractor.slice_units(content, dict(content_index, unit="heading"), 1, 1) is None
+
+    # A page range in the topic narrows extraction to those pages
+    result = extractor.extract_topic_content(content, "recovery, page 3", content_index=content_index)
+    assert result == pages[2]
+
+
+def test_topic_pages_come_from_the_outline_and_page_labels():
+    sections = [
+        {"title": "Preface", "level": 0, "start": 0, "end": 2},
+        {"title": "Transaction Management", "level": 0, "start": 3, "end": 11},
+        {"title": "Locking", "level": 1, "start": 4, "end": 6},
+        {"title": "Recovery", "level": 1, "start": 7, "end": 11},
+        {"title": "Index", "level": 0, "start": 12, "end": 13},
+    ]
+    labels = ["i", "ii", "iii", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11"]
+
+    assert extractor.find_topic_pages("Transactions in DBMS", sections, labels) == [(3, 11)]
+    assert extractor.find_topic_pages("Locking and recovery", sections, labels) == [(4, 11)]  # Merged
+    assert extractor.find_topic_pages("Cooking recipes", sections, labels) == []
+    assert extractor.find_topic_pages("Transactions", [], labels) == []
+
+    # Page ranges use the printed labels when they define those pages, else raw page numbers
+    assert extractor.find_topic_pages("Locking, pp. 2-4", sections, labels) == [(4, 6)]
+    assert extractor.find_topic_pages("pages 30-35", sections, labels) == [(29, 34)]
+    assert extractor.find_topic_pages("page 3", sections) == [(2, 2)]
+
+
+def test_bm25_index_ranks_matching_sections_first():
+    content = "\n".join([
+        "# Storage", "Pages and files on disk. " * 60,
+        "# Transactions", "A transaction is atomic; transactions commit or abort. " * 40,
+        "# Indexing", "B+ trees index records. One transaction is mentioned here. " * 30,
+    ])
+    section_index = extractor.build_section_index(content)
+    assert len(section_index['spans']) == 3
+
+    result = extractor.extract_topic_content(content, "Transactions in DBMS", max_chars=2500,
+                                             section_index=section_index)
+    assert result.startswith("# Transactions")
+    assert "# Storage" not in result
+
+
+def test_stale_bm25_index_is_ignored():
+    rng = random.Random(3)
+    content = "\n".join(random_document(rng) for _ in range(5))
+    stale_index = extractor.build_section_index(content + " extra")
+    expected = extractor.extract_topic_content(content, "commit")
+    assert extractor.extract_topic_content(content, "commit", section_index=stale_index) == expected
+
+    # Same length, different text: rejected by the digest, not just the length
+    edited = content.replace("commit", "tnmmoc")
+    edited_index = extractor.build_section_index(edited)
+    assert edited_index['length'] == len(content) and edited != content
+    assert extractor.extract_topic_content(content, "commit", section_index=edited_index) == expected
+
+
+def test_repeated_extraction_is_memoized():
+    memo_extractor = ContentExtractor()
+    rng = random.Random(11)
+    content = "\n".join(random_document(rng) for _ in range(5))
+
+    first = memo_extractor.extract_topic_content(content, "Locking and isolation")
+    second = memo_extractor.extract_topic_content(content, "  locking AND   isolation ")
+    other_topic = memo_extractor.extract_topic_content(content, "commit")
+
+    stats = memo_extractor.cache_stats()
+    assert first == second
+    assert other_topic == extractor.extract_topic_content(content, "commit")
+    assert stats['topic_extractions']['hits'] == 1
+    assert stats['topic_extractions']['misses'] == 2
+    # The second topic reused the split sections
+    assert stats['sections'] == dict(stats['sections'], hits=1, misses=1)
+
+
+def test_sparse_scores_match_python_loop():
+    rng = random.Random(21)
+    topics = ["Transactions in DBMS", "locking and isolation", "isolation schedule", "commit", "1. of"]
+    sparse_extractor, python_extractor = ContentExtractor(), ContentExtractor()
+    sparse_extractor.scoring_engine, python_extractor.scoring_engine = 'sparse', 'python'
+
+    for _ in range(100):
+        content = "\n".join(random_document(rng) for _ in range(rng.randint(1, 12)))
+        spans, scores = sparse_extractor.score_topics(content, topics)
+        for column, topic in enumerate(topics):
+            keywords = extractor._extract_keywords(topic)
+            expected = [extractor._calculate_relevance_score(content[start:end], keywords) for start, end in spans]
+            assert list(scores[:, column]) == expected, (topic, repr(content))
+            max_chars = rng.choice([200, 1500, 15000])
+            assert (sparse_extractor.extract_topic_content(content, topic, max_chars)
+                    == python_extractor.extract_topic_content(content, topic, max_chars))
+
+
+def test_top_sections_match_full_sort():
+    rng = random.Random(13)
+    for _ in range(300):
+        content = "\n".join(random_document(rng) for _ in range(rng.randint(1, 10)))
+        keywords = extractor._extract_keywords(rng.choice(["commit", "locking and isolation"]))
+        scored = [(extractor._calculate_relevance_score(content[start:end], keywords), start, end)
+                  for start, end in extractor._section_spans(content)]
+        scored = [section for section in scored if section[0] > 0]
+        max_chars = rng.choice([50, 300, 1500, 15000])
+
+        top = extractor._top_sections(iter(scored), max_chars)
+        assert top == sorted(scored, key=lambda section: -section[0])[:len(top)]
+        assert (extractor._select_sections(content, top, max_chars)
+                == extractor._select_sections(content, sorted(scored, key=lambda section: -section[0]), max_chars))
+
+
+def test_large_documents_rank_only_the_best_sections():
+    rng = random.Random(29)
+    section_count = content_extractor.SPARSE_MIN_SECTIONS * 4
+    # Few distinct keyword counts, so many sections tie on score
+    content = "\n".join(f"# Note {number}\n" + "A transaction commits. " * rng.randint(0, 4)
+                        + "Locks are held until commit. " * rng.randint(1, 3) for number in range(section_count))
+    auto_extractor, python_extractor = ContentExtractor(), ContentExtractor()
+    python_extractor.scoring_engine = 'python'
+    section_index = extractor.build_section_index(content)
+    assert len(section_index['spans']) == section_count
+
+    ranked_lengths = []
+    ranked_prefix = auto_extractor._ranked_prefix
+    auto_extractor._ranked_prefix = lambda top, count, max_chars: (
+        ranked_lengths.append((len(ranked_prefix(top, count, max_chars)), count))
+        or ranked_prefix(top, count, max_chars))
+
+    for topic in ("transaction commits", "locks", "commit"):
+        for max_chars in (300, 1500, 6000):
+            # Sparse path ('auto' picks it for this many sections)
+            assert (auto_extractor.extract_topic_content(content, topic, max_chars)
+                    == python_extractor.extract_topic_content(content, topic, max_chars)), (topic, max_chars)
+
+            # BM25 path, against selecting from the fully sorted ranking
+            spans = section_index['spans']
+            fully_ranked = [(score, *spans[section_id]) for score, section_id
+                            in rank_sections(section_index, extractor._extract_keywords(topic)[:-1])]
+            assert (auto_extractor.extract_topic_content(content, topic, max_chars, section_index=section_index)
+                    == extractor._select_sections(content, fully_ranked, max_chars)), (topic, max_chars)
+
+    assert len(ranked_lengths) == 18
+    assert all(ranked < count for ranked, count in ranked_lengths)
+
+
+def test_missing_scipy_is_logged_once():
+    section_count = content_extractor.SPARSE_MIN_SECTIONS
+    content = "\n".join(f"# Note {number}\nA transaction commits." for number in range(section_count))
+    python_extractor = ContentExtractor()
+    python_extractor.scoring_engine = 'python'
+    scipy_available = content_extractor.SCIPY_AVAILABLE
+    content_extractor.SCIPY_AVAILABLE, content_extractor._sparse_unavailable_logged = False, False
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            for topic in ("transaction", "commits"):
+                assert (ContentExtractor().extract_topic_content(content, topic, max_chars=500)
+                        == python_extractor.extract_topic_content(content, topic, max_chars=500))
+    finally:
+        content_extractor.SCIPY_AVAILABLE = scipy_available
+    assert output.getvalue().count("SciPy not available") == 1
+
+
+def test_selection_stops_scoring_early():
+    streaming_extractor = ContentExtractor()
+    streaming_extractor.scoring_engine = 'python'
+    scored_spans = []
+    score_span = streaming_extractor._score_span
+    streaming_extractor._score_span = lambda content_lower, start, end, *args: (
+        scored_spans.append(start) or score_span(content_lower, start, end, *args))
+
+    content = "\n".join(["# Commit", "commit " * 400] + ["# Note %d" % i + "\ncommit" for i in range(20)])
+    result = streaming_extractor.extract_topic_content(content, "commit", max_chars=1500)
+    assert result == legacy_extract_topic_content(content, "commit", max_chars=1500)
+    assert len(scored_spans) < len(streaming_extractor._section_spans(content))
+
+
+def test_selection_stops_before_short_trailing_sections():
+    # A textbook chapter followed by its exercises: once the chapter fills the budget,
+    # no exercise (each far shorter than the chapter) could outscore it
+    streaming_extractor = ContentExtractor()
+    streaming_extractor.scoring_engine = 'python'
+    scored_spans = []
+    score_span = streaming_extractor._score_span
+    streaming_extractor._score_span = lambda content_lower, start, end, *args: (
+        scored_spans.append(start) or score_span(content_lower, start, end, *args))
+
+    storage = ["# Storage and Indexing"] + [
+        "Records live in pages on disk; a buffer pool caches hot pages and B+ trees index them."] * 12
+    chapter = [
+        "# Concurrency Control",
+        "Concurrency control keeps concurrent transactions from interfering with each other. "
+        "Without concurrency control, interleaved reads and writes can lose updates or expose "
+        "uncommitted data.",
+        "",
+        "Lock-based concurrency control makes a transaction acquire shared or exclusive locks "
+        "before it reads or writes an item. Two-phase locking is the classic concurrency control "
+        "protocol: a transaction acquires all of its locks before releasing any of them.",
+        "",
+        "Timestamp-based concurrency control orders transactions by their start time instead, "
+        "and optimistic concurrency control validates a transaction only when it commits. "
+        "Multiversion concurrency control keeps older versions so readers never block writers.",
+        "",
+        "Choosing a concurrency control scheme trades throughput against aborts: pessimistic "
+        "concurrency control blocks early, optimistic concurrency control restarts late.",
+        "",
+        "Deadlocks are the price of locking: a concurrency control manager either prevents them "
+        "by ordering lock requests or detects them with a waits-for graph and aborts a victim.",
+    ]
+    exercises = ["EXERCISES"] + ["%d. %s" % (number, question) for number, question in enumerate([
+        "Explain why a buffer pool needs a replacement policy.",
+        "Compare clustered and unclustered B+ tree indexes.",
+        "Describe how concurrency control prevents lost updates.",
+        "Give a schedule that is conflict serializable but not serial.",
+        "What does the write-ahead logging rule guarantee?",
+    ] * 8, 1)]
+    content = "\n".join(storage + chapter + exercises)
+
+    result = streaming_extractor.extract_topic_content(content, "Concurrency control", max_chars=1000)
+    assert result == legacy_extract_topic_content(content, "Concurrency control", max_chars=1000)
+    assert result.startswith("# Concurrency Control")
+    # Only the sections up to the chapter were scored, not the 41 after it
+    assert len(scored_spans) == 2 < len(streaming_extractor._section_spans(content))
+
+
+def test_chapter_lookup_uses_table_of_contents():
+    content = "\n".join([
+        "Preface", "About this book.",
+        "PART I FOUNDATIONS",
+        "Chapter 1: Introduction", "Databases store data.",
+        "1.1 What is a DBMS", "A DBMS manages data.",
+        "Chapter IV - Transactions", "Transactions are atomic.",
+        "4.1 Isolation Levels", "Serializable and read committed.",
+        "see", "section 3 for details",
+        "UNIT 5 Storage", "Pages on disk.",
+    ])
+    toc_index = extractor.build_toc_index(content)
+    titles = [entry['title'] for entry in toc_index['entries']]
+    assert titles == ["PART I FOUNDATIONS", "Chapter 1: Introduction", "1.1 What is a DBMS",
+                      "Chapter IV - Transactions", "4.1 Isolation Levels", "UNIT 5 Storage"]
+    assert [entry['parent'] for entry in toc_index['entries']] == [None, 0, 1, 0, 3, 0]
+
+    chapter = extractor.extract_chapter_content(content, ["chapter 4"], toc_index=toc_index)
+    assert chapter.startswith("Chapter IV - Transactions") and chapter.endswith("section 3 for details")
+    assert extractor.extract_chapter_content(content, ["Chapter iv"]) == chapter
+    assert extractor.extract_chapter_content(content, ["isolation levels"]).startswith("4.1 Isolation Levels")
+    assert extractor.extract_chapter_content(content, ["4.1", "isolation"]).endswith("section 3 for details")
+
+
+def test_numbered_list_stays_inside_its_chapter():
+    content = "\n".join([
+        "Chapter 5: Transactions", "A transaction has four properties.",
+        "1. Atomicity", "All or nothing.",
+        "2. Durability", "Committed work survives crashes.",
+        "5.1 Recovery", "Redo and undo.",
+        "Section 2 Logging", "Write-ahead logging.",
+        "1. Log records", "Before and after images.",
+        "Chapter 6: Storage", "Pages on disk.",
+    ])
+    toc_index = extractor.build_toc_index(content)
+    assert [(entry['level'], entry['parent']) for entry in toc_index['entries']] == [
+        (2, None), (3, 0), (3, 0), (4, 0), (3, 0), (4, 4), (2, None)]
+
+    chapter = extractor.extract_chapter_content(content, ["Chapter 5"], toc_index=toc_index)
+    assert chapter.startswith("Chapter 5: Transactions") and chapter.endswith("Before and after images.")
+    assert extractor.extract_chapter_content(content, ["Atomicity"]) == "1. Atomicity\nAll or nothing."
+
+    # Without an enclosing chapter, numbered headings still nest by their dots
+    toc_index = extractor.build_toc_index("1. Basics\nText.\n1.1 Keys\nMore.\n2. Queries\nEnd.")
+    assert [(entry['level'], entry['parent']) for entry in toc_index['entries']] == [(2, None), (3, 0), (2, None)]
+
+
+def test_batch_extraction_matches_single_topics():
+    rng = random.Random(17)
+    topics = ["Transactions in DBMS", "locking and isolation", "commit", "serializable schedule", "nothing relevant"]
+    for engine in ('sparse', 'python'):
+        batch_extractor = ContentExtractor()
+        batch_extractor.scoring_engine = engine
+        for _ in range(40):
+            content = "\n".join(random_document(rng) for _ in range(rng.randint(1, 10)))
+            max_chars = rng.choice([300, 1500, 15000])
+            results = batch_extractor.extract_topics_content(content, topics, max_chars)
+            assert list(results) == topics
+            for topic in topics:
+                assert results[topic] == extractor.extract_topic_content(content, topic, max_chars), (engine, topic)
+
+
+def test_keyword_matcher_matches_str_count():
+    rng = random.Random(5)
+    for _ in range(2000):
+        text = "".join(rng.choice("ab \n") for _ in range(rng.randint(0, 40)))
+        keywords = ["".join(rng.choice("ab ") for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 6))]
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, len(text))
+        line_end = text.find("\n", start, end)
+        line_end = end if line_end == -1 else line_end
+
+        expected = ([text.count(keyword, start, end) for keyword in keywords],
+                    [text.find(keyword, start, line_end) != -1 for keyword in keywords])
+        for accelerated in (True, False):
+            assert KeywordMatcher(keywords, accelerated).scan(text, start, end, line_end) == expected, repr(text)
+
+
+def test_aho_corasick_extraction_matches_count_loop():
+    rng = random.Random(8)
+    automaton_extractor, count_extractor = ContentExtractor(), ContentExtractor()
+    automaton_extractor.keyword_matcher, count_extractor.keyword_matcher = 'aho-corasick', 'count'
+    for engine_extractor in (automaton_extractor, count_extractor):
+        engine_extractor.scoring_engine = 'python'
+
+    topics = ["Transactions in DBMS", "locking and isolation with serializable schedule commit rollback"]
+    for _ in range(100):
+        content = "\n".join(random_document(rng) for _ in range(rng.randint(1, 8)))
+        topic = rng.choice(topics)
+        assert (automaton_extractor.extract_topic_content(content, topic)
+                == count_extractor.extract_topic_content(content, topic))
+
+
+def test_auto_keyword_matcher_needs_enough_keywords():
+    auto_extractor = ContentExtractor()
+    auto_extractor.keyword_matcher = 'auto'
+    # Each word is a keyword, plus the whole topic as a phrase
+    long_topic = " ".join(f"term{number}" for number in range(content_extractor.AHO_CORASICK_MIN_KEYWORDS - 1))
+    long_keywords = auto_extractor._extract_keywords(long_topic)
+    short_keywords = auto_extractor._extract_keywords(long_topic.rsplit(" ", 1)[0])
+    assert len(long_keywords) == content_extractor.AHO_CORASICK_MIN_KEYWORDS == len(short_keywords) + 1
+
+    matcher = auto_extractor._build_keyword_matcher(long_keywords)
+    if content_extractor.AHOCORASICK_AVAILABLE:
+        assert isinstance(matcher, KeywordMatcher) and matcher.backend == 'pyahocorasick'
+    else:
+        assert matcher is None
+    assert auto_extractor._build_keyword_matcher(short_keywords) is None
+
+    # Forced either way regardless of the keyword count
+    auto_extractor.keyword_matcher = 'count'
+    assert auto_extractor._build_keyword_matcher(long_keywords) is None
+    auto_extractor.keyword_matcher = 'aho-corasick'
+    assert isinstance(auto_extractor._build_keyword_matcher(short_keywords[:2]), KeywordMatcher)
+
+
+if __name__ == "__main__":
+    for test in (test_edge_cases_match_legacy, test_random_documents_match_legacy,
+                 test_spans_point_at_sections, test_topic_extraction_matches_legacy,
+                 test_unit_ranges_are_parsed_and_sliced_from_the_index,
+                 test_topic_pages_come_from_the_outline_and_page_labels,
+                 test_bm25_index_ranks_matching_sections_first, test_stale_bm25_index_is_ignored,
+                 test_repeated_extraction_is_memoized, test_sparse_scores_match_python_loop,
+                 test_top_sections_match_full_sort, test_large_documents_rank_only_the_best_sections,
+                 test_missing_scipy_is_logged_once, test_selection_stops_scoring_early,
+                 test_selection_stops_before_short_trailing_sections,
+                 test_chapter_lookup_uses_table_of_contents, test_numbered_list_stays_inside_its_chapter,
+                 test_batch_extraction_matches_single_topics,
+                 test_keyword_matcher_matches_str_count, test_aho_corasick_extraction_matches_count_loop,
+                 test_auto_keyword_matcher_needs_enough_keywords):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All content extractor tests passed")
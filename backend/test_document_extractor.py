@@ -0,0 +1,206 @@
+"""
+Tests for document_extractor: PDF pages extracted across the process pool
+come out in page order and match in-process extraction, streamed text
+stripping and page offsets agree with joining the whole document,
+extractors are looked up (and replaced) by extension, and PDF outlines and
+page labels are decoded without extracting any text.
+
+Run with pytest, or directly: python test_document_extractor.py
+"""
+
+import io
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import document_extractor
+from document_extractor import (ContentIndexBuilder, FormatExtractor, TextExtractor, _split_page_ranges,
+                                extract_pdf_pages, get_extractor, iter_file_segments, iter_pdf_page_ranges,
+                                iter_stripped_text, read_pdf_outline, register_extractor)
+
+
+def make_pdf(page_texts, catalog_entries=""):
+    """
+    A minimal in-memory PDF with one line of Helvetica text per list item on each
+    page. catalog_entries is added to the document catalog (e.g. /PageLabels).
+    """
+    page_count = len(page_texts)
+    objects = [
+        f"<< /Type /Catalog /Pages 2 0 R {catalog_entries}>>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * page} 0 R" for page in range(page_count)), page_count),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page, lines in enumerate(page_texts):
+        text = " T* ".join("(%s) Tj" % line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                           for line in lines)
+        stream = f"BT /F1 12 Tf 14 TL 72 720 Td {text} ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * page} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    pdf = io.BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(pdf.tell())
+        pdf.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = pdf.tell()
+    pdf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets:
+        pdf.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    pdf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+    pdf.seek(0)
+    return pdf
+
+
+def test_page_ranges_cover_every_page_once():
+    for page_count in (1, 5, 31, 100, 257):
+        for workers in (1, 2, 3, 8):
+            ranges = _split_page_ranges(page_count, workers)
+            pages = [page for start, end in ranges for page in range(start, end)]
+            assert pages == list(range(page_count)), (page_count, workers)
+            assert len(ranges) <= workers * 4
+
+
+def test_parallel_pdf_extraction_matches_in_process():
+    page_count = document_extractor.PARALLEL_MIN_PAGES + 4
+    source = make_pdf([[f"Page {page + 1}", f"transactions locking recovery {page * 7}"]
+                       for page in range(page_count)])
+    serial, serial_stats = extract_pdf_pages(source, workers=1)
+    source.seek(0)
+    parallel, parallel_stats = extract_pdf_pages(source, workers=2)
+
+    assert parallel == serial and len(serial) == page_count
+    assert all(text.startswith(f"Page {page + 1}") for page, text in enumerate(serial))
+    assert serial_stats['workers'] == 1 and parallel_stats['workers'] == 2
+    assert len(parallel_stats['page_times']) == parallel_stats['pages'] == len(serial)
+
+
+def test_concurrent_extractions_share_one_pdf_pool():
+    page_count = document_extractor.PARALLEL_MIN_PAGES
+    data = make_pdf([[f"Page {page + 1}", "buffer pool"] for page in range(page_count)]).getvalue()
+    serial, _ = extract_pdf_pages(io.BytesIO(data), workers=1)
+
+    # Different worker counts from several threads at once: no pool is replaced mid-use
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        results = list(threads.map(lambda workers: extract_pdf_pages(io.BytesIO(data), workers=workers)[0],
+                                   [2, 3, 4, 2, 3, 4]))
+    assert all(pages == serial for pages in results)
+    pool = document_extractor._pdf_pool
+    assert document_extractor._get_pdf_pool(document_extractor.DEFAULT_PDF_WORKERS + 1) is pool
+
+
+def random_pages(rng):
+    """(unit, text) segments: pages of a few segments each, with stray whitespace"""
+    pieces = ["", " ", "\n", "\t ", "Transactions", "commit", "lock\n\nrelease", "  page text  "]
+    segments = []
+    for _ in range(rng.randint(0, 8)):
+        unit = ('page', None)
+        for _ in range(rng.randint(1, 3)):
+            segments.append((unit, "".join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))))
+            unit = None
+    return segments
+
+
+def test_stripped_text_and_page_offsets_match_joined_text():
+    rng = random.Random(8)
+    for _ in range(2000):
+        segments = random_pages(rng)
+        builder = ContentIndexBuilder()
+        counts = {}
+        text = "".join(iter_stripped_text(builder.track(segments), counts=counts))
+        assert text == "\n".join(segment for _, segment in segments).strip(), segments
+        assert counts['length'] == len(text)
+
+        index = builder.build(counts['leading'], counts['length'])
+        if not segments:
+            assert index is None
+            continue
+        offsets = index['offsets']
+        assert index['unit'] == 'page' and offsets == sorted(offsets) and offsets[-1] == len(text)
+
+        # Each page's slice holds exactly that page's text
+        pages = []
+        for unit, segment in segments:
+            if unit is not None:
+                pages.append([])
+            pages[-1].append(segment)
+        assert len(offsets) == len(pages) + 1
+        for page, page_segments in enumerate(pages):
+            assert text[offsets[page]:offsets[page + 1]].strip() == "\n".join(page_segments).strip(), segments
+
+
+def test_extractors_are_registered_by_extension():
+    assert isinstance(get_extractor("Notes.TXT"), TextExtractor)
+    assert get_extractor("slides.final.pptx").extensions[-1] == "pptx"
+    assert get_extractor("archive.zip") is None and get_extractor("README") is None
+    assert list(iter_file_segments(io.BytesIO(b"data"), "archive.zip")) == []
+
+    class MarkdownExtractor(FormatExtractor):
+        extensions = ('md',)
+
+        def iter_segments(self, source, stats=None, **options):
+            for line in source.read().decode('utf-8').split('\n'):
+                yield (('heading', line.lstrip('# ')) if line.startswith('#') else None), line
+
+    try:
+        register_extractor(MarkdownExtractor(), ['.MD', 'markdown'])
+        assert isinstance(get_extractor("notes.markdown"), MarkdownExtractor)
+        builder = ContentIndexBuilder()
+        segments = iter_file_segments(io.BytesIO(b"# Locks\nshared\n# Logs\nredo"), "notes.md", index=builder)
+        assert "\n".join(segments) == "# Locks\nshared\n# Logs\nredo"
+        assert builder.build(0, 27) == {'unit': 'heading', 'offsets': [0, 15, 27], 'titles': ['Locks', 'Logs']}
+    finally:
+        document_extractor._extractors.pop('md', None)
+        document_extractor._extractors.pop('markdown', None)
+
+    try:
+        FormatExtractor()
+        assert False, "expected TypeError"
+    except TypeError:
+        pass
+    try:
+        register_extractor(TextExtractor, ['log'])
+        assert False, "expected TypeError"
+    except TypeError:
+        assert get_extractor("server.log") is None
+
+
+def test_pdf_outline_and_page_labels_are_decoded():
+    def page(number):
+        return f"{4 + 2 * number} 0 R"  # Object number of a make_pdf page
+
+    # Front matter in roman numerals, a prefixed appendix, letters past Z, a prefix-only range;
+    # the label ranges are split across two kids of the number tree
+    page_labels = ("/PageLabels << /Kids [ << /Nums [0 << /S /r >> 3 << /S /D >> 8 << /P (A-) /S /D /St 5 >>] >> "
+                   "<< /Nums [10 << /S /A /St 26 >> 12 << /P (Index) >>] >> ] >> ")
+    outline = ("/Outlines << /First << /Title (Preface) /Dest [%s /Fit] "
+               "/Next << /Title (Transaction Management) /Dest [%s /Fit] "
+               "/First << /Title (Locking) /Dest [%s /Fit] /Next << /Title (Recovery) /Dest [%s /Fit] >> >> "
+               "/Next << /Title (Index) /Dest [%s /Fit] >> >> >> >> ") % (page(0), page(3), page(4), page(7), page(12))
+    source = make_pdf([[f"Page {number + 1}"] for number in range(14)], page_labels + outline)
+
+    sections, labels, page_count = read_pdf_outline(source)
+    assert page_count == 14
+    assert labels == ["i", "ii", "iii", "1", "2", "3", "4", "5", "A-5", "A-6", "Z", "AA", "Index", "Index"]
+    assert [(section['title'], section['level'], section['start'], section['end']) for section in sections] == [
+        ("Preface", 0, 0, 2), ("Transaction Management", 0, 3, 11), ("Locking", 1, 4, 6),
+        ("Recovery", 1, 7, 11), ("Index", 0, 12, 13)]
+
+    # Only the requested pages are extracted (overlaps merged, out-of-range pages ignored)
+    source.seek(0)
+    pages = list(iter_pdf_page_ranges(source, [(4, 6), (5, 7), (20, 21)]))
+    assert pages == [(page, f"Page {page + 1}") for page in range(4, 8)]
+
+    _, labels, _ = read_pdf_outline(make_pdf([["No labels"]]))
+    assert labels == []
+
+
+if __name__ == "__main__":
+    for test in (test_page_ranges_cover_every_page_once, test_parallel_pdf_extraction_matches_in_process,
+                 test_concurrent_extractions_share_one_pdf_pool,
+                 test_stripped_text_and_page_offsets_match_joined_text, test_extractors_are_registered_by_extension,
+                 test_pdf_outline_and_page_labels_are_decoded):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All document extractor tests passed")
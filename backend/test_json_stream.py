@@ -0,0 +1,43 @@
+"""
+Tests for JSONArrayStream: objects of a streamed JSON array come out as soon
+as their closing brace arrives, wherever the response is split.
+
+Run with pytest, or directly: python test_json_stream.py
+"""
+
+import json
+import random
+
+from json_stream import JSONArrayStream
+
+
+def test_streamed_chunks_parse_at_any_split():
+    chunks = [{"id": 1, "title": "Locks", "content": "<p>Use {braces} and \"quotes\" \\ [brackets]</p>"},
+              {"id": 2, "title": "Nested", "objectives": [{"a": "}"}, "]"], "content": ""}]
+    response = "```json\n" + json.dumps(chunks) + "\n```"
+    first_end = response.index(json.dumps(chunks[0])) + len(json.dumps(chunks[0]))
+    second_end = response.rindex("}") + 1
+    rng = random.Random(11)
+    for _ in range(300):
+        cuts = sorted(rng.sample(range(1, len(response)), rng.randint(1, 40)))
+        parser = JSONArrayStream()
+        parsed, completed_at = [], []
+        for start, end in zip([0] + cuts, cuts + [len(response)]):
+            parsed += parser.feed(response[start:end])
+            completed_at.append((end, len(parsed)))
+        assert parsed == chunks and parser.finished and parser.skipped == 0
+        # Each chunk comes out with the piece holding its closing brace
+        assert all(count == (end >= first_end) + (end >= second_end) for end, count in completed_at)
+
+    # Raw newlines inside strings are accepted; broken objects are skipped, not fatal
+    parser = JSONArrayStream()
+    assert parser.feed('[{"id": 1, "content": "two\nlines"}, {"id": 2, oops}, {"id": 3}') == [
+        {"id": 1, "content": "two\nlines"}, {"id": 3}]
+    assert parser.skipped == 1 and not parser.finished
+
+
+if __name__ == "__main__":
+    for test in (test_streamed_chunks_parse_at_any_split,):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All JSON stream tests passed")
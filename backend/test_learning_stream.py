@@ -0,0 +1,114 @@
+"""
+Tests for /api/continue-learning/stream: chunks are sent as Gemini writes them,
+a stream that fails before the first chunk falls back to the buffered call, and
+one that fails partway ends with an "error" event instead of "done".
+
+Run with pytest, or directly: python test_learning_stream.py
+"""
+
+import json
+import os
+import tempfile
+
+# An isolated database and upload folder; no real Gemini calls, no automatic resuming
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(WORK_DIR, 'learning_system.db'))
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(WORK_DIR, 'uploads'))
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['RESUME_UPLOAD_JOBS'] = 'false'
+
+import app_minimal
+from async_tasks import EventLoopThread
+from gemini_service import GeminiService
+from rate_limiter import TokenBucketLimiter
+from single_flight import SingleFlight
+
+CHUNKS = [{"title": f"Part {number}", "content": f"Transactions, part {number}."} for number in range(1, 4)]
+
+
+class Part:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Streams the chunks JSON in pieces, raising after fail_after pieces (if set)"""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.buffered_calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        text = json.dumps(CHUNKS)
+        if not stream:
+            self.buffered_calls += 1
+            return Part(text)
+
+        async def parts():
+            pieces = [text[start:start + 40] for start in range(0, len(text), 40)]
+            for number, piece in enumerate(pieces):
+                if number == self.fail_after:
+                    raise ConnectionError("stream reset")
+                yield Part(piece)
+        return parts()
+
+
+def fake_service(model):
+    """A GeminiService talking to model (no API key, response cache or shared rate limit)"""
+    service = GeminiService.__new__(GeminiService)
+    service.model_name = 'fake-model'
+    service.generation_config = {}
+    service.model = model
+    service.response_cache = None
+    service.single_flight = SingleFlight()
+    service.rate_limiter = TokenBucketLimiter(10000, burst=100)
+    service.loop = EventLoopThread(name='fake-gemini')
+    return service
+
+
+def stream_events(model):
+    """(event, data) pairs of a streamed continue-learning response from model"""
+    gemini_service = app_minimal.gemini_service
+    app_minimal.gemini_service = fake_service(model)
+    try:
+        response = app_minimal.app.test_client().post('/api/continue-learning/stream', json={
+            'topic': 'transactions', 'content': 'Transactions commit or abort as a unit.'})
+        body = response.get_data(as_text=True)
+    finally:
+        app_minimal.gemini_service = gemini_service
+    events = []
+    for message in body.strip().split("\n\n"):
+        event, data = message.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_chunks_stream_until_done():
+    events = stream_events(FakeModel())
+    assert [event for event, _ in events] == ['meta', 'chunk', 'chunk', 'chunk', 'done']
+    assert [data for event, data in events if event == 'chunk'] == CHUNKS
+    assert events[-1][1]['count'] == 3 and not events[-1][1]['fallback']
+
+
+def test_stream_failing_before_the_first_chunk_falls_back():
+    model = FakeModel(fail_after=0)
+    events = stream_events(model)
+    assert [data for event, data in events if event == 'chunk'] == CHUNKS
+    assert events[-1][0] == 'done' and model.buffered_calls == 1
+
+
+def test_stream_failing_partway_ends_with_error():
+    model = FakeModel(fail_after=2)  # After the first chunk's JSON is complete
+    events = stream_events(model)
+    chunks = [data for event, data in events if event == 'chunk']
+    assert chunks and chunks == CHUNKS[:len(chunks)] and len(chunks) < len(CHUNKS)
+    assert events[-1] == ('error', {"error": "stream reset", "final": True})
+    assert 'done' not in [event for event, _ in events] and model.buffered_calls == 0
+
+
+if __name__ == "__main__":
+    for test in (test_chunks_stream_until_done, test_stream_failing_before_the_first_chunk_falls_back,
+                 test_stream_failing_partway_ends_with_error):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All learning stream tests passed")
@@ -0,0 +1,49 @@
+"""
+Tests for MinHash signatures and the LSH index: near-duplicate editions of a
+text are found, unrelated texts are not, and index updates take effect.
+
+Run with pytest, or directly: python test_minhash_index.py
+"""
+
+import random
+
+from minhash_index import LSHIndex, minhash_signature, signature_from_bytes, signature_to_bytes
+
+
+def test_minhash_finds_near_duplicate_editions():
+    rng = random.Random(6)
+    vocabulary = ["".join(rng.choice("abcdefghij") for _ in range(rng.randint(3, 8))) for _ in range(2000)]
+    first_edition = [rng.choice(vocabulary) for _ in range(5000)]
+    second_edition = ["revised" if position % 30 == 0 else word for position, word in enumerate(first_edition)]
+    unrelated = [rng.choice(vocabulary) for _ in range(5000)]
+
+    signatures = {name: minhash_signature(" ".join(words)) for name, words in
+                  [("first", first_edition), ("second", second_edition), ("unrelated", unrelated)]}
+    assert signature_from_bytes(signature_to_bytes(signatures["first"])).tolist() == signatures["first"].tolist()
+    assert minhash_signature(" ".join(first_edition).upper()).tolist() == signatures["first"].tolist()
+
+    index = LSHIndex()
+    index.add("first", signatures["first"])
+    index.add("unrelated", signatures["unrelated"])
+    matches = index.query(signatures["second"], threshold=0.5)
+    assert [key for key, _ in matches] == ["first"] and matches[0][1] > 0.6
+    assert index.query(signatures["first"], exclude="first") == []
+
+    index.remove("first")
+    assert index.query(signatures["second"], threshold=0.5) == [] and len(index) == 1
+    assert "unrelated" in index and "first" not in index
+
+    index.clear()
+    assert len(index) == 0 and index.query(signatures["unrelated"]) == []
+
+
+def test_candidate_threshold_follows_the_banding():
+    assert round(LSHIndex().candidate_threshold, 2) == 0.42  # 32 bands of 4 rows
+    assert LSHIndex(bands=64).candidate_threshold < LSHIndex().candidate_threshold < LSHIndex(bands=16).candidate_threshold
+
+
+if __name__ == "__main__":
+    for test in (test_minhash_finds_near_duplicate_editions, test_candidate_threshold_follows_the_banding):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All MinHash index tests passed")
@@ -0,0 +1,76 @@
+"""
+Tests for near-duplicate materials: chunks generated for a topic are reused
+for another edition of the text (topics compared case- and whitespace-
+insensitively), and /similar never queries below the LSH candidate threshold.
+
+Run with pytest, or directly: python test_near_duplicates.py
+"""
+
+import json
+import os
+import random
+import tempfile
+
+# An isolated database and upload folder; no Gemini calls, no automatic resuming
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(WORK_DIR, 'learning_system.db'))
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(WORK_DIR, 'uploads'))
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['RESUME_UPLOAD_JOBS'] = 'false'
+
+import app_minimal
+from app_minimal import LearningSession, app, db
+
+with app.app_context():
+    db.create_all()
+
+
+def save_editions():
+    """Two near-identical editions of a textbook chapter, saved as materials"""
+    rng = random.Random(4)
+    vocabulary = ["".join(rng.choice("abcdefghij") for _ in range(rng.randint(3, 8))) for _ in range(2000)]
+    words = [rng.choice(vocabulary) for _ in range(3000)]
+    revised = ["revised" if position % 40 == 0 else word for position, word in enumerate(words)]
+    materials = []
+    for edition, text in enumerate((" ".join(words), " ".join(revised)), start=1):
+        material, _ = app_minimal._save_material('7', f'Edition {edition}', 'Chapter 5', f'edition{edition}.txt',
+                                                 text, os.urandom(32).hex())
+        materials.append(material)
+    return materials
+
+
+def test_chunks_are_reused_across_editions():
+    chunks = [{"title": "Transactions", "content": "Atomicity and durability."}]
+    with app.app_context():
+        first, second = save_editions()
+        db.session.add(LearningSession(material_id=first.id, user_id='7', topic='  Chapter   5 ',
+                                       chunks=json.dumps(chunks), progress=0))
+        db.session.commit()
+
+        reused = app_minimal._reusable_chunks(second, 'chapter 5')
+        assert reused is not None
+        reused_chunks, source_id, similarity = reused
+        assert reused_chunks == chunks and source_id == first.id and similarity > 0.5
+        assert app_minimal._reusable_chunks(second, 'Chapter 6') is None
+
+
+def test_similar_threshold_is_never_below_the_lsh_floor():
+    with app.app_context():
+        first_id, second_id = [material.id for material in save_editions()]
+    client = app.test_client()
+    floor = round(app_minimal.material_lsh.candidate_threshold, 3)
+
+    body = client.get(f'/api/materials/{second_id}/similar?threshold=0.1').get_json()
+    assert body['threshold'] == body['min_threshold'] == floor
+    assert first_id in [match['material_id'] for match in body['similar']]
+
+    body = client.get(f'/api/materials/{second_id}/similar?threshold=0.99').get_json()
+    assert body['threshold'] == 0.99 and body['similar'] == []
+    assert client.get('/api/materials/999999/similar').status_code == 404
+
+
+if __name__ == "__main__":
+    for test in (test_chunks_are_reused_across_editions, test_similar_threshold_is_never_below_the_lsh_floor):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All near-duplicate tests passed")
@@ -0,0 +1,83 @@
+"""
+Tests for the streaming DOCX/PPTX extractors: they yield the same paragraphs,
+headings and slides as python-docx / python-pptx, plus the table rows and
+speaker notes the object models skip.
+
+Run with pytest, or directly: python test_ooxml_extractor.py
+"""
+
+import io
+
+import docx
+import pptx
+from pptx.util import Inches
+
+from document_extractor import DocxExtractor, PptxExtractor, StreamingDocxExtractor, StreamingPptxExtractor
+
+
+def segments(extractor, data):
+    return list(extractor.iter_segments(io.BytesIO(data)))
+
+
+def make_docx():
+    document = docx.Document()
+    document.add_paragraph("Intro before any heading")
+    document.add_heading("Transactions", level=1)
+    document.add_paragraph("A transaction is atomic.\tIt commits or aborts.")
+    table = document.add_table(rows=2, cols=2)
+    for (row, column), text in {(0, 0): "Property", (0, 1): "Meaning",
+                                (1, 0): "Atomicity", (1, 1): "All or nothing"}.items():
+        table.cell(row, column).text = text
+    document.add_heading("Recovery", level=2)
+    paragraph = document.add_paragraph("Redo the log")
+    paragraph.add_run().add_break()
+    paragraph.add_run("then undo losers")
+    data = io.BytesIO()
+    document.save(data)
+    return data.getvalue()
+
+
+def make_pptx():
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = "Locking"
+    slide.placeholders[1].text = "Shared locks\nExclusive locks"
+    slide.notes_slide.notes_text_frame.text = "Mention deadlocks"
+    presentation.slides.add_slide(presentation.slide_layouts[6])  # Blank slide
+    slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+    slide.shapes.title.text = "Lock modes"
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(4), Inches(1)).table
+    for (row, column), text in {(0, 0): "S", (0, 1): "X", (1, 0): "compatible", (1, 1): "conflicts"}.items():
+        table.cell(row, column).text = text
+    data = io.BytesIO()
+    presentation.save(data)
+    return data.getvalue()
+
+
+def test_streaming_docx_matches_python_docx():
+    data = make_docx()
+    streamed = segments(StreamingDocxExtractor(), data)
+    table_rows = [(None, "Property | Meaning"), (None, "Atomicity | All or nothing")]
+
+    assert [segment for segment in streamed if segment not in table_rows] == segments(DocxExtractor(), data)
+    assert streamed[3:5] == table_rows  # In document order, right after the paragraph before the table
+    assert streamed[0] == (('heading', ''), "Intro before any heading")
+    assert streamed[-1] == (None, "Redo the log\nthen undo losers")
+
+
+def test_streaming_pptx_matches_python_pptx():
+    data = make_pptx()
+    streamed = segments(StreamingPptxExtractor(), data)
+    extras = [(None, "Notes: Mention deadlocks"), (None, "S | X"), (None, "compatible | conflicts")]
+
+    assert [segment for segment in streamed if segment not in extras] == segments(PptxExtractor(), data)
+    assert [segment for segment in streamed if segment in extras] == extras
+    # The blank slide still opens a unit, so slide numbers stay aligned
+    assert [text for unit, text in streamed if unit is not None] == ["Locking", "", "Lock modes"]
+
+
+if __name__ == "__main__":
+    for test in (test_streaming_docx_matches_python_docx, test_streaming_pptx_matches_python_pptx):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All OOXML extractor tests passed")
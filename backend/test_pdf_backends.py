@@ -0,0 +1,67 @@
+"""
+Tests for PageReader: a page the primary backend fails on is re-extracted with
+PyPDF2 (and only that page), and a document it can't open falls back entirely.
+
+Run with pytest, or directly: python test_pdf_backends.py
+"""
+
+from pdf_backends import FALLBACK_BACKEND, PageReader, PyPDF2Backend, available_backends, get_backend
+from test_document_extractor import make_pdf
+
+PAGES = [["Page 1", "Storage"], ["Page 2", "Transactions"], ["Page 3", "Recovery"]]
+
+
+class FlakyBackend(PyPDF2Backend):
+    """Fails on the given pages (and, optionally, on open)"""
+
+    name = 'flaky'
+
+    def __init__(self, failing_pages=(), fail_open=False):
+        self.failing_pages = set(failing_pages)
+        self.fail_open = fail_open
+        self.pages_read = []
+
+    def open(self, source):
+        if self.fail_open:
+            source.read()  # Leave the stream at the end, as a real parser would
+            raise ValueError("not a PDF it understands")
+        return super().open(source)
+
+    def page_text(self, document, page_number):
+        self.pages_read.append(page_number)
+        if page_number in self.failing_pages:
+            raise ValueError("bad content stream")
+        return super().page_text(document, page_number)
+
+
+def test_failed_page_falls_back_to_pypdf2():
+    backend = FlakyBackend(failing_pages={1})
+    reader = PageReader(make_pdf(PAGES), backend)
+    try:
+        texts = [reader.page_text(page) for page in range(reader.page_count)]
+    finally:
+        reader.close()
+
+    assert texts == ["Page 1\nStorage", "Page 2\nTransactions", "Page 3\nRecovery"]
+    assert reader.backend is backend and reader.fallback_pages == 1
+    assert backend.pages_read == [0, 1, 2]  # The primary backend keeps going after the failure
+
+
+def test_unreadable_document_falls_back_entirely():
+    reader = PageReader(make_pdf(PAGES), FlakyBackend(fail_open=True))
+    try:
+        assert reader.backend is FALLBACK_BACKEND and reader.page_count == 3
+        assert reader.page_text(2) == "Page 3\nRecovery" and reader.fallback_pages == 0
+    finally:
+        reader.close()
+
+    # Unknown names resolve to PyPDF2; 'auto' to the fastest installed backend
+    assert get_backend('no-such-backend') is FALLBACK_BACKEND
+    assert get_backend('auto').name == available_backends()[0]
+
+
+if __name__ == "__main__":
+    for test in (test_failed_page_falls_back_to_pypdf2, test_unreadable_document_falls_back_entirely):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All PDF backend tests passed")
@@ -0,0 +1,35 @@
+"""
+Tests for TokenBucketLimiter: requests past the burst are queued with their
+wait and position, in memory and in the shared SQLite store.
+
+Run with pytest, or directly: python test_rate_limiter.py
+"""
+
+import os
+import tempfile
+
+from rate_limiter import RateLimitExceeded, TokenBucketLimiter
+
+
+def test_rate_limiter_queues_after_burst():
+    for sqlite_path in (None, os.path.join(tempfile.mkdtemp(), "rate_limit.db")):
+        limiter = TokenBucketLimiter(60, tokens_per_minute=60, burst=2, sqlite_path=sqlite_path)
+        reservations = [limiter.reserve(tokens=10) for _ in range(4)]
+        assert [round(reservation.wait) for reservation in reservations] == [0, 0, 1, 2]
+        assert [reservation.position for reservation in reservations] == [0, 0, 0, 1]
+
+        try:
+            limiter.reserve(tokens=10, max_wait=1)
+            assert False, "expected RateLimitExceeded"
+        except RateLimitExceeded as e:
+            assert e.position == 2 and 2 < e.wait <= 3
+        # The refused request didn't take a slot; a big prompt waits for the token bucket
+        assert round(limiter.reserve(tokens=50).wait) == 30
+        assert limiter.status()['queued'] == 3
+
+
+if __name__ == "__main__":
+    for test in (test_rate_limiter_queues_after_burst,):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All rate limiter tests passed")
@@ -0,0 +1,40 @@
+"""
+Tests for ResponseCache: entries are shared through the database, expire
+after the TTL and are evicted least recently used past the size budget.
+
+Run with pytest, or directly: python test_response_cache.py
+"""
+
+import os
+import tempfile
+
+from response_cache import ResponseCache, response_cache_key
+
+
+def test_response_cache_expires_and_evicts():
+    path = os.path.join(tempfile.mkdtemp(), "gemini_cache.db")
+    cache = ResponseCache(path, ttl_seconds=3600, max_bytes=250)
+    key = response_cache_key("gemini-2.5-flash", {"temperature": 0.7}, "Explain locking")
+    assert key != response_cache_key("gemini-2.5-flash", {"temperature": 0.2}, "Explain locking")
+    assert cache.get(key) is None
+
+    cache.put(key, "a" * 100)
+    assert ResponseCache(path).get(key) == "a" * 100  # Shared through the database
+    cache.put("second", "b" * 100)
+    assert cache.get(key) == "a" * 100  # Now more recently used than "second"
+    cache.put("third", "c" * 100)
+    assert cache.get("second") is None and cache.get(key) and cache.get("third")
+
+    cache.delete(key)
+    assert cache.get(key) is None
+    cache.ttl_seconds = -1
+    assert cache.get("third") is None
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["hits"] == 3 and stats["misses"] == 4
+
+
+if __name__ == "__main__":
+    for test in (test_response_cache_expires_and_evicts,):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All response cache tests passed")
@@ -0,0 +1,58 @@
+"""
+Tests for SingleFlight: concurrent callers with the same key share one call,
+and its result or exception.
+
+Run with pytest, or directly: python test_single_flight.py
+"""
+
+import threading
+import time
+
+from single_flight import SingleFlight
+
+
+def test_single_flight_shares_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    made = []
+
+    def call(value):
+        made.append(value)
+        started.set()
+        release.wait(5)
+        if value == "error":
+            raise ValueError(value)
+        return value
+
+    for value in ("chunks", "error"):
+        started.clear()
+        release.clear()
+        results = []
+
+        def worker():
+            try:
+                results.append(flight.do(value, lambda: call(value)))
+            except ValueError as e:
+                results.append(repr(e))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.stats()["waiting"] < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == 1 and len(results) == 5
+
+    assert made == ["chunks", "error"]
+    assert flight.stats() == {"calls": 2, "coalesced": 8, "in_flight": 0, "waiting": 0, "peak_waiters": 4}
+
+
+if __name__ == "__main__":
+    for test in (test_single_flight_shares_concurrent_calls,):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All single flight tests passed")
@@ -0,0 +1,152 @@
+"""
+Tests for upload jobs: a job runs through every stage and reports its result on
+/api/jobs/<id>, a failure is recorded on the job, and resuming only takes over
+jobs that are not claimed by a live worker (whose spooled files it leaves alone).
+
+Run with pytest, or directly: python test_upload_jobs.py
+"""
+
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# An isolated database, upload folder and content cache; no Gemini calls, no automatic resuming
+WORK_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(WORK_DIR, 'learning_system.db'))
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(WORK_DIR, 'uploads'))
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['RESUME_UPLOAD_JOBS'] = 'false'
+
+import app_minimal
+from app_minimal import UploadJob, app, db, run_upload_job
+from content_cache import content_cache
+
+# The shared cache may have been created (in the working directory) by other tests already
+content_cache.cache_dir = os.path.join(WORK_DIR, 'content_cache')
+os.makedirs(content_cache.cache_dir)
+
+with app.app_context():
+    db.create_all()
+
+NOTES = b"Transactions\nA transaction commits or aborts as a unit. Locks keep transactions isolated.\n"
+
+
+def spooled_file(data=NOTES):
+    fd, path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], suffix='_notes.txt')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    return path
+
+
+def add_job(**fields):
+    job_id = os.urandom(16).hex()
+    with app.app_context():
+        db.session.add(UploadJob(id=job_id, user_id='1', topic='transactions', title='Notes',
+                                 filename='notes.txt', content_digest=os.urandom(32).hex(), **fields))
+        db.session.commit()
+    return job_id
+
+
+def get_job(job_id):
+    with app.app_context():
+        return app.test_client().get(f'/api/jobs/{job_id}').get_json()
+
+
+def test_upload_job_runs_every_stage():
+    stages = []
+    set_job_stage = app_minimal._set_job_stage
+
+    def recording_set_job_stage(job, stage, **fields):
+        stages.append(stage)
+        set_job_stage(job, stage, **fields)
+
+    app_minimal._set_job_stage = recording_set_job_stage
+    try:
+        response = app.test_client().post('/api/upload-material', data={
+            'file': (io.BytesIO(NOTES), 'notes.txt'), 'topic': 'transactions', 'user_id': '7'})
+        assert response.status_code == 202
+        job_id = response.get_json()['job_id']
+        assert response.get_json()['status_url'] == f'/api/jobs/{job_id}'
+
+        deadline = time.time() + 30
+        while get_job(job_id)['status'] not in ('completed', 'failed') and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        app_minimal._set_job_stage = set_job_stage
+
+    job = get_job(job_id)
+    assert job['status'] == 'completed' and job['progress'] == 100, job
+    assert stages == ['extracting', 'saving', 'selecting', 'generating', 'completed']
+    assert job['chunks'] and job['session_id'] and job['material_id'] and job['extraction'] == 'full'
+    with app.app_context():
+        stored = db.session.get(UploadJob, job_id)
+        assert stored.owner == app_minimal.upload_worker_id() and stored.heartbeat_at
+        assert not os.path.exists(stored.filepath)  # The text lives in the content cache now
+
+    response = app.test_client().get('/api/jobs/no-such-job')
+    assert response.status_code == 404
+
+
+def test_failed_upload_job_records_the_error():
+    path = spooled_file()
+    job_id = add_job(filepath=path)
+    generate = app_minimal._generate_upload_chunks
+
+    def failing_generate(relevant_content, topic):
+        raise RuntimeError("generation crashed")
+
+    app_minimal._generate_upload_chunks = failing_generate
+    try:
+        run_upload_job(job_id)
+    finally:
+        app_minimal._generate_upload_chunks = generate
+
+    job = get_job(job_id)
+    assert job['status'] == 'failed' and job['error'] == 'generation crashed'
+    assert job['stage'] == 'generating' and 'chunks' not in job
+    assert not os.path.exists(path)
+
+    # A finished job is never claimed again
+    with app.app_context():
+        assert not app_minimal.claim_upload_job(job_id)
+
+    lost_job = add_job(filepath=os.path.join(WORK_DIR, 'deleted_notes.txt'))
+    run_upload_job(lost_job)
+    assert get_job(lost_job)['status'] == 'failed'
+    assert 'upload it again' in get_job(lost_job)['error']
+
+
+def test_resume_only_takes_over_abandoned_jobs():
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=app.config['UPLOAD_JOB_LEASE_SECONDS'] + 1)
+    live_path, stale_path = spooled_file(), spooled_file()
+    live_job = add_job(filepath=live_path, status='running', owner='other-host:1', heartbeat_at=now)
+    stale_job = add_job(filepath=stale_path, status='running', owner='other-host:2', heartbeat_at=stale)
+    fresh_job = add_job(filepath=spooled_file(), status='queued')  # Still waiting in its own worker's queue
+
+    with app.app_context():
+        resumed = app_minimal.resume_upload_jobs()
+    assert stale_job in resumed and live_job not in resumed and fresh_job not in resumed
+    deadline = time.time() + 30
+    while get_job(stale_job)['status'] != 'completed' and time.time() < deadline:
+        time.sleep(0.05)
+    assert get_job(stale_job)['status'] == 'completed' and not os.path.exists(stale_path)
+
+    # The live worker keeps its job; a duplicate run neither takes it nor deletes its file
+    spool = app_minimal.spool_upload(io.BytesIO(NOTES), max_size=0, dir=app.config['UPLOAD_FOLDER'])[0]
+    run_upload_job(live_job, spool)
+    job = get_job(live_job)
+    assert job['status'] == 'running' and job['stage'] == 'queued'
+    assert os.path.exists(live_path) and os.path.exists(spool.path)
+    with app.app_context():
+        assert db.session.get(UploadJob, live_job).owner == 'other-host:1'
+
+
+if __name__ == "__main__":
+    for test in (test_upload_job_runs_every_stage, test_failed_upload_job_records_the_error,
+                 test_resume_only_takes_over_abandoned_jobs):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All upload job tests passed")
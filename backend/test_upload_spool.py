@@ -0,0 +1,62 @@
+"""
+Tests for UploadSpool: in-memory buffering up to the threshold, rollover to
+disk past it, and readers over the buffered bytes.
+
+Run with pytest, or directly: python test_upload_spool.py
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+
+from upload_spool import UploadSpool, spool_upload
+
+
+def test_spool_rolls_over_past_threshold():
+    directory = tempfile.mkdtemp()
+    spool = UploadSpool(max_size=10, dir=directory, suffix="_notes.txt")
+    spool.write(b"0123456789")  # Exactly at the threshold: still in memory
+    assert not spool.rolled_over and isinstance(spool.source(), io.RawIOBase)
+
+    spool.write(b"a")
+    assert spool.rolled_over and spool.path.endswith("_notes.txt")
+    assert spool.source() == spool.path
+    with open(spool.path, "rb") as file:
+        assert file.read() == b"0123456789a"
+
+    spool.close()
+    assert not os.path.exists(spool.path)
+
+
+def test_spool_upload_hashes_and_reads_in_place():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as file:
+        file.writestr("word/document.xml", "<w:document/>" * 100)
+    data = archive.getvalue()
+
+    spool, digest = spool_upload(io.BytesIO(data), max_size=len(data))
+    try:
+        assert digest == hashlib.sha256(data).hexdigest() and not spool.rolled_over
+        with zipfile.ZipFile(spool.source()) as file:  # Needs seek/tell/read
+            assert file.read("word/document.xml") == b"<w:document/>" * 100
+
+        reader = spool.source()
+        assert reader.read(2) == b"PK" and reader.seek(-4, io.SEEK_END) == len(data) - 4
+        assert reader.read() == data[-4:] and reader.read() == b""
+        reader.close()
+
+        # Explicit rollover (upload jobs persist their bytes before they are accepted)
+        path = spool.rollover()
+        with open(path, "rb") as file:
+            assert file.read() == data
+    finally:
+        spool.close()
+
+
+if __name__ == "__main__":
+    for test in (test_spool_rolls_over_past_threshold, test_spool_upload_hashes_and_reads_in_place):
+        test()
+        print(f"✓ {test.__name__}")
+    print("\n✓ All upload spool tests passed")
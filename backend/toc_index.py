@@ -0,0 +1,161 @@
+"""
+Table of Contents Index
+Chapter / unit / section hierarchy of a document with character spans, built
+in one pass over its heading lines. It is stored with the material, so
+chapters can be listed and looked up without rescanning the text.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Bump when the stored layout or heading rules change, so old indexes get rebuilt
+TOC_VERSION = 2
+
+# Nesting level of each heading kind (lower = outer). Numbered headings nest below the
+# innermost open kind-word heading ("1." inside "Chapter 5" is a level below it),
+# one level deeper per dot; with none open they start at NUMBERED_BASE_LEVEL
+KIND_LEVELS = {
+    'part': 1, 'book': 1,
+    'chapter': 2, 'unit': 2, 'module': 2,
+    'section': 3, 'lesson': 3, 'lecture': 3, 'topic': 3,
+}
+NUMBERED_BASE_LEVEL = 2
+
+# Headings longer than this are treated as body text
+MAX_HEADING_LENGTH = 120
+
+# Heading lines: "Chapter 5: Transactions", "UNIT IV - Storage" (capitalised kind words
+# only, so wrapped body text like "see\nsection 3" isn't one), markdown "## Locking"
+# and dotted numbers "3.2 Two-Phase Locking" (single numbers like "3. Title" too,
+# but only when the title starts with a capital)
+TOC_HEADING_PATTERN = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?P<kind>' + '|'.join(f'{kind.capitalize()}|{kind.upper()}' for kind in KIND_LEVELS) + r')[^\S\n]+'
+    r'(?P<number>\d+(?:\.\d+)*|(?i:[ivxlcdm]+|[a-z]))\b[^\S\n]*(?:[:.\-–—][^\S\n]*)?.*'
+    r'|(?P<hashes>#{1,6})[^\S\n]+.+'
+    r'|(?P<dotted>\d+(?:\.\d+)+|\d+\.)[^\S\n]+[A-Z].*'
+    r')$',
+    re.MULTILINE
+)
+
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10, 'l': 50, 'c': 100, 'd': 500, 'm': 1000}
+
+
+def _normalize_number(number: str) -> str:
+    """'IV' -> '4', '5' -> '5', 'b' -> 'b' (roman numerals compare equal to arabic ones)"""
+    number = number.lower().rstrip('.')
+    if number and all(char in ROMAN_VALUES for char in number):
+        values = [ROMAN_VALUES[char] for char in number]
+        return str(sum(-value if value < following else value
+                       for value, following in zip(values, values[1:] + [0])))
+    return number
+
+
+def normalize_key(text: str) -> str:
+    """Lookup key of a chapter reference: 'Chapter IV' -> 'chapter 4', ' 3.2 ' -> '3.2'"""
+    words = text.lower().split()
+    if len(words) == 2 and words[0] in KIND_LEVELS:
+        return f"{words[0]} {_normalize_number(words[1])}"
+    if len(words) == 1 and re.fullmatch(r'\d+(?:\.\d+)*\.?', words[0]):
+        return words[0].rstrip('.')
+    return ' '.join(words)
+
+
+def build_toc_index(content: str) -> Dict:
+    """
+    Build the table of contents of a document.
+
+    Args:
+        content: The document text
+
+    Returns:
+        JSON-serialisable dict: entries [{title, kind, number, level, parent, start, end}]
+        in document order (end = start of the next heading at the same or an outer
+        level) and lookup mapping keys like 'chapter 5' or '3.2' to entry ids
+    """
+    entries: List[Dict] = []
+    lookup: Dict[str, List[int]] = {}
+    open_entries: List[int] = []  # Ids of the entries enclosing the current position
+
+    for match in TOC_HEADING_PATTERN.finditer(content):
+        heading = match.group(0).strip()
+        if len(heading) > MAX_HEADING_LENGTH:
+            continue
+
+        if match.group('kind'):
+            kind = match.group('kind').lower()
+            number = _normalize_number(match.group('number'))
+            level = KIND_LEVELS[kind]
+            keys = [f"{kind} {number}"]
+        elif match.group('hashes'):
+            kind, number = 'heading', None
+            level = len(match.group('hashes'))
+            keys = []
+        else:
+            kind = 'numbered'
+            number = match.group('dotted').rstrip('.')
+            enclosing = next((entries[entry_id]['level'] for entry_id in reversed(open_entries)
+                              if entries[entry_id]['kind'] in KIND_LEVELS), NUMBERED_BASE_LEVEL - 1)
+            level = enclosing + 1 + number.count('.')
+            keys = [number]
+
+        # Close the entries this heading ends (and numbered ones it isn't a subsection of:
+        # "5.1" ends a "2." list item before it)
+        while open_entries and (entries[open_entries[-1]]['level'] >= level or (
+                kind == 'numbered' and entries[open_entries[-1]]['kind'] == 'numbered'
+                and not number.startswith(entries[open_entries[-1]]['number'] + '.'))):
+            entries[open_entries.pop()]['end'] = match.start()
+
+        entry_id = len(entries)
+        entries.append({
+            'title': heading,
+            'kind': kind,
+            'number': number,
+            'level': level,
+            'parent': open_entries[-1] if open_entries else None,
+            'start': match.start(),
+            'end': len(content),
+        })
+        open_entries.append(entry_id)
+        for key in keys:
+            lookup.setdefault(key, []).append(entry_id)
+
+    return {
+        'version': TOC_VERSION,
+        'length': len(content),
+        'entries': entries,
+        'lookup': lookup,
+    }
+
+
+def toc_matches(toc: Optional[Dict], content: str) -> bool:
+    """True if a stored TOC was built (by this version) for this text"""
+    return bool(toc) and toc.get('version') == TOC_VERSION and toc.get('length') == len(content)
+
+
+def find_toc_entries(toc: Dict, references: List[str]) -> List[Dict]:
+    """
+    Entries matching chapter references. Exact keys ('chapter 5', 'unit iv', '3.2')
+    are dictionary lookups; otherwise references are matched against the heading
+    titles. Entries nested inside another match are dropped.
+
+    Returns:
+        Matching entries in document order
+    """
+    entries = toc['entries']
+    entry_ids = set()
+    for reference in references:
+        entry_ids.update(toc['lookup'].get(normalize_key(reference), ()))
+
+    if not entry_ids:
+        titles = [' '.join(reference.lower().split()) for reference in references]
+        entry_ids = {entry_id for entry_id, entry in enumerate(entries)
+                     if any(title and title in entry['title'].lower() for title in titles)}
+
+    matches = []
+    for entry_id in sorted(entry_ids):
+        entry = entries[entry_id]
+        if matches and entry['start'] < matches[-1]['end']:
+            continue  # Already inside the previous match
+        matches.append(entry)
+    return matches
@@ -0,0 +1,137 @@
+"""
+Upload Spool
+Streams an incoming upload into a bounded buffer while fingerprinting it.
+Small uploads stay in memory; large ones roll over to a file on disk, so a
+worker never holds more than max_size bytes of any upload in RAM (readers of
+an in-memory spool get a view over the same bytes, not a copy).
+
+This bounds the raw upload only: the text extracted from it is still loaded
+whole afterwards (it is stored on the material and indexed), so peak memory
+of an upload is about max_size + the size of its extracted text.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from typing import BinaryIO, Optional, Tuple, Union
+
+# Uploads larger than this are spooled to disk instead of memory
+DEFAULT_SPOOL_MAX_SIZE = int(os.getenv('UPLOAD_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+
+# Read size used when copying the request stream
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so parsers read the spooled bytes in place"""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position:self._position + len(buffer)]
+        count = len(data)
+        buffer[:count] = data
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+class UploadSpool:
+    """
+    Binary buffer for one upload: in memory up to max_size bytes, then a named
+    temp file (named, so worker processes and restarted servers can reopen it).
+    """
+
+    def __init__(self, max_size: int = DEFAULT_SPOOL_MAX_SIZE, dir: Optional[str] = None,
+                 suffix: str = ''):
+        self.max_size = max_size
+        self.dir = dir
+        self.suffix = suffix
+        self.size = 0
+        self.path = None
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    @property
+    def rolled_over(self) -> bool:
+        return self.path is not None
+
+    def write(self, data: bytes) -> None:
+        if self._file is None and self.size + len(data) > self.max_size:
+            self.rollover()
+        (self._file or self._buffer).write(data)
+        self.size += len(data)
+
+    def rollover(self) -> str:
+        """Move the buffered bytes to a file on disk and return its path"""
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(dir=self.dir, suffix=self.suffix)
+            self._file = os.fdopen(fd, 'w+b')
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        # Readers (and a restarted server) open the file by path
+        self._file.flush()
+        return self.path
+
+    def source(self) -> Union[str, BinaryIO]:
+        """A path (if on disk) or a fresh reader over the in-memory bytes, ready for the document parsers"""
+        if self._file is not None:
+            self._file.flush()
+            return self.path
+        return _BufferReader(self._buffer.getbuffer())
+
+    def close(self, delete: bool = True) -> None:
+        """Release the buffer and (unless delete is False) delete any file on disk"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if delete and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self._buffer = None
+
+
+def spool_upload(stream: BinaryIO, max_size: int = DEFAULT_SPOOL_MAX_SIZE, dir: Optional[str] = None,
+                 suffix: str = '') -> Tuple[UploadSpool, str]:
+    """
+    Copy an upload stream into an UploadSpool in fixed-size chunks, hashing as it goes.
+
+    Returns:
+        (spool, sha256_hex_digest)
+    """
+    sha256 = hashlib.sha256()
+    spool = UploadSpool(max_size=max_size, dir=dir, suffix=suffix)
+    try:
+        for block in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b''):
+            sha256.update(block)
+            spool.write(block)
+    except Exception:
+        spool.close()
+        raise
+    return spool, sha256.hexdigest()
@@ -63,7 +63,17 @@ export default function FileUpload({ onFileUploaded }: FileUploadProps) {
         }
       );
 
-      onFileUploaded(response.data);
+      let data = response.data;
+      // Uploads are processed in the background; poll the job until it finishes
+      while (response.status === 202 && data.status !== "completed") {
+        if (data.status === "failed") {
+          throw new Error(data.error || "Upload processing failed");
+        }
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        data = (await axios.get(`http://localhost:5000${data.status_url}`)).data;
+      }
+
+      onFileUploaded(data);
     } catch (error) {
       console.error("Upload error:", error);
       alert("Failed to upload file. Please try again.");
@@ -9,6 +9,22 @@ interface FileUploadProps {
   onFileUploaded: (data: any) => void;
 }
 
+// Uploads are processed in the background; poll the job until it finishes
+async function waitForUploadJob(statusUrl: string): Promise<any> {
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 1500));
+    const response = await fetch(`http://localhost:5000${statusUrl}`);
+    const job = await response.json();
+
+    if (!response.ok || job.status === "failed") {
+      throw new Error(job.error || "Upload processing failed");
+    }
+    if (job.status === "completed") {
+      return job;
+    }
+  }
+}
+
 export default function FileUploadSimple({ onFileUploaded }: FileUploadProps) {
   const { user } = useAuth();
   const [topic, setTopic] = useState("");
@@ -37,15 +53,20 @@ export default function FileUploadSimple({ onFileUploaded }: FileUploadProps) {
           body: formData,
         });
 
-        const data = await response.json();
+        let data = await response.json();
         
         if (response.ok) {
+          if (response.status === 202 && data.status_url) {
+            data = await waitForUploadJob(data.status_url);
+          }
+
           // Save to Firestore
           try {
             await firestoreService.addStudyMaterial(user.uid, {
               title: file.name.replace(/\.[^/.]+$/, ""), // Remove file extension
               topic: topic,
               content: JSON.stringify(data.chunks || []),
+              contentDigest: data.content_digest,
               progress: 0
             });
             console.log('✅ Material saved to Firestore');
@@ -60,6 +60,7 @@ export default function LearningPage() {
           topic: topic,
           user_id: user?.uid || '1',
           content: material.content,  // Send the full content
+          content_digest: material.contentDigest,  // Lets the backend use the original document text
           title: material.title
         })
       });
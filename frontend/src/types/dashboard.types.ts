@@ -3,6 +3,7 @@ export interface StudyMaterial {
   title: string;
   topic: string;
   content: string;
+  contentDigest?: string;  // SHA-256 of the uploaded file, keys the backend text cache
   createdAt: Date;
   lastStudied?: Date;
   progress: number;